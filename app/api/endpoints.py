@@ -3,46 +3,155 @@ FastAPI endpoints for OCR service
 """
 import os
 import time
+import hmac
+import hashlib
+import asyncio
+import uuid
 import logging
-from typing import Optional
-from fastapi import APIRouter, File, UploadFile, HTTPException, Depends
-from fastapi.responses import JSONResponse
-from app.models.schemas import OCRResponse, ErrorResponse, HealthResponse
+from datetime import datetime
+from typing import List, Optional, Iterator
+from fastapi import APIRouter, File, Form, UploadFile, HTTPException, Depends, Query, Header, Request, WebSocket
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
+from app.models.schemas import OCRResponse, ErrorResponse, HealthResponse, JobResponse, RecognizeRequest
 from app.services.ocr_pipeline import OCRPipeline
+from app.services.broker import get_broker
+from app.services.inference_worker import InferenceWorker
+from app.services.remote_pipeline import RemotePipeline
+from app.services.traffic_capture import capture_request
+from app.services.job_store import JobStore
+from app.services.job_worker import JobWorker, check_callback_url
+from app.services.model_manager import ModelManager
+from app.services.model_registry import ModelRegistry
+from app.services.image_cache import image_cache
+from app.services.priority_scheduler import PriorityScheduler
+from app.services.quality_gate import quality_gate
+from app.services.result_store import result_store
+from app.services.stream_session import StreamSession
+from app.utils.deadline import Deadline, RequestAborted
+from app.utils.compact import MSGPACK_MEDIA_TYPE, msgpack_available, unpack_request
+from app.utils.image import decode_image
+from app.utils.serialization import model_response, ocr_response
+from app.utils.single_flight import SingleFlight
 from app.core.config import settings
+from app.core import cpu_profile, prefork
 
 logger = logging.getLogger("api")
 router = APIRouter()
 
-# Global pipeline instance
-pipeline: Optional[OCRPipeline] = None
+# Serving models, swapped by /admin/models/reload without downtime;
+# in broker mode a stand-in that forwards to the inference workers
+model_manager = ModelManager(RemotePipeline if settings.BROKER_ENABLED else OCRPipeline)
 
+# Detector/recognizer variants selectable per request
+model_registry = ModelRegistry(model_manager)
 
-def get_pipeline() -> OCRPipeline:
-    """Get or initialize OCR pipeline"""
-    global pipeline
-    if pipeline is None:
-        try:
-            pipeline = OCRPipeline()
-        except Exception as e:
-            logger.error(f"Failed to initialize pipeline: {e}")
-            raise HTTPException(status_code=500, detail="Failed to initialize OCR pipeline")
-    return pipeline
+# Asynchronous job queue
+job_store = JobStore()
 
+# Interactive and bulk traffic queue separately for pipeline slots
+scheduler = PriorityScheduler()
 
-@router.post("/detect", response_model=OCRResponse)
-async def detect_text(
-    file: UploadFile = File(...),
-    ocr_pipeline: OCRPipeline = Depends(get_pipeline)
-):
+# Identical uploads in flight at the same time share one pipeline run
+inflight_requests = SingleFlight()
+
+# Models of the inference workers running inside this process (inprocess broker backend)
+inference_models = ModelManager(OCRPipeline)
+inference_workers: List[InferenceWorker] = []
+
+
+def start_inference_workers():
+    """Start BROKER_INPROCESS_WORKERS worker threads when the broker lives in this process"""
+    if not settings.BROKER_ENABLED or settings.BROKER_BACKEND != "inprocess" or inference_workers:
+        return
+    registry = ModelRegistry(inference_models)
+    for _ in range(settings.BROKER_INPROCESS_WORKERS):
+        worker = InferenceWorker(get_broker(), registry)
+        worker.start()
+        inference_workers.append(worker)
+
+
+def stop_inference_workers():
+    for worker in inference_workers:
+        worker.stop()
+    inference_workers.clear()
+
+
+def local_models() -> Optional[ModelManager]:
+    """Manager of the models loaded in this process, None when they live on separate inference workers"""
+    if not settings.BROKER_ENABLED:
+        return model_manager
+    if settings.BROKER_BACKEND == "inprocess":
+        return inference_models
+    return None
+
+
+def get_pipeline() -> Iterator[OCRPipeline]:
+    """Lease the serving OCR pipeline for the duration of a request"""
+    try:
+        slot = model_manager.lease()
+    except Exception as e:
+        logger.error(f"Failed to initialize pipeline: {e}")
+        raise HTTPException(status_code=500, detail="Failed to initialize OCR pipeline")
+    try:
+        yield slot.pipeline
+    finally:
+        model_manager.release(slot)
+
+
+job_worker = JobWorker(job_store, model_manager, scheduler)
+
+
+def _variant_pipeline(detector: Optional[str], recognizer: Optional[str]) -> Iterator[OCRPipeline]:
+    """Lease a pipeline made of the requested model variants"""
+    try:
+        model_registry.validate(detector, recognizer)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if settings.BROKER_ENABLED:
+        # Variants are loaded by the inference workers, not here
+        with model_manager.acquire() as ocr_pipeline:
+            yield ocr_pipeline.variant(detector, recognizer)
+        return
+    
+    lease = model_registry.acquire(detector, recognizer)
+    try:
+        ocr_pipeline = lease.__enter__()
+    except Exception as e:
+        logger.error(f"Failed to load model variants {detector}/{recognizer}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to load requested models")
+    try:
+        yield ocr_pipeline
+    finally:
+        lease.__exit__(None, None, None)
+
+
+def get_variant_pipeline(
+    detector: Optional[str] = Form(None, description="Detector variant, default DEFAULT_DETECTOR"),
+    recognizer: Optional[str] = Form(None, description="Recognizer variant, default DEFAULT_RECOGNIZER")
+) -> Iterator[OCRPipeline]:
+    """Pipeline for multipart requests, variants chosen by form fields"""
+    yield from _variant_pipeline(detector, recognizer)
+
+
+def get_raw_variant_pipeline(
+    detector: Optional[str] = Query(None, description="Detector variant, default DEFAULT_DETECTOR"),
+    recognizer: Optional[str] = Query(None, description="Recognizer variant, default DEFAULT_RECOGNIZER")
+) -> Iterator[OCRPipeline]:
+    """Pipeline for raw-body requests, variants chosen by query parameters"""
+    yield from _variant_pipeline(detector, recognizer)
+
+
+async def read_upload(file: UploadFile) -> bytes:
     """
-    Detect and extract text from uploaded image
+    Validate an uploaded image and read its content
     
     Args:
         file: Uploaded image file
         
     Returns:
-        OCRResponse with detected texts and metadata
+        File content bytes
     """
     logger.info(f"Received file: {file.filename}")
     
@@ -66,36 +175,642 @@ async def detect_text(
             detail=f"File too large. Max size: {settings.MAX_FILE_SIZE} bytes"
         )
     
+    return file_content
+
+
+def process_upload(ocr_pipeline: OCRPipeline, file_content: bytes, filename: str, deadline: Deadline) -> OCRResponse:
+    """Run the pipeline on an upload saved to a temporary file"""
+    # Save uploaded file temporarily
+    # Uploads now run concurrently in the threadpool, so the name must be unique
+    temp_filename = f"temp_{int(time.time())}_{uuid.uuid4().hex[:8]}_{filename}"
+    temp_path = os.path.join(settings.OUTPUT_DIR, temp_filename)
+    
+    with open(temp_path, "wb") as buffer:
+        buffer.write(file_content)
+    
+    logger.info(f"Saved temporary file: {temp_path}")
+    
     try:
-        # Save uploaded file temporarily
-        temp_filename = f"temp_{int(time.time())}_{file.filename}"
-        temp_path = os.path.join(settings.OUTPUT_DIR, temp_filename)
-        
-        with open(temp_path, "wb") as buffer:
-            buffer.write(file_content)
-        
-        logger.info(f"Saved temporary file: {temp_path}")
-        
         # Process image
-        result = ocr_pipeline.process_image(temp_path)
-        
+        return ocr_pipeline.process_image(temp_path, deadline)
+    finally:
         # Clean up temporary file
         try:
             os.remove(temp_path)
             logger.info(f"Cleaned up temporary file: {temp_path}")
         except Exception as e:
             logger.warning(f"Failed to clean up temporary file: {e}")
+
+
+def process_decoded(ocr_pipeline: OCRPipeline, image, filename: str, deadline: Deadline) -> OCRResponse:
+    """Run the pipeline on an already decoded image"""
+    return ocr_pipeline.process_batch([image], [filename], deadline)[0]
+
+
+def get_lane(
+    x_priority: Optional[str] = Header(None, description="Priority lane, e.g. interactive or bulk"),
+    x_api_key: Optional[str] = Header(None, description="API key; keys mapped to a lane override X-Priority")
+) -> str:
+    """Priority lane of the request"""
+    try:
+        return scheduler.resolve_lane(x_priority, x_api_key)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def get_deadline(
+    x_request_timeout: Optional[float] = Header(None, description="Seconds the client will wait, capped at REQUEST_TIMEOUT")
+) -> Deadline:
+    """Deadline of the request, starting when it arrives"""
+    timeout = settings.REQUEST_TIMEOUT
+    if x_request_timeout is not None and x_request_timeout > 0:
+        timeout = min(timeout, x_request_timeout)
+    return Deadline(timeout)
+
+
+async def watch_disconnect(request: Request, deadline: Deadline):
+    """Abandon the deadline once the client has gone away"""
+    while not await request.is_disconnected():
+        await asyncio.sleep(settings.DISCONNECT_POLL_INTERVAL)
+    logger.info("Client disconnected before its result was ready")
+    deadline.abandon()
+
+
+async def run_scheduled(lane: str, deadline: Deadline, func, *args) -> OCRResponse:
+    """Wait for a pipeline slot in the lane, then run func(*args, deadline) in the threadpool"""
+    async with scheduler.slot(lane):
+        deadline.check("queue")
+        return await run_in_threadpool(func, *args, deadline)
+
+
+async def run_coalesced(
+    request: Request,
+    ocr_pipeline: OCRPipeline,
+    file_content: bytes,
+    lane: str,
+    deadline: Deadline,
+    func,
+    *args
+) -> OCRResponse:
+    """
+    Run func(*args, deadline) in a pipeline slot, sharing the run with concurrent identical uploads
+    
+    Uploads are identical when their bytes hash the same and they were sent
+    to the same endpoint for the same model version, the serving version or
+    the detector+recognizer variant names, so different variants or versions
+    never share. A request joining a run waits in the lane of the request
+    that started it. The run has its own deadline, lasting until the latest
+    of its requests expires and abandoned once all of them have gone; each
+    request still waits only until its own deadline. A run that was already
+    abandoned is left to stop and a new one is started instead.
+    
+    Args:
+        request: Request watched for client disconnect
+        ocr_pipeline: Pipeline leased by the request
+        file_content: Uploaded image bytes
+        lane: Priority lane of the request
+        deadline: Deadline of the request
+        func: Blocking function producing the OCRResponse
         
-        return result
+    Returns:
+        OCRResponse owned by this request
         
+    Raises:
+        RequestAborted: If the deadline passed or every client disconnected
+    """
+    if not settings.COALESCE_REQUESTS:
+        watcher = asyncio.create_task(watch_disconnect(request, deadline))
+        try:
+            return await run_scheduled(lane, deadline, func, *args)
+        finally:
+            watcher.cancel()
+    
+    # Variant pipelines are built per request, so key on the version label rather than the object
+    key = (func, ocr_pipeline.model_version, hashlib.sha256(file_content).digest())
+    run_deadline = inflight_requests.state(key)
+    if run_deadline is not None and run_deadline.abandoned:
+        # Every client of that run went away and it is stopping; do not hand its 499 to a new client
+        inflight_requests.detach(key)
+        run_deadline = None
+    if run_deadline is not None:
+        run_deadline.join(deadline)
+    else:
+        run_deadline = deadline.share()
+    
+    watcher = asyncio.create_task(watch_disconnect(request, run_deadline))
+    waiting = asyncio.ensure_future(
+        inflight_requests.run(key, run_scheduled, lane, run_deadline, func, *args, state=run_deadline)
+    )
+    try:
+        while True:
+            done, _ = await asyncio.wait({waiting}, timeout=max(deadline.remaining(), 0.0))
+            if done:
+                result, shared = waiting.result()
+                break
+            if run_deadline.expires_at <= deadline.expires_at:
+                # Nobody extended the run, so it stops at this deadline itself, partially when allowed
+                result, shared = await waiting
+                break
+            # A later request keeps the run going; this one stops waiting
+            waiting.cancel()
+            if not watcher.done():
+                run_deadline.abandon()
+            raise RequestAborted("deadline", "coalesced run")
+    finally:
+        watcher.cancel()
+        if not waiting.done():
+            # This request went away (e.g. cancelled); the shielded run continues for the others
+            waiting.cancel()
+    
+    if shared:
+        logger.info("Identical upload already in flight; sharing its result")
+        # Each request sets its own result_id and image_id on the response
+        result = result.model_copy()
+    return result
+
+
+def aborted_status(error: RequestAborted) -> int:
+    """504 when the deadline passed, 499 (client closed request) on disconnect"""
+    return 504 if error.reason == "deadline" else 499
+
+
+@router.post("/detect", response_model=OCRResponse)
+async def detect_text(
+    request: Request,
+    file: UploadFile = File(...),
+    accept: Optional[str] = Header(None),
+    lane: str = Depends(get_lane),
+    deadline: Deadline = Depends(get_deadline),
+    ocr_pipeline: OCRPipeline = Depends(get_variant_pipeline)
+):
+    """
+    Detect and extract text from uploaded image
+    
+    The optional detector and recognizer form fields select model variants.
+    
+    Args:
+        request: Request watched for client disconnect
+        file: Uploaded image file
+        accept: application/x-msgpack selects the compact binary response
+        lane: Priority lane, from X-Priority or the lane of X-API-Key
+        deadline: REQUEST_TIMEOUT, or X-Request-Timeout when shorter
+        
+    Returns:
+        OCRResponse with detected texts and metadata
+    """
+    arrival_time = time.time()
+    file_content = await read_upload(file)
+    read_time = time.time() - arrival_time
+    
+    try:
+        result = await run_coalesced(
+            request, ocr_pipeline, file_content, lane, deadline,
+            process_upload, ocr_pipeline, file_content, file.filename
+        )
+        if not result.success and result.quality:
+            capture_request(file_content, file.filename, arrival_time, 422, read_time)
+            raise HTTPException(status_code=422, detail={"message": result.message, "quality": result.quality})
+        result.result_id = result_store.add(file_content, result)
+        if settings.IMAGE_CACHE_ENABLED:
+            result.image_id = image_cache.add(file_content)
+        capture_request(file_content, file.filename, arrival_time, 200, read_time, result)
+        return ocr_response(result, accept)
+        
+    except HTTPException:
+        raise
+    except RequestAborted as e:
+        logger.warning(f"Request abandoned: {e}")
+        capture_request(file_content, file.filename, arrival_time, aborted_status(e), read_time)
+        raise HTTPException(status_code=aborted_status(e), detail=str(e))
     except FileNotFoundError as e:
         logger.error(f"File not found: {e}")
+        capture_request(file_content, file.filename, arrival_time, 404, read_time)
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.error(f"Processing failed: {e}")
+        capture_request(file_content, file.filename, arrival_time, 500, read_time)
+        raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+
+
+@router.post(
+    "/detect/raw",
+    response_model=OCRResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/octet-stream": {"schema": {"type": "string", "format": "binary"}},
+                MSGPACK_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}}
+            }
+        }
+    }
+)
+async def detect_text_raw(
+    request: Request,
+    filename: str = Query("upload.jpg", description="Name reported in the response and logs"),
+    accept: Optional[str] = Header(None),
+    lane: str = Depends(get_lane),
+    deadline: Deadline = Depends(get_deadline),
+    ocr_pipeline: OCRPipeline = Depends(get_raw_variant_pipeline)
+):
+    """
+    Detect and extract text from an image sent as the raw request body
+    
+    The body is either the encoded image itself, or with Content-Type
+    application/x-msgpack a map {"image": bytes, "filename": str}. The
+    optional detector and recognizer query parameters select model variants.
+    
+    Args:
+        request: Request carrying the image body
+        filename: Image name when not given in a MessagePack body
+        accept: application/x-msgpack selects the compact binary response
+        lane: Priority lane, from X-Priority or the lane of X-API-Key
+        deadline: REQUEST_TIMEOUT, or X-Request-Timeout when shorter
+        
+    Returns:
+        OCRResponse with detected texts and metadata
+    """
+    arrival_time = time.time()
+    if int(request.headers.get("content-length") or 0) > settings.MAX_FILE_SIZE:
+        raise HTTPException(status_code=400, detail=f"File too large. Max size: {settings.MAX_FILE_SIZE} bytes")
+    
+    file_content = await request.body()
+    if MSGPACK_MEDIA_TYPE in request.headers.get("content-type", ""):
+        if not msgpack_available():
+            raise HTTPException(status_code=415, detail="MessagePack support is not installed")
+        try:
+            data = unpack_request(file_content)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Invalid MessagePack body: {str(e)}")
+        file_content = data["image"]
+        filename = data.get("filename") or filename
+    
+    logger.info(f"Received raw image: {filename} ({len(file_content)} bytes)")
+    if len(file_content) > settings.MAX_FILE_SIZE:
+        raise HTTPException(status_code=400, detail=f"File too large. Max size: {settings.MAX_FILE_SIZE} bytes")
+    
+    try:
+        image = decode_image(file_content)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    read_time = time.time() - arrival_time
+    
+    try:
+        result = await run_coalesced(
+            request, ocr_pipeline, file_content, lane, deadline,
+            process_decoded, ocr_pipeline, image, filename
+        )
+        if not result.success and result.quality:
+            capture_request(file_content, filename, arrival_time, 422, read_time)
+            raise HTTPException(status_code=422, detail={"message": result.message, "quality": result.quality})
+        result.result_id = result_store.add(file_content, result)
+        if settings.IMAGE_CACHE_ENABLED:
+            result.image_id = image_cache.add(file_content, image)
+        capture_request(file_content, filename, arrival_time, 200, read_time, result)
+        return ocr_response(result, accept)
+    except HTTPException:
+        raise
+    except RequestAborted as e:
+        logger.warning(f"Request abandoned: {e}")
+        capture_request(file_content, filename, arrival_time, aborted_status(e), read_time)
+        raise HTTPException(status_code=aborted_status(e), detail=str(e))
+    except Exception as e:
+        logger.error(f"Processing failed: {e}")
+        capture_request(file_content, filename, arrival_time, 500, read_time)
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
 
 
+@router.post("/recognize", response_model=OCRResponse)
+async def recognize_regions(
+    request: Request,
+    body: RecognizeRequest,
+    accept: Optional[str] = Header(None),
+    lane: str = Depends(get_lane),
+    deadline: Deadline = Depends(get_deadline),
+    ocr_pipeline: OCRPipeline = Depends(get_raw_variant_pipeline)
+):
+    """
+    Re-read regions of an image uploaded earlier to /detect
+    
+    Only the recognizer runs, on the given boxes of the cached image, so
+    corrected or added boxes are read without another upload, decode or
+    detection. The optional recognizer query parameter selects a variant.
+    
+    Args:
+        request: Request watched for client disconnect
+        body: image_id from a /detect response and the regions to read
+        accept: application/x-msgpack selects the compact binary response
+        lane: Priority lane, from X-Priority or the lane of X-API-Key
+        deadline: REQUEST_TIMEOUT, or X-Request-Timeout when shorter
+    
+    Returns:
+        OCRResponse with one text per region, in request order
+    """
+    if len(body.regions) > settings.RECOGNIZE_MAX_REGIONS:
+        raise HTTPException(status_code=400, detail=f"Too many regions. Max: {settings.RECOGNIZE_MAX_REGIONS}")
+    
+    try:
+        image = await run_in_threadpool(image_cache.get, body.image_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if image is None:
+        raise HTTPException(status_code=404, detail=f"Image not found or expired: {body.image_id}")
+    
+    regions = [
+        {"bbox": [region.bbox.x1, region.bbox.y1, region.bbox.x2, region.bbox.y2], "class_name": region.class_name}
+        for region in body.regions
+    ]
+    watcher = asyncio.create_task(watch_disconnect(request, deadline))
+    try:
+        result = await run_scheduled(lane, deadline, ocr_pipeline.recognize_regions, image, body.image_id, regions)
+        result.image_id = body.image_id
+        return ocr_response(result, accept)
+    except RequestAborted as e:
+        logger.warning(f"Request abandoned: {e}")
+        raise HTTPException(status_code=aborted_status(e), detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Recognition failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Recognition failed: {str(e)}")
+    finally:
+        watcher.cancel()
+
+
+@router.websocket("/stream")
+async def stream_frames(websocket: WebSocket):
+    """
+    Stream camera frames for live card capture
+    
+    Each binary message is one encoded frame. Only the newest unprocessed
+    frame is kept, so frames arriving while the server is busy replace each
+    other and are dropped. Every processed frame gets a JSON message back:
+    "quality" when the quality gate rejected it, "detection" while the card
+    is moving or blurred, and "result" with the OCR response once it has
+    been stable and sharp for a few frames. Like /detect, each frame waits
+    for a pipeline slot in the lane of the X-Priority or X-API-Key header
+    and gets its own REQUEST_TIMEOUT deadline.
+    """
+    await websocket.accept()
+    if settings.BROKER_ENABLED:
+        await websocket.close(code=1011, reason="Streaming needs local models and is not available in broker mode")
+        return
+    try:
+        lane = scheduler.resolve_lane(websocket.headers.get("x-priority"), websocket.headers.get("x-api-key"))
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    try:
+        # The first lease may load the models; keep that off the event loop
+        slot = await run_in_threadpool(model_manager.lease)
+    except Exception as e:
+        logger.error(f"Failed to initialize pipeline: {e}")
+        await websocket.close(code=1011, reason="Failed to initialize OCR pipeline")
+        return
+    session = StreamSession(slot.pipeline)
+    model_manager.release(slot)
+    
+    def process_frame(image, deadline: Deadline) -> dict:
+        # Lease per frame so a model reload can drain between frames
+        with model_manager.acquire() as ocr_pipeline:
+            session.pipeline = ocr_pipeline
+            return session.process_frame(image, deadline)
+    
+    latest_frame: Optional[bytes] = None
+    frame_ready = asyncio.Event()
+    dropped = 0
+    
+    async def receive_frames():
+        nonlocal latest_frame, dropped
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes") is None:
+                continue
+            if latest_frame is not None:
+                dropped += 1
+            latest_frame = message["bytes"]
+            frame_ready.set()
+    
+    receiver = asyncio.create_task(receive_frames())
+    logger.info("Stream session opened")
+    try:
+        while True:
+            waiter = asyncio.create_task(frame_ready.wait())
+            done, _ = await asyncio.wait({waiter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                waiter.cancel()
+                break
+            
+            frame_ready.clear()
+            frame, latest_frame = latest_frame, None
+            if len(frame) > settings.STREAM_MAX_FRAME_SIZE:
+                await websocket.send_json({"type": "error", "message": "Frame too large"})
+                continue
+            
+            try:
+                image = await run_in_threadpool(decode_image, frame)
+                message = await run_scheduled(lane, Deadline(settings.REQUEST_TIMEOUT), process_frame, image)
+            except RequestAborted as e:
+                logger.warning(f"Stream frame abandoned: {e}")
+                message = {"type": "error", "message": str(e)}
+            except Exception as e:
+                logger.error(f"Stream frame failed: {e}")
+                message = {"type": "error", "message": str(e)}
+            message["dropped"] = dropped
+            await websocket.send_json(message)
+    except Exception as e:
+        logger.warning(f"Stream session ended: {e}")
+    finally:
+        receiver.cancel()
+        tracker_stats = session.tracker.stats()
+        logger.info(f"Stream session closed: {session.frames} frames processed, {dropped} dropped, "
+                    f"{session.recognitions} results, {tracker_stats['recognized']} fields recognized, "
+                    f"{tracker_stats['skipped']} reused")
+
+
+@router.get("/results/{result_id}/image")
+async def get_result_image(
+    result_id: str,
+    max_width: int = Query(settings.RENDER_MAX_WIDTH, ge=64, le=4096),
+    image_format: str = Query(settings.RENDER_FORMAT, alias="format", pattern="^(webp|jpeg|png)$"),
+    quality: int = Query(settings.RENDER_QUALITY, ge=0, le=100)
+):
+    """
+    Render the annotated image for a previous /detect result
+    
+    Args:
+        result_id: result_id returned by /detect
+        max_width: Maximum width of the rendered image
+        image_format: Output format (webp, jpeg or png)
+        quality: Encoder quality
+        
+    Returns:
+        Encoded image with bounding boxes and labels
+    """
+    try:
+        content = await run_in_threadpool(result_store.render, result_id, max_width, image_format, quality)
+    except Exception as e:
+        logger.error(f"Failed to render result {result_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Rendering failed: {str(e)}")
+    
+    if content is None:
+        raise HTTPException(status_code=404, detail=f"Result not found or expired: {result_id}")
+    
+    return Response(
+        content=content,
+        media_type=f"image/{image_format}",
+        headers={"Cache-Control": "private, max-age=3600"}
+    )
+
+
+def _job_response(job: dict) -> JobResponse:
+    """Convert a job store row into a JobResponse"""
+    def to_datetime(value):
+        return datetime.fromtimestamp(value) if value is not None else None
+    
+    return JobResponse(
+        job_id=job["id"],
+        status=job["status"],
+        created_at=to_datetime(job["created_at"]),
+        started_at=to_datetime(job["started_at"]),
+        finished_at=to_datetime(job["finished_at"]),
+        result=OCRResponse.model_validate_json(job["result"]) if job["result"] else None,
+        error=job["error"]
+    )
+
+
+def write_file(path: str, content: bytes):
+    """Write an upload to disk; called through the threadpool"""
+    with open(path, "wb") as buffer:
+        buffer.write(content)
+
+
+@router.post("/jobs", response_model=JobResponse, status_code=202)
+async def create_job(
+    file: UploadFile = File(...),
+    callback_url: Optional[str] = Form(None)
+):
+    """
+    Submit an image for asynchronous processing
+    
+    Args:
+        file: Uploaded image file
+        callback_url: Optional public URL that receives the finished job as a JSON POST
+        
+    Returns:
+        JobResponse with the job id to poll
+    """
+    if callback_url:
+        try:
+            await run_in_threadpool(check_callback_url, callback_url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    file_content = await read_upload(file)
+    
+    job_id = uuid.uuid4().hex
+    file_ext = os.path.splitext(file.filename)[1].lower()
+    image_path = os.path.join(settings.JOBS_DIR, f"{job_id}{file_ext}")
+    await run_in_threadpool(write_file, image_path, file_content)
+    
+    job = await run_in_threadpool(job_store.create, file.filename, image_path, callback_url, job_id)
+    logger.info(f"Queued job {job_id} for {file.filename}")
+    return model_response(_job_response(job), status_code=202)
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """
+    Get the status and result of an asynchronous job
+    
+    Args:
+        job_id: Job identifier returned by POST /jobs
+        
+    Returns:
+        JobResponse with status and, when completed, the OCR result
+    """
+    job = await run_in_threadpool(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return model_response(_job_response(job))
+
+
+def check_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Require X-Admin-Token; admin endpoints are disabled while ADMIN_TOKEN is empty"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them")
+    if not hmac.compare_digest((x_admin_token or "").encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+def resolve_model_path(path: Optional[str]) -> Optional[str]:
+    """
+    Resolve a weight file path given to the reload endpoint
+    
+    Raises:
+        HTTPException: 400 if the file is outside MODEL_DIR or does not exist
+    """
+    if not path:
+        return None
+    model_dir = os.path.realpath(settings.MODEL_DIR)
+    resolved = os.path.realpath(path)
+    if os.path.commonpath([model_dir, resolved]) != model_dir:
+        raise HTTPException(status_code=400, detail=f"Model files must be under {settings.MODEL_DIR}/: {path}")
+    if not os.path.isfile(resolved):
+        raise HTTPException(status_code=400, detail=f"Model file not found: {path}")
+    return resolved
+
+
+@router.post("/admin/models/reload", status_code=202, dependencies=[Depends(check_admin_token)])
+async def reload_models(
+    yolo_model_path: Optional[str] = Form(None),
+    vietocr_weights_path: Optional[str] = Form(None),
+    version: Optional[str] = Form(None)
+):
+    """
+    Load and warm a new model version in the background, then swap it in
+    
+    In broker mode this reloads the in-process inference workers; separate
+    worker processes are reloaded on their own hosts, so the request is
+    refused with 409.
+    
+    Args:
+        yolo_model_path: New detector weights under MODEL_DIR, default the currently served file
+        vietocr_weights_path: New recognizer weights under MODEL_DIR, default the currently served file
+        version: Version label, default derived from the file contents
+        
+    Returns:
+        Model status including reload progress
+    """
+    models = local_models()
+    if models is None:
+        raise HTTPException(status_code=409, detail="Models are loaded by the inference workers; reload them there")
+    
+    yolo_model_path = resolve_model_path(yolo_model_path)
+    vietocr_weights_path = resolve_model_path(vietocr_weights_path)
+    
+    if not models.reload(yolo_model_path, vietocr_weights_path, version):
+        raise HTTPException(status_code=409, detail="A model reload is already in progress")
+    logger.info(f"Model reload requested: {yolo_model_path or 'current'}, {vietocr_weights_path or 'current'}")
+    return models.status()
+
+
+@router.get("/admin/models", dependencies=[Depends(check_admin_token)])
+async def get_model_status():
+    """
+    Get the serving model version and reload progress
+    
+    Returns:
+        Serving version, draining versions, recent reloads and loaded variants
+    """
+    models = local_models()
+    if models is None:
+        return {"serving": None, "broker": get_broker().stats(), "registry": model_registry.status()}
+    return {**models.status(), "registry": model_registry.status()}
+
+
 @router.get("/health", response_model=HealthResponse)
 async def health_check(ocr_pipeline: OCRPipeline = Depends(get_pipeline)):
     """
@@ -133,7 +848,19 @@ async def get_service_info(ocr_pipeline: OCRPipeline = Depends(get_pipeline)):
         Service information including model details
     """
     try:
-        return ocr_pipeline.get_service_info()
+        service_info = ocr_pipeline.get_service_info()
+        service_info["result_store"] = result_store.stats()
+        service_info["image_cache"] = image_cache.stats()
+        service_info["coalescing"] = inflight_requests.stats()
+        service_info["quality_gate"] = quality_gate.stats()
+        service_info["priority"] = scheduler.status()
+        service_info["cpu_profile"] = cpu_profile.effective_profile
+        service_info["models"] = model_manager.status()
+        service_info["registry"] = model_registry.status()
+        service_info["worker"] = prefork.worker_status()
+        if inference_workers:
+            service_info["inference_workers"] = [worker.stats() for worker in inference_workers]
+        return service_info
     except Exception as e:
         logger.error(f"Failed to get service info: {e}")
         raise HTTPException(status_code=500, detail="Failed to get service information")
@@ -5,11 +5,14 @@ import os
 import time
 import logging
 from typing import Optional
-from fastapi import APIRouter, File, UploadFile, HTTPException, Depends
+from fastapi import APIRouter, File, UploadFile, HTTPException, Depends, Header
 from fastapi.responses import JSONResponse
 from app.models.schemas import OCRResponse, ErrorResponse, HealthResponse
 from app.services.mock_pipeline import MockOCRPipeline
+from app.services.traffic_capture import capture_request
+from app.utils.serialization import ocr_response
 from app.core.config import settings
+from app.core import cpu_profile
 
 logger = logging.getLogger("api")
 router = APIRouter()
@@ -33,6 +36,7 @@ def get_pipeline() -> MockOCRPipeline:
 @router.post("/detect", response_model=OCRResponse)
 async def detect_text(
     file: UploadFile = File(...),
+    accept: Optional[str] = Header(None),
     ocr_pipeline: MockOCRPipeline = Depends(get_pipeline)
 ):
     """
@@ -40,10 +44,12 @@ async def detect_text(
     
     Args:
         file: Uploaded image file
+        accept: application/x-msgpack selects the compact binary response
         
     Returns:
         OCRResponse with detected texts and metadata
     """
+    arrival_time = time.time()
     logger.info(f"Received file: {file.filename}")
     
     # Validate file
@@ -60,6 +66,7 @@ async def detect_text(
     
     # Check file size
     file_content = await file.read()
+    read_time = time.time() - arrival_time
     if len(file_content) > settings.MAX_FILE_SIZE:
         raise HTTPException(
             status_code=400,
@@ -86,13 +93,16 @@ async def detect_text(
         except Exception as e:
             logger.warning(f"Failed to clean up temporary file: {e}")
         
-        return result
+        capture_request(file_content, file.filename, arrival_time, 200, read_time, result)
+        return ocr_response(result, accept)
         
     except FileNotFoundError as e:
         logger.error(f"File not found: {e}")
+        capture_request(file_content, file.filename, arrival_time, 404, read_time)
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.error(f"Processing failed: {e}")
+        capture_request(file_content, file.filename, arrival_time, 500, read_time)
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
 
 
@@ -133,7 +143,9 @@ async def get_service_info(ocr_pipeline: MockOCRPipeline = Depends(get_pipeline)
         Service information including model details
     """
     try:
-        return ocr_pipeline.get_service_info()
+        service_info = ocr_pipeline.get_service_info()
+        service_info["cpu_profile"] = cpu_profile.effective_profile
+        return service_info
     except Exception as e:
         logger.error(f"Failed to get service info: {e}")
         raise HTTPException(status_code=500, detail="Failed to get service information")
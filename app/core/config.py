@@ -3,7 +3,7 @@ Application configuration settings
 """
 import os
 from pathlib import Path
-from typing import List
+from typing import List, Tuple, Dict, Any
 
 
 class Settings:
@@ -23,6 +23,9 @@ class Settings:
     # Device settings
     DEVICE: str = "cuda:0"  # or "cpu"
     
+    # Recognition batching
+    OCR_BATCH_SIZE: int = 16  # crops per VietOCR model call
+    
     # Text labels to process
     TEXT_LABELS: List[str] = [
         "dob", "gender", "id", "name", "nationality", 
@@ -30,6 +33,80 @@ class Settings:
         "issue_date", "origin_place1", "origin_place2", "personal_identifi"
     ]
     
+    # Text labels of the older detectors (corner/QR label set)
+    LEGACY_TEXT_LABELS: List[str] = [
+        "date_of_birth", "date_of_expiry", "gender", "hometown",
+        "id", "name", "nation", "permanent_residence"
+    ]
+    
+    # Model variants selectable per request; the default pair is served by the hot-reload manager
+    DEFAULT_DETECTOR: str = "id_card_2"
+    DEFAULT_RECOGNIZER: str = VIETOCR_MODEL_NAME
+    DETECTOR_VARIANTS: Dict[str, Dict[str, Any]] = {
+        "id_card_2": {"path": YOLO_MODEL_PATH},
+        "id_card_1": {"path": "models/Text_Detection/YOLO/ID_CARD_1.pt", "text_labels": TEXT_LABELS + LEGACY_TEXT_LABELS},
+        "id_card": {"path": "models/Text_Detection/YOLO/ID_CARD.pt", "text_labels": TEXT_LABELS + LEGACY_TEXT_LABELS},
+    }
+    RECOGNIZER_VARIANTS: Dict[str, Dict[str, Any]] = {
+        "vgg_transformer": {"model_name": "vgg_transformer", "path": "models/Text_Recognition/Vietocr/vgg_transformer.pth"},
+        "vgg_seq2seq": {"model_name": "vgg_seq2seq", "path": "models/Text_Recognition/Vietocr/vgg_seq2seq.pth"},
+    }
+    MODEL_MEMORY_BUDGET_MB: int = 2048  # resident non-default variants; least recently used are evicted
+    
+    # Digit-only CTC recognizer for numeric fields (trained by test/train_digit_recognizer.py)
+    DIGIT_RECOGNIZER_ENABLED: bool = True  # used when the weights file exists, otherwise VietOCR reads every field
+    DIGIT_RECOGNIZER_PATH: str = "models/Text_Recognition/Digits/digit_crnn.pth"
+    DIGIT_FIELD_PATTERNS: Dict[str, str] = {
+        "id": r"\d{12}|\d{9}",
+        "dob": r"\d{2}/\d{2}/\d{4}",
+        "issue_date": r"\d{2}/\d{2}/\d{4}",
+        "expire_date": r"\d{2}/\d{2}/\d{4}",
+        "date_of_birth": r"\d{2}/\d{2}/\d{4}",
+        "date_of_expiry": r"\d{2}/\d{2}/\d{4}",
+    }  # classes routed to the digit recognizer; reads not matching the pattern go to VietOCR
+    DIGIT_MIN_CONFIDENCE: float = 0.8  # mean character probability below which VietOCR reads the field again
+    
+    # Detection post-processing: what reaches VietOCR
+    DETECTION_CONF: float = 0.25  # confidence threshold passed to the YOLO call
+    DETECTION_IOU: float = 0.7  # NMS IoU passed to the YOLO call
+    DETECTION_MAX_DET: int = 50  # a card has about a dozen fields
+    DETECTION_FILTER_CLASSES: bool = True  # ask YOLO only for text classes and STREAM_CARD_CLASSES
+    OCR_MIN_DETECTION_CONF: float = 0.4  # text boxes below this are not recognized
+    DETECTION_CLASS_POLICIES: Dict[str, Dict[str, Any]] = {
+        label: {"max_count": 1} for label in TEXT_LABELS  # each field appears once on a card
+    }  # per class: max_count keeps the most confident boxes, min_conf overrides OCR_MIN_DETECTION_CONF
+    
+    # Two-stage detection: find the card (STREAM_CARD_CLASSES) at low resolution, then fields in its crop
+    TWO_STAGE_DETECTION: bool = False
+    LOCALIZE_IMGSZ: int = 320  # input size of the card localization pass
+    LOCALIZE_CONF: float = 0.3
+    LOCALIZE_MARGIN: float = 0.03  # crop margin around the card box, as a fraction of its size
+    FIELD_IMGSZ: int = 640  # input size of the field pass on the card crop (canonical card is 856x540)
+    
+    # Card alignment before field detection (needs a detector with corner classes)
+    ALIGN_ENABLED: bool = False
+    ALIGN_DETECTOR: str = "id_card_1"  # DETECTOR_VARIANTS entry predicting top_left/top_right/bottom_left/bottom_right
+    ALIGN_THUMBNAIL_SIZE: int = 320  # longest side of the image searched for corners
+    ALIGN_CARD_SIZE: Tuple[int, int] = (856, 540)  # canonical card (width, height), ID-1 aspect ratio
+    ALIGN_MIN_CORNERS: int = 3  # a single missing corner is completed as a parallelogram
+    ALIGN_MIN_AREA_RATIO: float = 0.05  # smallest card quad, as a fraction of the image area
+    
+    # Quality gate on a thumbnail before detection (metrics in app/services/quality_gate.py).
+    # Off by default: rejected images get 422, and the thresholds are not yet calibrated on real traffic.
+    # Sharpness of the repo samples: 49.jpg 3.03, img527.jpg 0.23; Gaussian blur of sigma 3 thumbnail
+    # pixels brings them to 0.0046 and 0.0024. Synthetic cards measure 0.006 to 0.84 when sharp. 0.004
+    # only rejects blur that heavy; calibrate it with app/services/quality_gate.measure_quality on
+    # captured traffic labelled readable/unreadable before enabling the gate.
+    QUALITY_GATE_ENABLED: bool = False
+    QUALITY_THUMBNAIL_SIZE: int = 640  # longest side; blur on smaller thumbnails hides field-scale blur
+    QUALITY_MIN_SHARPNESS: float = 0.004  # Laplacian variance / intensity variance, see above
+    QUALITY_MIN_BRIGHTNESS: float = 50.0  # mean gray level
+    QUALITY_MAX_BRIGHTNESS: float = 235.0
+    QUALITY_GLARE_LEVEL: int = 250  # gray level counted as blown out
+    QUALITY_MAX_GLARE_FRACTION: float = 0.1
+    QUALITY_MIN_CARD_RATIO: float = 0.12  # share of the frame spanned by edges
+    QUALITY_REJECT_ISSUES: List[str] = ["blurry", "dark", "overexposed", "glare"]  # other issues are only reported
+    
     # File settings
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
     ALLOWED_EXTENSIONS: List[str] = [".jpg", ".jpeg", ".png", ".bmp", ".tiff"]
@@ -41,8 +118,128 @@ class Settings:
     
     # Performance
     MAX_CONCURRENT_REQUESTS: int = 5
-    REQUEST_TIMEOUT: int = 30  # seconds
+    REQUEST_TIMEOUT: int = 30  # seconds; checked between pipeline stages and recognition batches
+    DEADLINE_PARTIAL_RESULTS: bool = True  # on timeout after detection return the regions, text null where not yet recognized, instead of 504
+    DISCONNECT_POLL_INTERVAL: float = 0.5  # seconds between client disconnect checks
+    
+    # Priority lanes in front of the pipeline, chosen by X-Priority or X-API-Key
+    PRIORITY_ENABLED: bool = True
+    PRIORITY_SLOTS: int = MAX_CONCURRENT_REQUESTS  # pipeline runs at once across all lanes
+    PRIORITY_LANE_WEIGHTS: Dict[str, int] = {"interactive": 8, "bulk": 1}  # share of freed slots when lanes compete
+    PRIORITY_LANE_MAX_SLOTS: Dict[str, int] = {"bulk": MAX_CONCURRENT_REQUESTS - 1}  # rest stays free for other lanes
+    PRIORITY_URGENT_LANE: str = "interactive"
+    PRIORITY_TARGET_WAIT: float = 0.2  # seconds; an urgent request queued this long is served next
+    PRIORITY_DEFAULT_LANE: str = "interactive"
+    PRIORITY_API_KEY_LANES: Dict[str, str] = {}  # X-API-Key -> lane, takes precedence over X-Priority
+
+    # Broker mode: API nodes only validate and enqueue, run_inference_worker.py processes
+    BROKER_ENABLED: bool = False
+    BROKER_BACKEND: str = "socket"  # "socket" (workers in other processes) or "inprocess" (one process, tests)
+    BROKER_ADDRESS: str = "/tmp/ocr_broker.sock"  # unix socket path, or host:port
+    BROKER_INPROCESS_WORKERS: int = 1  # worker threads started with the app for the inprocess backend
+    BROKER_BATCH_SIZE: int = 8  # tasks a worker runs per pipeline call
+    BROKER_BATCH_WAIT: float = 0.01  # seconds a worker waits to fill a batch after the first task
+    BROKER_FETCH_TIMEOUT: float = 1.0  # seconds a worker waits for tasks per fetch; workers silent 3x this count as gone
+    BROKER_RESULT_GRACE: float = 2.0  # seconds past the deadline an API node waits for a partial result
+    BROKER_MAX_ATTEMPTS: int = 2  # tasks lost with a worker this many times fail instead of being requeued
+    
+    # Pre-forking production server (run_production.py)
+    PREFORK_HOST: str = "0.0.0.0"
+    PREFORK_PORT: int = 8000
+    PREFORK_WORKERS: int = 4
+    PREFORK_MAX_REQUESTS: int = 10000  # recycle a worker after this many requests (0 = never)
+    PREFORK_MAX_REQUESTS_JITTER: int = 1000  # spread recycles so workers don't restart together
+    PREFORK_MAX_PRIVATE_MB: int = 0  # recycle when memory not shared with the master exceeds this (0 = never)
+    PREFORK_MEMORY_CHECK_INTERVAL: float = 10.0  # seconds
+    PREFORK_MEMORY_REPORT_INTERVAL: float = 60.0  # seconds between master memory log lines
     
+    # Model hot reload
+    MODEL_WARMUP_RUNS: int = 2  # dummy inferences before a new version starts serving
+    MODEL_DRAIN_TIMEOUT: float = 60.0  # seconds to wait for requests on the old version
+    MODEL_WATCH_ENABLED: bool = False  # reload when the model files change on disk
+    MODEL_WATCH_INTERVAL: float = 5.0  # seconds between model file checks
+    ADMIN_TOKEN: str = ""  # X-Admin-Token required by /admin endpoints; empty disables them
+    MODEL_DIR: str = "models"  # reload only loads weight files under this directory
+    
+    # CPU execution profile (applied at startup by app/core/cpu_profile.py)
+    CPU_PROFILE_ENABLED: bool = False
+    CPU_AFFINITY: str = ""  # core list such as "0-7,16-23"; empty keeps the inherited set
+    CPU_CORES_PER_WORKER: int = 0  # >0 splits the cores into one slice per worker process
+    CPU_SLOT_DIR: str = "logs/cpu_slots"  # lock files used by workers to claim a slice
+    TORCH_NUM_THREADS: int = 0  # intra-op threads; 0 = cores / EXECUTOR_WORKERS
+    TORCH_NUM_INTEROP_THREADS: int = 1
+    OPENCV_NUM_THREADS: int = 1  # 0 disables OpenCV's own thread pool
+    EXECUTOR_WORKERS: int = 0  # default thread pool size; 0 = MAX_CONCURRENT_REQUESTS
+
+    # Traffic capture (opt-in, used by test/replay_traffic.py)
+    CAPTURE_ENABLED: bool = False
+    CAPTURE_DIR: str = "captures"
+    CAPTURE_SAVE_PAYLOAD: bool = False  # also store uploaded image bytes
+    CAPTURE_QUEUE_SIZE: int = 1000  # records waiting for the writer thread; further records are dropped
+
+    # Mock pipeline latency model (run_mock_server.py)
+    MOCK_LATENCY_MODE: str = "sleep"  # "sleep", "cpu" or "replay" (replay burns CPU too)
+    MOCK_LATENCY_DISTRIBUTION: str = "fixed"  # "fixed", "normal", "lognormal" or "exponential"
+    MOCK_LATENCY_CV: float = 0.3  # coefficient of variation for sampled latencies
+    MOCK_DETECTION_TIME: float = 0.1  # mean seconds per image
+    MOCK_OCR_TIME_PER_REGION: float = 0.05  # mean seconds per recognized region
+    MOCK_OCR_BATCH_OVERHEAD: float = 0.1  # mean seconds per recognition batch
+    MOCK_OCR_BATCH_SIZE: int = 8
+    MOCK_CPU_HOLD_GIL: bool = False  # pure-Python spin instead of GIL-releasing numpy work
+    MOCK_REPLAY_GLOB: str = "output/*.json"
+
+    # Asynchronous jobs
+    JOBS_DIR: str = "jobs"
+    JOBS_DB_PATH: str = "jobs/jobs.db"
+    JOB_WORKER_CONCURRENCY: int = 2
+    JOB_POLL_INTERVAL: float = 0.5  # seconds between queue polls when idle
+    JOB_RESULT_TTL: int = 24 * 3600  # seconds to keep finished jobs
+    JOB_CALLBACK_TIMEOUT: int = 10  # seconds
+    JOB_CALLBACK_ALLOWED_HOSTS: List[str] = []  # empty allows any host with a public address
+    JOB_TIMEOUT: float = 300.0  # seconds a job may run before it fails
+    JOB_MAX_ATTEMPTS: int = 3  # jobs interrupted by a restart this many times fail instead of being requeued
+    JOB_PRIORITY_LANE: str = "bulk"
+    
+    # Concurrent identical uploads share one pipeline run (not a cache of finished results)
+    COALESCE_REQUESTS: bool = True
+    
+    # Build responses without re-validation and encode them with pydantic-core
+    FAST_SERIALIZATION: bool = True
+    
+    # WebSocket frame streaming
+    STREAM_CARD_CLASSES: List[str] = ["cccd"]  # detector classes that mark the card itself
+    STREAM_STABLE_IOU: float = 0.9  # card box IoU between frames to count as not moving
+    STREAM_STABLE_FRAMES: int = 3  # consecutive stable frames before recognition
+    STREAM_MIN_SHARPNESS: float = 100.0  # Laplacian variance of the card crop
+    STREAM_MAX_FRAME_SIZE: int = 2 * 1024 * 1024
+    
+    # Field tracking across stream frames
+    FIELD_TRACK_IOU: float = 0.5  # minimum IoU to associate a field with a track
+    FIELD_CHANGE_THRESHOLD: float = 0.4  # mean abs difference of normalized crop thumbnails
+    FIELD_SIGNATURE_SIZE: Tuple[int, int] = (64, 16)  # crop thumbnail (width, height)
+    FIELD_TRACK_MAX_AGE: int = 10  # frames a track survives without a match
+    
+    # Recent results and annotated image rendering
+    RESULT_STORE_MAX_ITEMS: int = 200
+    RESULT_STORE_MAX_BYTES: int = 200 * 1024 * 1024  # uploaded image bytes kept for rendering
+    RENDER_MAX_WIDTH: int = 800  # default width of rendered images
+    RENDER_FORMAT: str = "webp"  # "webp", "jpeg" or "png"
+    RENDER_QUALITY: int = 80
+    RENDER_CACHE_MAX_ITEMS: int = 100
+    RENDER_CACHE_MAX_BYTES: int = 50 * 1024 * 1024
+    
+    # Decoded images kept for region re-recognition (/recognize)
+    IMAGE_CACHE_ENABLED: bool = True
+    IMAGE_CACHE_MAX_ITEMS: int = 100
+    IMAGE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024  # decoded pixels, about 36 MB per 12 MP photo
+    IMAGE_CACHE_TTL: float = 300.0  # seconds since an image was last used
+    RECOGNIZE_MAX_REGIONS: int = 50
+    
+    # Offline batch processing (run_batch.py)
+    BATCH_SIZE: int = 8  # images per detection call
+    BATCH_PREFETCH_WORKERS: int = 4  # background image decode threads
+    BATCH_PREFETCH_BATCHES: int = 2  # decoded batches kept ahead of inference
+
     def __init__(self):
         """Initialize settings and create necessary directories"""
         self._create_directories()
@@ -51,6 +248,7 @@ class Settings:
         """Create necessary directories if they don't exist"""
         Path(self.OUTPUT_DIR).mkdir(exist_ok=True)
         Path("logs").mkdir(exist_ok=True)
+        Path(self.JOBS_DIR).mkdir(exist_ok=True)
 
 
 # Global settings instance
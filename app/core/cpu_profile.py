@@ -0,0 +1,168 @@
+"""
+CPU execution profile: thread pools and core affinity configured together
+"""
+import os
+import sys
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+from app.core.config import settings
+
+logger = logging.getLogger("api")
+
+# Effective configuration after apply_cpu_profile(), reported by /info
+effective_profile: Dict[str, Any] = {"enabled": False}
+
+# Keeps the worker slot lock held for the lifetime of the process
+_slot_lock = None
+
+# Set by the prefork master in each worker it forks
+assigned_worker_index: Optional[int] = None
+
+
+def parse_core_list(spec: str) -> List[int]:
+    """Parse a core list such as "0-7,16-23" into sorted core ids"""
+    cores = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            cores.update(range(int(start), int(end) + 1))
+        else:
+            cores.add(int(part))
+    return sorted(cores)
+
+
+def _available_cores() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _claim_worker_slot(num_slots: int) -> Optional[int]:
+    """
+    Claim the first free worker slot with an exclusive file lock
+    
+    Lets independent worker processes (e.g. uvicorn --workers) split the
+    cores between them without knowing their own index.
+    """
+    global _slot_lock
+    try:
+        import fcntl
+    except ImportError:
+        return None
+    
+    os.makedirs(settings.CPU_SLOT_DIR, exist_ok=True)
+    for slot in range(num_slots):
+        handle = open(os.path.join(settings.CPU_SLOT_DIR, f"slot{slot}.lock"), "w")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            continue
+        _slot_lock = handle
+        return slot
+    return None
+
+
+def _select_cores(worker_index: Optional[int]) -> Optional[List[int]]:
+    """Cores this process should be pinned to, or None to keep the inherited set"""
+    cores = parse_core_list(settings.CPU_AFFINITY) if settings.CPU_AFFINITY else None
+    if settings.CPU_CORES_PER_WORKER <= 0:
+        return cores
+    
+    cores = cores or _available_cores()
+    num_slots = max(1, len(cores) // settings.CPU_CORES_PER_WORKER)
+    if worker_index is None:
+        worker_index = assigned_worker_index
+    if worker_index is None:
+        worker_index = _claim_worker_slot(num_slots)
+        if worker_index is None:
+            logger.warning("No free CPU slot; keeping the inherited affinity")
+            return None
+    start = (worker_index % num_slots) * settings.CPU_CORES_PER_WORKER
+    return cores[start:start + settings.CPU_CORES_PER_WORKER]
+
+
+def apply_cpu_profile(worker_index: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Apply the CPU profile from Settings to this process
+    
+    Sets core affinity and the torch and OpenCV thread counts. Must run
+    before the models are loaded so that torch picks up the thread settings.
+    Works in any process; servers then call configure_executor() from inside
+    their event loop.
+    
+    Args:
+        worker_index: Index of this worker when known; otherwise a free slot
+            is claimed when CPU_CORES_PER_WORKER is set
+    
+    Returns:
+        Effective configuration
+    """
+    global effective_profile
+    if not settings.CPU_PROFILE_ENABLED:
+        effective_profile = {"enabled": False, "cpu_count": os.cpu_count()}
+        return effective_profile
+    
+    cores = _select_cores(worker_index)
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    num_cores = len(_available_cores())
+    
+    executor_workers = settings.EXECUTOR_WORKERS or settings.MAX_CONCURRENT_REQUESTS
+    torch_threads = settings.TORCH_NUM_THREADS or max(1, num_cores // executor_workers)
+    
+    # OpenMP/MKL read these when torch is first imported
+    if "torch" not in sys.modules:
+        os.environ.setdefault("OMP_NUM_THREADS", str(torch_threads))
+        os.environ.setdefault("MKL_NUM_THREADS", str(torch_threads))
+    
+    torch_info = None
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+        try:
+            torch.set_num_interop_threads(settings.TORCH_NUM_INTEROP_THREADS)
+        except RuntimeError as e:
+            # Only allowed once, before any parallel work has started
+            logger.warning(f"Cannot change torch inter-op threads: {e}")
+        torch_info = {
+            "num_threads": torch.get_num_threads(),
+            "num_interop_threads": torch.get_num_interop_threads()
+        }
+    except ImportError:
+        logger.warning("torch not available; skipping torch thread settings")
+    
+    import cv2
+    cv2.setNumThreads(settings.OPENCV_NUM_THREADS)
+    
+    effective_profile = {
+        "enabled": True,
+        "cpu_count": os.cpu_count(),
+        "affinity": _available_cores(),
+        "torch": torch_info,
+        "opencv_threads": cv2.getNumThreads(),
+        "executor_workers": executor_workers,
+        "omp_num_threads": os.environ.get("OMP_NUM_THREADS")
+    }
+    logger.info(f"CPU profile applied: {num_cores} cores, torch {torch_info}, "
+                f"OpenCV {effective_profile['opencv_threads']} threads, {executor_workers} executor workers")
+    return effective_profile
+
+
+def configure_executor():
+    """
+    Size the event loop's default executor and AnyIO's thread limiter to the profile
+    
+    Must run inside the event loop, after apply_cpu_profile().
+    """
+    if not effective_profile.get("enabled"):
+        return
+    executor_workers = effective_profile["executor_workers"]
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=executor_workers))
+    import anyio.to_thread
+    anyio.to_thread.current_default_thread_limiter().total_tokens = executor_workers
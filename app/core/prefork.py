@@ -0,0 +1,238 @@
+"""
+Pre-forking server: load models once, fork workers that share them copy-on-write
+"""
+import os
+import gc
+import sys
+import time
+import random
+import signal
+import socket
+import logging
+import threading
+from typing import Dict, Any, Optional
+from app.core.config import settings
+from app.core import cpu_profile
+
+logger = logging.getLogger("api")
+
+# Identity of this process when it is a prefork worker, reported by /info
+worker_info: Dict[str, Any] = {}
+
+
+def memory_report(pid: int) -> Dict[str, float]:
+    """
+    Resident memory of a process split into shared and private parts, in MB
+    
+    Uses /proc/<pid>/smaps_rollup (Linux 4.14+), falling back to statm.
+    PSS charges each shared page proportionally to the processes mapping it.
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1]) / 1024
+        return {
+            "rss_mb": round(fields.get("Rss", 0.0), 1),
+            "pss_mb": round(fields.get("Pss", 0.0), 1),
+            "shared_mb": round(fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0), 1),
+            "private_mb": round(fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0), 1)
+        }
+    except OSError:
+        pass
+    
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            _, resident, shared = (int(v) for v in f.read().split()[:3])
+        page_mb = os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+        return {
+            "rss_mb": round(resident * page_mb, 1),
+            "shared_mb": round(shared * page_mb, 1),
+            "private_mb": round((resident - shared) * page_mb, 1)
+        }
+    except (OSError, ValueError):
+        return {}
+
+
+def worker_status() -> Optional[Dict[str, Any]]:
+    if not worker_info:
+        return None
+    return {**worker_info, "memory": memory_report(os.getpid())}
+
+
+def _set_worker_threads(num_workers: int):
+    """Split the cores between workers when no CPU profile is configured"""
+    threads = max(1, (os.cpu_count() or 1) // num_workers)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    import cv2
+    cv2.setNumThreads(1)
+    logger.info(f"Worker {worker_info['index']}: {threads} torch threads")
+
+
+def _watch_memory(server):
+    """Ask uvicorn to exit gracefully once private memory exceeds the limit"""
+    while not server.should_exit:
+        time.sleep(settings.PREFORK_MEMORY_CHECK_INTERVAL)
+        private_mb = memory_report(os.getpid()).get("private_mb", 0.0)
+        if private_mb > settings.PREFORK_MAX_PRIVATE_MB:
+            logger.warning(f"Worker {worker_info['index']} private memory {private_mb:.0f} MB exceeds "
+                           f"{settings.PREFORK_MAX_PRIVATE_MB} MB; recycling")
+            server.should_exit = True
+
+
+def _run_worker(index: int, sock: socket.socket, num_workers: int):
+    """Body of a forked worker: warm up, then serve until recycled or stopped"""
+    import uvicorn
+    from app.main import app
+    from app.api.endpoints import model_manager
+    
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, signal.SIG_DFL)
+    worker_info.update(index=index, pid=os.getpid(), started_at=time.time())
+    cpu_profile.assigned_worker_index = index
+    if not settings.CPU_PROFILE_ENABLED:
+        _set_worker_threads(num_workers)
+    
+    # Warm up after the fork: thread pools created in the master are not fork-safe
+    with model_manager.acquire() as pipeline:
+        pipeline.warm_up()
+    
+    max_requests = None
+    if settings.PREFORK_MAX_REQUESTS:
+        jitter = min(settings.PREFORK_MAX_REQUESTS_JITTER, settings.PREFORK_MAX_REQUESTS // 10)
+        max_requests = settings.PREFORK_MAX_REQUESTS + random.randint(0, jitter)
+    config = uvicorn.Config(
+        app,
+        log_level=settings.LOG_LEVEL.lower(),
+        limit_max_requests=max_requests,
+        timeout_graceful_shutdown=settings.REQUEST_TIMEOUT
+    )
+    server = uvicorn.Server(config)
+    if settings.PREFORK_MAX_PRIVATE_MB:
+        threading.Thread(target=_watch_memory, args=(server,), name="memory-watch", daemon=True).start()
+    
+    logger.info(f"Worker {index} (pid {os.getpid()}) serving, recycle after {max_requests or 'unlimited'} requests")
+    server.run(sockets=[sock])
+
+
+class PreforkServer:
+    """Master process that owns the socket and the loaded models and keeps N workers alive"""
+    
+    def __init__(self, host: str = None, port: int = None, workers: int = None):
+        self.host = host or settings.PREFORK_HOST
+        self.port = port or settings.PREFORK_PORT
+        self.num_workers = workers or settings.PREFORK_WORKERS
+        self.workers: Dict[int, int] = {}  # pid -> worker index
+        self.stopping = False
+        self.sock: Optional[socket.socket] = None
+    
+    def _preload(self):
+        """Load the default models in the master so workers inherit them"""
+        from app.api.endpoints import model_manager, job_store, job_worker
+        
+        # Jobs left running by a previous master are requeued once here, not per worker
+        requeued = job_store.requeue_running()
+        if requeued:
+            logger.info(f"Requeued {requeued} interrupted jobs")
+        job_worker.requeue_on_start = False
+        
+        if settings.DEVICE.startswith("cuda"):
+            # A CUDA context does not survive fork; each worker loads its own copy
+            logger.warning("CUDA device configured: models are loaded per worker, not shared")
+            return
+        
+        start_time = time.time()
+        slot = model_manager.lease()
+        model_manager.release(slot)
+        logger.info(f"Loaded model version {slot.version} in master in {time.time() - start_time:.1f}s")
+        
+        # Keep the GC from writing to the inherited objects, which would un-share their pages
+        gc.collect()
+        gc.freeze()
+    
+    def _spawn(self, index: int):
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                _run_worker(index, self.sock, self.num_workers)
+            except Exception as e:
+                logger.error(f"Worker {index} crashed: {e}")
+                exit_code = 1
+            finally:
+                logging.shutdown()
+                os._exit(exit_code)
+        self.workers[pid] = index
+        logger.info(f"Started worker {index} (pid {pid})")
+    
+    def _handle_stop(self, signum, frame):
+        self.stopping = True
+    
+    def _report_memory(self):
+        master = memory_report(os.getpid())
+        logger.info(f"Master (pid {os.getpid()}): {master}")
+        for pid, index in sorted(self.workers.items(), key=lambda item: item[1]):
+            logger.info(f"Worker {index} (pid {pid}): {memory_report(pid)}")
+    
+    def _stop_workers(self):
+        for pid in self.workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.time() + settings.REQUEST_TIMEOUT + 5
+        while self.workers and time.time() < deadline:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if pid:
+                self.workers.pop(pid, None)
+            else:
+                time.sleep(0.1)
+        for pid in self.workers:
+            logger.warning(f"Killing worker pid {pid}")
+            os.kill(pid, signal.SIGKILL)
+    
+    def run(self):
+        """Preload, bind, fork the workers and supervise them until SIGTERM/SIGINT"""
+        self._preload()
+        
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.host, self.port))
+        self.sock.listen(2048)
+        self.sock.set_inheritable(True)
+        logger.info(f"Master (pid {os.getpid()}) listening on {self.host}:{self.port} with {self.num_workers} workers")
+        
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        for index in range(self.num_workers):
+            self._spawn(index)
+        
+        last_report = time.time()
+        while not self.stopping:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid, status = 0, 0
+            if pid and pid in self.workers:
+                index = self.workers.pop(pid)
+                logger.info(f"Worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}; replacing")
+                if not self.stopping:
+                    self._spawn(index)
+                continue
+            
+            if time.time() - last_report > settings.PREFORK_MEMORY_REPORT_INTERVAL:
+                self._report_memory()
+                last_report = time.time()
+            time.sleep(0.5)
+        
+        logger.info("Stopping workers")
+        self._stop_workers()
+        self.sock.close()
+        logger.info("Master stopped")
+        sys.exit(0)
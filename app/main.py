@@ -5,8 +5,9 @@ import logging
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from app.api.endpoints import router
+from app.api.endpoints import router, job_worker, local_models, start_inference_workers, stop_inference_workers
 from app.core.config import settings
+from app.core.cpu_profile import apply_cpu_profile, configure_executor
 from app.core.logging import loggers
 
 # Setup logging
@@ -68,12 +69,22 @@ async def startup_event():
     """Application startup event"""
     logger.info(f"Starting {settings.PROJECT_NAME} v{settings.VERSION}")
     logger.info(f"API documentation available at /docs")
+    apply_cpu_profile()
+    configure_executor()
+    start_inference_workers()
+    await job_worker.start()
+    if settings.MODEL_WATCH_ENABLED and local_models() is not None:
+        local_models().start_watch()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Application shutdown event"""
     logger.info("Shutting down OCR service")
+    await job_worker.stop()
+    stop_inference_workers()
+    if local_models() is not None:
+        local_models().stop_watch()
 
 
 if __name__ == "__main__":
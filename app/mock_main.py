@@ -7,6 +7,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from app.api.mock_endpoints import router
 from app.core.config import settings
+from app.core.cpu_profile import apply_cpu_profile, configure_executor
 from app.core.logging import loggers
 
 # Setup logging
@@ -68,6 +69,8 @@ async def startup_event():
     """Application startup event"""
     logger.info(f"Starting {settings.PROJECT_NAME} (Mock) v{settings.VERSION}")
     logger.info(f"API documentation available at /docs")
+    apply_cpu_profile()
+    configure_executor()
 
 
 @app.on_event("shutdown")
@@ -2,7 +2,7 @@
 Pydantic models for API request/response schemas
 """
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 
 
@@ -17,7 +17,7 @@ class BoundingBox(BaseModel):
 class DetectedText(BaseModel):
     """Detected text information"""
     class_name: str = Field(..., description="Class name (e.g., 'name', 'id', 'dob')")
-    extracted_text: str = Field(..., description="Extracted text content")
+    extracted_text: Optional[str] = Field(..., description="Extracted text content; null when the deadline stopped recognition before this field")
     bbox: BoundingBox = Field(..., description="Bounding box coordinates")
     confidence: float = Field(..., ge=0.0, le=1.0, description="Detection confidence score")
     class_id: int = Field(..., description="Class ID")
@@ -28,10 +28,13 @@ class ProcessingTiming(BaseModel):
     detection_time: float = Field(..., description="YOLO detection time in seconds")
     ocr_time: float = Field(..., description="OCR processing time in seconds")
     total_time: float = Field(..., description="Total processing time in seconds")
+    stages: Optional[Dict[str, float]] = Field(None, description="Seconds per detection stage when optional stages ran; included in detection_time")
 
 
 class OCRResponse(BaseModel):
     """Main API response"""
+    model_config = ConfigDict(protected_namespaces=())
+    
     success: bool = Field(..., description="Whether processing was successful")
     image_path: str = Field(..., description="Path to processed image")
     total_regions: int = Field(..., description="Total number of detected regions")
@@ -39,6 +42,23 @@ class OCRResponse(BaseModel):
     timing: ProcessingTiming = Field(..., description="Processing timing information")
     timestamp: datetime = Field(default_factory=datetime.now, description="Processing timestamp")
     message: Optional[str] = Field(None, description="Additional message or error info")
+    result_id: Optional[str] = Field(None, description="Identifier for fetching the annotated result image")
+    model_version: Optional[str] = Field(None, description="Version of the models that produced the result")
+    partial: bool = Field(False, description="True when the deadline stopped recognition before every field was read")
+    quality: Optional[Dict[str, Any]] = Field(None, description="Quality gate metrics and issues; rejected images are not processed")
+    image_id: Optional[str] = Field(None, description="Identifier of the cached image for re-reading regions with /recognize")
+
+
+class RecognizeRegion(BaseModel):
+    """Region to re-read in a cached image"""
+    bbox: BoundingBox = Field(..., description="Bounding box in the uploaded image's coordinates")
+    class_name: str = Field(..., description="Detector class of the field, e.g. 'name' or 'id'")
+
+
+class RecognizeRequest(BaseModel):
+    """Region re-recognition request"""
+    image_id: str = Field(..., description="image_id returned by /detect")
+    regions: List[RecognizeRegion] = Field(..., min_length=1, description="Regions to recognize")
 
 
 class ErrorResponse(BaseModel):
@@ -57,3 +77,13 @@ class HealthResponse(BaseModel):
     timestamp: datetime = Field(default_factory=datetime.now, description="Check timestamp")
     uptime: float = Field(..., description="Service uptime in seconds")
 
+
+class JobResponse(BaseModel):
+    """Asynchronous job status"""
+    job_id: str = Field(..., description="Job identifier")
+    status: str = Field(..., description="Job status: queued, running, completed or failed")
+    created_at: datetime = Field(..., description="Time the job was submitted")
+    started_at: Optional[datetime] = Field(None, description="Time processing started")
+    finished_at: Optional[datetime] = Field(None, description="Time processing finished")
+    result: Optional[OCRResponse] = Field(None, description="OCR result when completed")
+    error: Optional[str] = Field(None, description="Error message when failed")
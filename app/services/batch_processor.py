@@ -0,0 +1,226 @@
+"""
+Offline batch processing on top of the OCR pipeline
+"""
+import os
+import glob
+import json
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Set, Optional
+from app.core.config import settings
+from app.utils.image import load_image
+
+logger = logging.getLogger("api")
+
+
+def collect_inputs(source: str) -> List[str]:
+    """
+    Resolve a directory, glob pattern or manifest file into image paths
+    
+    Args:
+        source: Directory, glob pattern, or manifest (.txt with one path per
+            line, or .jsonl with an "image_path" field per line)
+    
+    Returns:
+        Sorted list of image paths
+    """
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            for name in files:
+                if os.path.splitext(name)[1].lower() in settings.ALLOWED_EXTENSIONS:
+                    paths.append(os.path.join(root, name))
+        return sorted(paths)
+    
+    if os.path.isfile(source) and os.path.splitext(source)[1].lower() in (".txt", ".jsonl"):
+        paths = []
+        with open(source, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                paths.append(json.loads(line)["image_path"] if source.endswith(".jsonl") else line)
+        return paths
+    
+    return sorted(glob.glob(source, recursive=True))
+
+
+class BatchProcessor:
+    """Prefetching, batched, resumable image processing"""
+    
+    def __init__(self, pipeline, batch_size: int = None, prefetch_workers: int = None, prefetch_batches: int = None):
+        self.pipeline = pipeline
+        self.batch_size = batch_size or settings.BATCH_SIZE
+        self.prefetch_workers = prefetch_workers or settings.BATCH_PREFETCH_WORKERS
+        self.prefetch_batches = prefetch_batches or settings.BATCH_PREFETCH_BATCHES
+    
+    @staticmethod
+    def journal_path(output_path: str) -> str:
+        """JSONL file that records successfully processed images; the output itself for .jsonl"""
+        if output_path.endswith(".jsonl"):
+            return output_path
+        return output_path + ".partial.jsonl"
+    
+    @staticmethod
+    def failed_path(output_path: str) -> str:
+        """JSONL file listing the images that failed in the latest run"""
+        return os.path.splitext(output_path)[0] + ".failed.jsonl"
+    
+    @staticmethod
+    def load_checkpoint(journal_path: str) -> Set[str]:
+        """
+        Read image paths already processed successfully
+        
+        Failed records are not counted, so they are retried. A truncated
+        last line from a crashed run is dropped from the file.
+        """
+        done = set()
+        if not os.path.exists(journal_path):
+            return done
+        
+        valid_bytes = 0
+        with open(journal_path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    image_path = record["image_path"]
+                except (ValueError, KeyError, TypeError):
+                    break
+                if record.get("success", True):
+                    done.add(image_path)
+                valid_bytes += len(line)
+        
+        if valid_bytes < os.path.getsize(journal_path):
+            logger.warning(f"Dropping truncated record at the end of {journal_path}")
+            with open(journal_path, "r+b") as f:
+                f.truncate(valid_bytes)
+        return done
+    
+    def _process_batch(self, batch: List[tuple]) -> List[Dict[str, Any]]:
+        """Run one batch of (path, image or error) through the pipeline"""
+        records = []
+        decoded = [(path, image) for path, image, error in batch if error is None]
+        for path, _, error in batch:
+            if error is not None:
+                records.append({"image_path": path, "success": False, "message": error})
+        
+        if decoded:
+            paths = [path for path, _ in decoded]
+            try:
+                results = self.pipeline.process_batch([image for _, image in decoded], paths)
+                records.extend(result.model_dump(mode="json") for result in results)
+            except Exception as e:
+                logger.error(f"Batch failed: {e}")
+                records.extend({"image_path": path, "success": False, "message": str(e)} for path in paths)
+        return records
+    
+    @staticmethod
+    def _decode(path: str) -> tuple:
+        try:
+            return path, load_image(path), None
+        except Exception as e:
+            return path, None, str(e)
+    
+    def run(self, image_paths: List[str], output_path: str, progress_every: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Process images and append results to output_path, resuming from a previous run
+        
+        Successful records go to the journal, which is the output for .jsonl
+        and is converted to Parquet after each run for .parquet. Failed
+        records go to failed_path(output_path), rewritten each run, and are
+        retried by the next run.
+        
+        Args:
+            image_paths: Images to process
+            output_path: .jsonl or .parquet output file
+            progress_every: Log throughput every N batches
+        
+        Returns:
+            Summary with counts and images per second
+        """
+        journal_path = self.journal_path(output_path)
+        done = self.load_checkpoint(journal_path)
+        pending = [path for path in image_paths if path not in done]
+        logger.info(f"{len(image_paths)} images, {len(done)} already done, {len(pending)} to process")
+        
+        start_time = time.time()
+        processed = 0
+        failed = 0
+        window = self.batch_size * self.prefetch_batches
+        
+        failed_path = self.failed_path(output_path)
+        with ThreadPoolExecutor(max_workers=self.prefetch_workers) as executor, \
+                open(journal_path, "a", encoding="utf-8") as journal, \
+                open(failed_path, "w", encoding="utf-8") as failures:
+            futures = deque()
+            queued = iter(pending)
+            
+            def fill():
+                for path in queued:
+                    futures.append(executor.submit(self._decode, path))
+                    if len(futures) >= window:
+                        break
+            
+            fill()
+            batch_index = 0
+            while futures:
+                batch = [futures.popleft().result() for _ in range(min(self.batch_size, len(futures)))]
+                fill()
+                
+                batch_start = time.time()
+                records = self._process_batch(batch)
+                batch_failed = 0
+                for record in records:
+                    line = json.dumps(record, ensure_ascii=False) + "\n"
+                    if record.get("success"):
+                        journal.write(line)
+                    else:
+                        failures.write(line)
+                        batch_failed += 1
+                journal.flush()
+                os.fsync(journal.fileno())
+                failures.flush()
+                
+                processed += len(records)
+                failed += batch_failed
+                batch_index += 1
+                if progress_every and batch_index % progress_every == 0:
+                    elapsed = time.time() - start_time
+                    batch_rate = len(records) / max(time.time() - batch_start, 1e-9)
+                    logger.info(f"  {processed}/{len(pending)} images, {processed / elapsed:.2f} img/s "
+                                f"(last batch {batch_rate:.2f} img/s), {failed} failed")
+        
+        elapsed = time.time() - start_time
+        if not failed:
+            os.remove(failed_path)
+        else:
+            logger.warning(f"{failed} images failed; listed in {failed_path} and retried on the next run")
+        if output_path.endswith(".parquet"):
+            self.write_parquet(journal_path, output_path)
+        
+        summary = {
+            "total": len(image_paths),
+            "skipped": len(done),
+            "processed": processed,
+            "failed": failed,
+            "elapsed": elapsed,
+            "images_per_second": processed / elapsed if elapsed > 0 else 0.0
+        }
+        logger.info(f"Done: {processed} images in {elapsed:.1f}s ({summary['images_per_second']:.2f} img/s), {failed} failed")
+        return summary
+    
+    @staticmethod
+    def write_parquet(journal_path: str, output_path: str):
+        """Write every record in the journal to a Parquet file; the journal is kept for resuming"""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError(f"pyarrow is required for Parquet output; results kept in {journal_path}")
+        
+        with open(journal_path, "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        pq.write_table(pa.Table.from_pylist(records), output_path)
+        logger.info(f"Wrote {len(records)} records to {output_path}")
@@ -0,0 +1,396 @@
+"""
+Work queue between API nodes and inference workers (broker mode)
+"""
+import os
+import json
+import time
+import uuid
+import select
+import socket
+import struct
+import logging
+import threading
+import socketserver
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent import futures
+from typing import Dict, Any, List, Hashable, Optional, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger("api")
+
+# Frame: header and payload lengths (big-endian uint32), a JSON header, then the binary payload
+FRAME_HEADER = struct.Struct(">II")
+
+
+class BrokerTask:
+    """One image to process: JSON-serializable metadata and the encoded image"""
+    
+    def __init__(self, meta: Dict[str, Any], payload: bytes, task_id: Optional[str] = None):
+        self.id = task_id or uuid.uuid4().hex
+        self.meta = meta
+        self.payload = payload
+        self.future: Optional[futures.Future] = None
+        self.attempts = 0
+
+
+class Broker(ABC):
+    """
+    Hands tasks from API nodes to inference workers and results back
+    
+    API nodes call submit; workers call fetch and complete. A result is a
+    (meta, payload) pair: the worker's response bytes, or meta["error"] when
+    the task failed. Implementations decide where the queue lives.
+    """
+    
+    @abstractmethod
+    def submit(self, meta: Dict[str, Any], payload: bytes) -> futures.Future:
+        """Enqueue a task; the future resolves to its (meta, payload) result. Cancel it to drop the task."""
+    
+    @abstractmethod
+    def fetch(self, max_tasks: int, timeout: float) -> List[BrokerTask]:
+        """Wait up to timeout for tasks, then take up to max_tasks of them"""
+    
+    @abstractmethod
+    def complete(self, task_id: str, meta: Dict[str, Any], payload: bytes = b""):
+        """Deliver the result of a fetched task"""
+    
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        pass
+
+
+class InProcessBroker(Broker):
+    """
+    Queue in the memory of one process
+    
+    Used directly when API and inference workers share a process, and behind
+    a BrokerServer when they run as separate processes. Tasks taken by a
+    worker that goes away are put back at the head of the queue, up to
+    BROKER_MAX_ATTEMPTS times.
+    """
+    
+    def __init__(self):
+        self._queue: deque = deque()
+        self._assigned: Dict[str, Tuple[BrokerTask, Hashable]] = {}
+        self._workers: Dict[Hashable, float] = {}
+        self._cond = threading.Condition()
+        self.submitted = 0
+        self.completed = 0
+        self.requeued = 0
+        self.dropped = 0
+    
+    def submit(self, meta: Dict[str, Any], payload: bytes) -> futures.Future:
+        task = BrokerTask(meta, payload)
+        task.future = futures.Future()
+        with self._cond:
+            self._queue.append(task)
+            self.submitted += 1
+            self._cond.notify()
+        return task.future
+    
+    def fetch(self, max_tasks: int, timeout: float, owner: Optional[Hashable] = None) -> List[BrokerTask]:
+        """
+        Wait up to timeout for tasks, then take up to max_tasks of them
+        
+        Args:
+            max_tasks: Most tasks to take
+            timeout: Seconds to wait for the first task
+            owner: Worker taking the tasks, see release(); default the calling thread
+        
+        Returns:
+            Tasks in submission order, empty on timeout
+        """
+        owner = owner if owner is not None else threading.get_ident()
+        wait_until = time.monotonic() + timeout
+        tasks = []
+        with self._cond:
+            self._workers[owner] = time.monotonic()
+            while True:
+                while self._queue and len(tasks) < max_tasks:
+                    task = self._queue.popleft()
+                    if task.future.cancelled():
+                        # Nobody waits for the result any more
+                        self.dropped += 1
+                        continue
+                    task.attempts += 1
+                    self._assigned[task.id] = (task, owner)
+                    tasks.append(task)
+                remaining = wait_until - time.monotonic()
+                if tasks or remaining <= 0:
+                    return tasks
+                self._cond.wait(remaining)
+    
+    def complete(self, task_id: str, meta: Dict[str, Any], payload: bytes = b""):
+        with self._cond:
+            entry = self._assigned.pop(task_id, None)
+            if entry is None:
+                return
+            self.completed += 1
+        self._resolve(entry[0], meta, payload)
+    
+    @staticmethod
+    def _resolve(task: BrokerTask, meta: Dict[str, Any], payload: bytes):
+        try:
+            task.future.set_result((meta, payload))
+        except futures.InvalidStateError:
+            pass  # cancelled by the API node in the meantime
+    
+    def release(self, owner: Hashable):
+        """Put back the unfinished tasks of a worker that went away"""
+        with self._cond:
+            self._workers.pop(owner, None)
+            lost = [task for task, task_owner in self._assigned.values() if task_owner == owner]
+            retry = []
+            for task in lost:
+                del self._assigned[task.id]
+                if task.attempts < settings.BROKER_MAX_ATTEMPTS:
+                    retry.append(task)
+            self._queue.extendleft(reversed(retry))
+            self.requeued += len(retry)
+            self._cond.notify_all()
+        
+        for task in lost:
+            if task not in retry:
+                self._resolve(task, {"error": f"Worker lost the task {task.attempts} times"}, b"")
+        if lost:
+            logger.warning(f"Inference worker went away with {len(lost)} tasks; requeued {len(retry)}")
+    
+    def stats(self) -> Dict[str, Any]:
+        alive_after = time.monotonic() - 3 * settings.BROKER_FETCH_TIMEOUT
+        with self._cond:
+            return {
+                "backend": "inprocess",
+                "queued": len(self._queue),
+                "assigned": len(self._assigned),
+                "workers": sum(seen >= alive_after for seen in self._workers.values()),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "requeued": self.requeued,
+                "dropped": self.dropped
+            }
+
+
+def _socket_address(address: str) -> Tuple[int, Any]:
+    """(family, address) for host:port, otherwise a unix socket path"""
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit():
+        return socket.AF_INET, (host, int(port))
+    return socket.AF_UNIX, address
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytearray:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            raise ConnectionError("Broker connection closed")
+        received += count
+    return buffer
+
+
+def write_frame(sock: socket.socket, header: Dict[str, Any], payload: bytes = b""):
+    data = json.dumps(header).encode("utf-8")
+    sock.sendall(FRAME_HEADER.pack(len(data), len(payload)) + data)
+    if payload:
+        sock.sendall(payload)
+
+
+def read_frame(sock: socket.socket) -> Tuple[Dict[str, Any], bytearray]:
+    header_size, payload_size = FRAME_HEADER.unpack(_recv_exactly(sock, FRAME_HEADER.size))
+    header = json.loads(_recv_exactly(sock, header_size))
+    return header, _recv_exactly(sock, payload_size)
+
+
+class _BrokerRequestHandler(socketserver.BaseRequestHandler):
+    """One connection: an API node waiting on a submit, or a worker fetching and completing"""
+    
+    def handle(self):
+        broker: InProcessBroker = self.server.broker
+        owner = id(self)
+        try:
+            while True:
+                header, payload = read_frame(self.request)
+                op = header.get("op")
+                if op == "submit":
+                    self._submit(broker, header["meta"], bytes(payload))
+                elif op == "fetch":
+                    tasks = broker.fetch(header["max_tasks"], header["timeout"], owner)
+                    write_frame(
+                        self.request,
+                        {"tasks": [{"id": task.id, "meta": task.meta, "size": len(task.payload)} for task in tasks]},
+                        b"".join(task.payload for task in tasks)
+                    )
+                elif op == "complete":
+                    broker.complete(header["id"], header["meta"], bytes(payload))
+                elif op == "stats":
+                    write_frame(self.request, broker.stats())
+                else:
+                    raise ValueError(f"Unknown broker operation: {op}")
+        except (ConnectionError, OSError):
+            pass
+        except Exception as e:
+            logger.error(f"Broker connection failed: {e}")
+        finally:
+            broker.release(owner)
+    
+    def _submit(self, broker: InProcessBroker, meta: Dict[str, Any], payload: bytes):
+        future = broker.submit(meta, payload)
+        while True:
+            try:
+                result_meta, result = future.result(timeout=settings.BROKER_FETCH_TIMEOUT)
+                break
+            except futures.TimeoutError:
+                # The submitting connection sends nothing more, so readable means closed
+                readable, _, _ = select.select([self.request], [], [], 0)
+                if readable and not self.request.recv(1, socket.MSG_PEEK):
+                    future.cancel()
+                    raise ConnectionError("API node went away")
+        write_frame(self.request, result_meta, result)
+
+
+class BrokerServer:
+    """Serves an InProcessBroker on a local socket to API nodes and workers in other processes"""
+    
+    def __init__(self, broker: Optional[InProcessBroker] = None, address: Optional[str] = None):
+        self.broker = broker or InProcessBroker()
+        self.address = address or settings.BROKER_ADDRESS
+        self._server: Optional[socketserver.BaseServer] = None
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        family, address = _socket_address(self.address)
+        if family == socket.AF_UNIX:
+            if os.path.exists(address):
+                os.remove(address)  # left over from a previous run
+            server_class = socketserver.ThreadingUnixStreamServer
+        else:
+            server_class = socketserver.ThreadingTCPServer
+            server_class.allow_reuse_address = True
+        self._server = server_class(address, _BrokerRequestHandler)
+        self._server.daemon_threads = True
+        self._server.broker = self.broker
+        self._thread = threading.Thread(target=self._server.serve_forever, name="broker-server", daemon=True)
+        self._thread.start()
+        logger.info(f"Broker listening on {self.address}")
+    
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        family, address = _socket_address(self.address)
+        if family == socket.AF_UNIX and os.path.exists(address):
+            os.remove(address)
+        self._server = None
+
+
+class SocketBroker(Broker):
+    """
+    Client of a BrokerServer
+    
+    Each submit uses its own connection, held open until the result arrives;
+    closing it drops the task. fetch and complete share one persistent
+    connection, so use one client per worker thread.
+    """
+    
+    def __init__(self, address: Optional[str] = None):
+        self.address = address or settings.BROKER_ADDRESS
+        self._conn: Optional[socket.socket] = None
+    
+    def _connect(self) -> socket.socket:
+        family, address = _socket_address(self.address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            sock.connect(address)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+    
+    def submit(self, meta: Dict[str, Any], payload: bytes) -> futures.Future:
+        future = futures.Future()
+        sock = self._connect()
+        write_frame(sock, {"op": "submit", "meta": meta}, payload)
+        
+        def wait_result():
+            try:
+                result_meta, result = read_frame(sock)
+                future.set_result((result_meta, bytes(result)))
+            except futures.InvalidStateError:
+                pass
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                sock.close()
+        
+        def drop_on_cancel(done: futures.Future):
+            # Closing the connection tells the server to drop the task
+            if done.cancelled():
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        
+        future.add_done_callback(drop_on_cancel)
+        threading.Thread(target=wait_result, name="broker-submit", daemon=True).start()
+        return future
+    
+    def _request(self, header: Dict[str, Any], payload: bytes = b"", reply: bool = True):
+        if self._conn is None:
+            self._conn = self._connect()
+        try:
+            write_frame(self._conn, header, payload)
+            return read_frame(self._conn) if reply else None
+        except OSError:
+            self._conn.close()
+            self._conn = None
+            raise
+    
+    def fetch(self, max_tasks: int, timeout: float) -> List[BrokerTask]:
+        header, payload = self._request({"op": "fetch", "max_tasks": max_tasks, "timeout": timeout})
+        tasks, offset = [], 0
+        for item in header["tasks"]:
+            tasks.append(BrokerTask(item["meta"], payload[offset:offset + item["size"]], item["id"]))
+            offset += item["size"]
+        return tasks
+    
+    def complete(self, task_id: str, meta: Dict[str, Any], payload: bytes = b""):
+        self._request({"op": "complete", "id": task_id, "meta": meta}, payload, reply=False)
+    
+    def stats(self) -> Dict[str, Any]:
+        try:
+            sock = self._connect()
+            try:
+                write_frame(sock, {"op": "stats"})
+                stats, _ = read_frame(sock)
+            finally:
+                sock.close()
+        except OSError as e:
+            return {"backend": "socket", "address": self.address, "error": str(e), "workers": 0}
+        return {**stats, "backend": "socket", "address": self.address}
+
+
+def create_broker() -> Broker:
+    """Broker of the configured BROKER_BACKEND"""
+    if settings.BROKER_BACKEND == "inprocess":
+        return InProcessBroker()
+    if settings.BROKER_BACKEND == "socket":
+        return SocketBroker(settings.BROKER_ADDRESS)
+    raise ValueError(f"Unknown broker backend '{settings.BROKER_BACKEND}'. Available: ['inprocess', 'socket']")
+
+
+_broker: Optional[Broker] = None
+_broker_lock = threading.Lock()
+
+
+def get_broker() -> Broker:
+    """The broker shared by this process, created on first use"""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = create_broker()
+        return _broker
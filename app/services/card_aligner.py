@@ -0,0 +1,134 @@
+"""
+Card alignment: warp the card to a canonical upright image using corner detections
+"""
+import time
+import logging
+from typing import Dict, Any, List, Optional
+import cv2
+import numpy as np
+from app.core.config import settings
+from app.utils.boxes import warp_boxes
+
+logger = logging.getLogger("models")
+
+# Corner classes in the order of the canonical destination points
+CORNER_CLASSES = ["top_left", "top_right", "bottom_right", "bottom_left"]
+
+
+class Alignment:
+    """A card warped to the canonical size and the transform that produced it"""
+    
+    def __init__(self, image: np.ndarray, matrix: np.ndarray, source_size: tuple, rotation: int, elapsed: float):
+        self.image = image
+        self.matrix = matrix
+        self.inverse = np.linalg.inv(matrix)
+        self.source_size = source_size  # (width, height) of the original image
+        self.rotation = rotation
+        self.elapsed = elapsed
+    
+    def restore_regions(self, regions: List[Dict[str, Any]]):
+        """Map region bboxes from the aligned image back to the original image, in place"""
+        if not regions:
+            return
+        boxes = warp_boxes([region['bbox'] for region in regions], self.inverse, *self.source_size)
+        for region, box in zip(regions, boxes.tolist()):
+            # In place: extracted results share the bbox lists of their regions
+            region['bbox'][:] = box
+
+
+class CardAligner:
+    """
+    Finds the card corners on a thumbnail and perspective-warps the card
+    
+    Corner classes are labelled relative to the card, so mapping them onto
+    the canonical corners also undoes 90 and 180 degree rotations. With one
+    corner missing the fourth is completed as a parallelogram.
+    """
+    
+    def __init__(self, detector):
+        self.detector = detector
+        self.aligned = 0
+        self.skipped = 0
+    
+    def _find_corners(self, image: np.ndarray) -> Optional[np.ndarray]:
+        """Corner points in original image coordinates, in CORNER_CLASSES order"""
+        height, width = image.shape[:2]
+        scale = min(1.0, settings.ALIGN_THUMBNAIL_SIZE / max(height, width))
+        thumbnail = image
+        if scale < 1.0:
+            thumbnail = cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))),
+                                   interpolation=cv2.INTER_AREA)
+        regions = self.detector.detect_classes(thumbnail, CORNER_CLASSES, settings.ALIGN_THUMBNAIL_SIZE)
+        
+        # Most confident detection per corner, as the box center
+        best: Dict[str, Dict[str, Any]] = {}
+        for region in regions:
+            name = region['class_name']
+            if name not in best or region['confidence'] > best[name]['confidence']:
+                best[name] = region
+        if len(best) < settings.ALIGN_MIN_CORNERS:
+            return None
+        
+        points = np.full((4, 2), np.nan, dtype=np.float32)
+        for i, name in enumerate(CORNER_CLASSES):
+            if name in best:
+                x1, y1, x2, y2 = best[name]['bbox']
+                points[i] = ((x1 + x2) / 2 / scale, (y1 + y2) / 2 / scale)
+        
+        missing = np.flatnonzero(np.isnan(points[:, 0]))
+        if len(missing) == 1:
+            i = missing[0]
+            # The opposite corner plus the two neighbours minus it closes the parallelogram
+            points[i] = points[(i - 1) % 4] + points[(i + 1) % 4] - points[(i + 2) % 4]
+        return points
+    
+    @staticmethod
+    def _is_plausible(points: np.ndarray, width: int, height: int) -> bool:
+        """Convex, clockwise and large enough to be the card"""
+        if not cv2.isContourConvex(points.reshape(-1, 1, 2)):
+            return False
+        x, y = points[:, 0], points[:, 1]
+        # Shoelace area; positive for clockwise order in image coordinates
+        area = 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+        return area >= settings.ALIGN_MIN_AREA_RATIO * width * height
+    
+    def align(self, image: np.ndarray) -> Optional[Alignment]:
+        """
+        Warp the card in an image to ALIGN_CARD_SIZE
+        
+        Args:
+            image: Decoded BGR image
+        
+        Returns:
+            Alignment, or None when the corners were not found; the caller
+            then processes the original image
+        """
+        start_time = time.time()
+        height, width = image.shape[:2]
+        points = self._find_corners(image)
+        if points is None or not self._is_plausible(points, width, height):
+            self.skipped += 1
+            logger.info("Card corners not found; processing the full image")
+            return None
+        
+        card_width, card_height = settings.ALIGN_CARD_SIZE
+        target = np.array(
+            [[0, 0], [card_width - 1, 0], [card_width - 1, card_height - 1], [0, card_height - 1]],
+            dtype=np.float32
+        )
+        matrix = cv2.getPerspectiveTransform(points, target)
+        aligned = cv2.warpPerspective(image, matrix, (card_width, card_height), flags=cv2.INTER_LINEAR)
+        
+        top_edge = points[1] - points[0]
+        rotation = int(round(np.degrees(np.arctan2(top_edge[1], top_edge[0])) / 90.0)) * 90 % 360
+        self.aligned += 1
+        elapsed = time.time() - start_time
+        logger.info(f"Aligned card (rotated {rotation} degrees) to {card_width}x{card_height} in {elapsed:.3f}s")
+        return Alignment(aligned, matrix, (width, height), rotation, elapsed)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "card_size": list(settings.ALIGN_CARD_SIZE),
+            "aligned": self.aligned,
+            "skipped": self.skipped
+        }
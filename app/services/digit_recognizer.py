@@ -0,0 +1,176 @@
+"""
+Small CTC recognizer for fields made only of digits and slashes
+"""
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.utils.crops import prepare_crop_batches
+from app.utils.deadline import Deadline
+
+logger = logging.getLogger("ocr")
+
+# CTC class 0 is the blank; class i is DIGIT_CHARSET[i - 1]
+DIGIT_CHARSET = "0123456789/"
+
+
+def build_digit_model(num_classes: int, image_height: int = 32):
+    """
+    CRNN of four conv blocks and a bidirectional GRU, about 0.5M parameters
+    
+    The conv blocks reduce the height to 2 and the width by 4, so a crop
+    resized to width W gives W / 4 time steps.
+    
+    Args:
+        num_classes: Charset size plus one for the CTC blank
+        image_height: Input height, a multiple of 16
+    
+    Returns:
+        torch.nn.Module mapping (n, 1, H, W) images in [0, 1] to (n, W / 4, num_classes) log-probabilities
+    """
+    import torch.nn as nn
+    
+    def block(in_channels, out_channels, pool):
+        return [
+            nn.Conv2d(in_channels, out_channels, 3, padding=1, bias=False),
+            nn.BatchNorm2d(out_channels),
+            nn.ReLU(inplace=True),
+            nn.MaxPool2d(pool)
+        ]
+    
+    class DigitCRNN(nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.features = nn.Sequential(
+                *block(1, 32, (2, 2)), *block(32, 64, (2, 2)), *block(64, 128, (2, 1)), *block(128, 128, (2, 1))
+            )
+            self.rnn = nn.GRU(128 * (image_height // 16), 96, bidirectional=True, batch_first=True)
+            self.head = nn.Linear(192, num_classes)
+        
+        def forward(self, x):
+            features = self.features(x)
+            n, channels, height, width = features.shape
+            sequence = features.permute(0, 3, 1, 2).reshape(n, width, channels * height)
+            output, _ = self.rnn(sequence)
+            return self.head(output).log_softmax(-1)
+    
+    return DigitCRNN()
+
+
+def ctc_greedy_decode(log_probs: np.ndarray, charset: str) -> List[Tuple[str, float]]:
+    """
+    Best-path CTC decoding
+    
+    Args:
+        log_probs: (n, time steps, classes) log-probabilities, class 0 blank
+        charset: Characters of classes 1..
+    
+    Returns:
+        (text, mean probability of the emitted characters) per row
+    """
+    best = log_probs.argmax(-1)
+    best_probs = np.exp(log_probs.max(-1))
+    outputs = []
+    for path, probs in zip(best, best_probs):
+        keep = (path != 0) & np.concatenate([[True], path[1:] != path[:-1]])
+        text = "".join(charset[index - 1] for index in path[keep].tolist())
+        outputs.append((text, float(probs[keep].mean()) if keep.any() else 0.0))
+    return outputs
+
+
+class DigitRecognizer:
+    """Digit recognizer for the numeric fields routed to it by OCRService"""
+    
+    def __init__(self, weights_path: Optional[str] = None):
+        self.weights_path = weights_path or settings.DIGIT_RECOGNIZER_PATH
+        self.model = None
+        self.charset = DIGIT_CHARSET
+        self.image_height = 32
+        self.min_width = 64
+        self.max_width = 256
+        self._torch = None
+        self._load_model()
+    
+    def _load_model(self):
+        """Load the checkpoint written by test/train_digit_recognizer.py"""
+        try:
+            import torch
+            
+            logger.info(f"Loading digit recognizer from {self.weights_path}")
+            checkpoint = torch.load(self.weights_path, map_location="cpu")
+            self.charset = checkpoint["charset"]
+            self.image_height = checkpoint["image_height"]
+            self.min_width = checkpoint["min_width"]
+            self.max_width = checkpoint["max_width"]
+            self.model = build_digit_model(len(self.charset) + 1, self.image_height)
+            self.model.load_state_dict(checkpoint["state_dict"])
+            self.model.to(settings.DEVICE).eval()
+            self._torch = torch
+            logger.info("Digit recognizer loaded successfully")
+        except Exception as e:
+            logger.error(f"Failed to load digit recognizer: {e}")
+            raise
+    
+    @staticmethod
+    def model_input(batch: np.ndarray) -> np.ndarray:
+        """
+        Grayscale model input for a prepare_crop_batches batch
+        
+        The batch is already scaled to [0, 1], the range the training script
+        renders its samples in, so it is only averaged over the color channels.
+        """
+        return batch.mean(axis=1, keepdims=True).astype(np.float32)
+    
+    def _predict_batch(self, batch: np.ndarray) -> List[Tuple[str, float]]:
+        """Run one prepared (n, 3, H, W) RGB batch in [0, 1]"""
+        with self._torch.inference_mode():
+            tensor = self._torch.from_numpy(self.model_input(batch)).to(settings.DEVICE)
+            log_probs = self.model(tensor).float().cpu().numpy()
+        return ctc_greedy_decode(log_probs, self.charset)
+    
+    def recognize(
+        self,
+        images: List[np.ndarray],
+        boxes_list: List[np.ndarray],
+        deadline: Optional[Deadline] = None
+    ) -> List[Optional[Tuple[str, float]]]:
+        """
+        Recognize the given boxes of several images; same contract as OCRService.recognize
+        
+        Args:
+            images: RGB images
+            boxes_list: Clamped, non-empty boxes per image
+            deadline: Checked before each batch; batches past it are skipped
+                when partial results are allowed
+        
+        Returns:
+            (text, probability) per box in order, None where recognition failed
+            or was skipped
+        """
+        batches = prepare_crop_batches(
+            images, boxes_list, self.image_height, self.min_width, self.max_width, settings.OCR_BATCH_SIZE
+        )
+        recognized: List[Optional[Tuple[str, float]]] = [None] * sum(len(boxes) for boxes in boxes_list)
+        for indices, batch in batches:
+            if deadline is not None and deadline.stop_recognition("recognition"):
+                break
+            try:
+                outputs = self._predict_batch(batch)
+            except Exception as e:
+                logger.warning(f"Digit recognition failed for batch of {len(batch)}: {e}")
+                continue
+            for index, output in zip(indices.tolist(), outputs):
+                recognized[index] = output
+        return recognized
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        return {
+            "weights_path": self.weights_path,
+            "charset": self.charset,
+            "image_height": self.image_height,
+            "parameters": sum(p.numel() for p in self.model.parameters())
+        }
+    
+    def memory_bytes(self) -> int:
+        module = self.model
+        return sum(t.numel() * t.element_size() for t in list(module.parameters()) + list(module.buffers()))
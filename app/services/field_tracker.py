@@ -0,0 +1,154 @@
+"""
+Field tracking across frames to skip recognition of unchanged crops
+"""
+import logging
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Tuple
+import cv2
+import numpy as np
+from app.core.config import settings
+from app.utils.boxes import box_iou
+
+logger = logging.getLogger("ocr")
+
+
+def crop_signature(image: np.ndarray, bbox: List[int]) -> Optional[np.ndarray]:
+    """Small normalized grayscale thumbnail of a crop, insensitive to box jitter"""
+    x1, y1, x2, y2 = bbox
+    crop = image[max(y1, 0):y2, max(x1, 0):x2]
+    if crop.size == 0:
+        return None
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    thumb = cv2.resize(gray, settings.FIELD_SIGNATURE_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+    # Remove brightness and contrast changes so only content changes count
+    return (thumb - thumb.mean()) / (thumb.std() + 1e-6)
+
+
+class FieldTrack:
+    """One field followed across frames, with text votes weighted by confidence"""
+    
+    def __init__(self, track_id: int, region: Dict[str, Any], signature: Optional[np.ndarray]):
+        self.track_id = track_id
+        self.class_name = region['class_name']
+        self.bbox = region['bbox']
+        self.signature = signature
+        self.votes: Dict[str, float] = defaultdict(float)
+        self.observations = 0
+        self.last_seen = 0
+    
+    def add_text(self, text: str, confidence: float):
+        if text:
+            self.votes[text] += confidence
+            self.observations += 1
+    
+    def best(self) -> Tuple[str, float]:
+        """Text with the highest summed confidence, scored over all observations"""
+        if not self.votes:
+            return '', 0.0
+        text, score = max(self.votes.items(), key=lambda item: item[1])
+        return text, score / self.observations
+
+
+class FieldTracker:
+    """Associates detected fields across frames and recognizes only changed crops"""
+    
+    def __init__(self):
+        self.tracks: List[FieldTrack] = []
+        self.frame = 0
+        self.next_id = 1
+        self.recognized = 0
+        self.skipped = 0
+    
+    def _match(self, regions: List[Dict[str, Any]]) -> List[Optional[FieldTrack]]:
+        """Greedy highest-IoU matching of regions to existing tracks of the same class"""
+        pairs = []
+        for i, region in enumerate(regions):
+            for track in self.tracks:
+                if track.class_name != region['class_name']:
+                    continue
+                iou = box_iou(region['bbox'], track.bbox)
+                if iou >= settings.FIELD_TRACK_IOU:
+                    pairs.append((iou, i, track))
+        
+        matches: List[Optional[FieldTrack]] = [None] * len(regions)
+        used = set()
+        for _, i, track in sorted(pairs, key=lambda pair: pair[0], reverse=True):
+            if matches[i] is None and track.track_id not in used:
+                matches[i] = track
+                used.add(track.track_id)
+        return matches
+    
+    @staticmethod
+    def _changed(track: FieldTrack, signature: Optional[np.ndarray]) -> bool:
+        if track.signature is None or signature is None or not track.votes:
+            return True
+        return float(np.abs(signature - track.signature).mean()) > settings.FIELD_CHANGE_THRESHOLD
+    
+    def update(self, image: np.ndarray, text_regions: List[Dict[str, Any]], ocr_service) -> Tuple[List[Dict[str, Any]], float]:
+        """
+        Recognize the fields of one frame, reusing results for unchanged crops
+        
+        Args:
+            image: Decoded BGR frame
+            text_regions: Text regions from YOLO for this frame
+            ocr_service: Service used for the regions that need recognition
+        
+        Returns:
+            Tuple of (extracted_results with fused text, ocr_time)
+        """
+        self.frame += 1
+        matches = self._match(text_regions)
+        
+        tracks = []
+        pending = []
+        for region, track in zip(text_regions, matches):
+            signature = crop_signature(image, region['bbox'])
+            if track is None:
+                track = FieldTrack(self.next_id, region, signature)
+                self.next_id += 1
+                self.tracks.append(track)
+                pending.append((region, track))
+            elif self._changed(track, signature):
+                track.signature = signature
+                pending.append((region, track))
+            track.bbox = region['bbox']
+            track.last_seen = self.frame
+            tracks.append(track)
+        
+        ocr_time = 0.0
+        if pending:
+            extracted_results, ocr_time = ocr_service.extract_text_from_regions(
+                image, [region for region, _ in pending]
+            )
+            for (_, track), result in zip(pending, extracted_results):
+                track.add_text(result['extracted_text'], result['ocr_confidence'])
+        
+        self.recognized += len(pending)
+        self.skipped += len(text_regions) - len(pending)
+        self.tracks = [
+            track for track in self.tracks
+            if self.frame - track.last_seen <= settings.FIELD_TRACK_MAX_AGE
+        ]
+        logger.debug(f"Tracker frame {self.frame}: {len(pending)} recognized, "
+                     f"{len(text_regions) - len(pending)} reused")
+        
+        fused_results = []
+        for region, track in zip(text_regions, tracks):
+            text, confidence = track.best()
+            fused_results.append({
+                'bbox': region['bbox'],
+                'extracted_text': text,
+                'yolo_confidence': region['confidence'],
+                'ocr_confidence': confidence,
+                'class_id': region['class_id'],
+                'class_name': region['class_name'],
+                'track_id': track.track_id
+            })
+        return fused_results, ocr_time
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tracks": len(self.tracks),
+            "recognized": self.recognized,
+            "skipped": self.skipped
+        }
@@ -0,0 +1,72 @@
+"""
+Session cache of uploaded images for region re-recognition
+"""
+import uuid
+import logging
+from typing import Optional, Dict, Any, Union
+import numpy as np
+from app.utils.cache import LRUCache
+from app.utils.image import decode_image
+from app.core.config import settings
+
+logger = logging.getLogger("api")
+
+
+def _entry_size(entry: Union[bytes, np.ndarray]) -> int:
+    return entry.nbytes if isinstance(entry, np.ndarray) else len(entry)
+
+
+class ImageCache:
+    """
+    Keeps recent uploads under an image id so /recognize can re-read regions
+    
+    /detect stores the uploaded bytes, /detect/raw the image it already
+    decoded; an encoded entry is decoded on its first lookup and kept
+    decoded, so later re-reads skip the upload, the decode and detection.
+    Entries expire IMAGE_CACHE_TTL seconds after their last use.
+    """
+    
+    def __init__(self):
+        self.images = LRUCache(
+            settings.IMAGE_CACHE_MAX_ITEMS,
+            settings.IMAGE_CACHE_MAX_BYTES,
+            sizeof=_entry_size,
+            ttl=settings.IMAGE_CACHE_TTL
+        )
+        self.decodes = 0
+    
+    def add(self, file_content: bytes, image: Optional[np.ndarray] = None) -> str:
+        """
+        Store an upload and return its image id
+        
+        Args:
+            file_content: Uploaded image bytes
+            image: The decoded BGR image when the caller already has it
+        """
+        image_id = uuid.uuid4().hex
+        self.images.put(image_id, image if image is not None else file_content)
+        return image_id
+    
+    def get(self, image_id: str) -> Optional[np.ndarray]:
+        """
+        Decoded BGR image for an image id
+        
+        Returns:
+            The image, or None if the id is unknown or expired
+        """
+        entry = self.images.get(image_id)
+        if entry is None or isinstance(entry, np.ndarray):
+            return entry
+        
+        image = decode_image(entry)
+        self.images.put(image_id, image)
+        self.decodes += 1
+        logger.info(f"Decoded cached image {image_id} ({image.shape[1]}x{image.shape[0]})")
+        return image
+    
+    def stats(self) -> Dict[str, Any]:
+        return {**self.images.stats(), "decodes": self.decodes}
+
+
+# Global image cache instance
+image_cache = ImageCache()
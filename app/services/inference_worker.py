@@ -0,0 +1,176 @@
+"""
+Inference worker for broker mode: runs batches of broker tasks through local models
+"""
+import time
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from app.services.broker import Broker, BrokerTask
+from app.services.model_registry import ModelRegistry
+from app.core.config import settings
+from app.utils.deadline import Deadline, RequestAborted
+from app.utils.image import decode_image
+
+logger = logging.getLogger("models")
+
+
+def encode_task_image(image: np.ndarray) -> Tuple[Dict[str, Any], bytes]:
+    """Task metadata and payload for an already decoded image, sent without re-encoding"""
+    image = np.ascontiguousarray(image)
+    return {"encoding": "raw", "shape": list(image.shape), "dtype": str(image.dtype)}, image.tobytes()
+
+
+def decode_task_image(meta: Dict[str, Any], payload: bytes) -> np.ndarray:
+    """Decoded BGR image of a task, from raw pixels or encoded file bytes"""
+    if meta.get("encoding") == "raw":
+        return np.frombuffer(payload, dtype=meta["dtype"]).reshape(meta["shape"])
+    return decode_image(payload)
+
+
+class InferenceWorker:
+    """
+    Takes batches of tasks from a broker and runs them through the pipeline
+    
+    After the first task arrives the worker waits up to BROKER_BATCH_WAIT
+    for more, so concurrent uploads from any API node share one detection
+    call. Tasks are grouped by model variant; a group shares one deadline,
+    the latest of its tasks, and each API node enforces its own.
+    """
+    
+    def __init__(self, broker: Broker, registry: ModelRegistry, batch_size: int = None, batch_wait: float = None):
+        self.broker = broker
+        self.registry = registry
+        self.batch_size = batch_size or settings.BROKER_BATCH_SIZE
+        self.batch_wait = batch_wait if batch_wait is not None else settings.BROKER_BATCH_WAIT
+        self.batches = 0
+        self.processed = 0
+        self.failed = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        """Run the worker loop in a background thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="inference-worker", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: float = None):
+        """Stop after the current batch"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def run(self):
+        """Fetch and process batches until stopped"""
+        logger.info(f"Inference worker started (batch size {self.batch_size})")
+        while not self._stop.is_set():
+            try:
+                tasks = self._fetch()
+                if tasks:
+                    self.process(tasks)
+            except OSError as e:
+                # The broker puts back tasks of a lost connection
+                logger.warning(f"Broker unavailable: {e}")
+                self._stop.wait(settings.BROKER_FETCH_TIMEOUT)
+        logger.info("Inference worker stopped")
+    
+    def _fetch(self) -> List[BrokerTask]:
+        tasks = self.broker.fetch(self.batch_size, settings.BROKER_FETCH_TIMEOUT)
+        fill_until = time.monotonic() + self.batch_wait
+        while tasks and len(tasks) < self.batch_size:
+            remaining = fill_until - time.monotonic()
+            if remaining <= 0:
+                break
+            more = self.broker.fetch(self.batch_size - len(tasks), remaining)
+            if not more:
+                break
+            tasks.extend(more)
+        return tasks
+    
+    def process(self, tasks: List[BrokerTask]):
+        """Run fetched tasks, one pipeline call per model variant, and deliver the results"""
+        self.batches += 1
+        groups: Dict[tuple, List[BrokerTask]] = {}
+        for task in tasks:
+            groups.setdefault((task.meta.get("detector"), task.meta.get("recognizer")), []).append(task)
+        for (detector, recognizer), group in groups.items():
+            self._process_group(detector, recognizer, group)
+    
+    def _process_group(self, detector: Optional[str], recognizer: Optional[str], tasks: List[BrokerTask]):
+        runnable, images = [], []
+        now = time.time()
+        for task in tasks:
+            expires_at = task.meta.get("expires_at")
+            if expires_at is not None and expires_at <= now:
+                self._fail(task, RequestAborted("deadline", "queue"))
+                continue
+            try:
+                images.append(decode_task_image(task.meta, task.payload))
+                runnable.append(task)
+            except Exception as e:
+                self._fail(task, e)
+        if not runnable:
+            return
+        
+        deadline = None
+        expiries = [task.meta.get("expires_at") for task in runnable]
+        if None not in expiries:
+            deadline = Deadline(
+                max(expiries) - time.time(),
+                allow_partial=all(task.meta.get("allow_partial", True) for task in runnable)
+            )
+        
+        # Region re-reads skip detection, so they run one by one beside the batch
+        rereads = [i for i, task in enumerate(runnable) if "regions" in task.meta]
+        for i in rereads:
+            self._recognize(runnable[i], images[i], deadline)
+        runnable = [task for i, task in enumerate(runnable) if i not in rereads]
+        images = [image for i, image in enumerate(images) if i not in rereads]
+        if not runnable:
+            return
+        
+        try:
+            with self.registry.acquire(detector, recognizer) as pipeline:
+                results = pipeline.process_batch(images, [task.meta["filename"] for task in runnable], deadline)
+        except Exception as e:
+            logger.error(f"Inference batch of {len(runnable)} tasks failed: {e}")
+            for task in runnable:
+                self._fail(task, e)
+            return
+        
+        for task, result in zip(runnable, results):
+            self.broker.complete(task.id, {}, result.model_dump_json().encode("utf-8"))
+        self.processed += len(runnable)
+    
+    def _recognize(self, task: BrokerTask, image: np.ndarray, deadline: Optional[Deadline]):
+        """Run a region re-read task"""
+        try:
+            with self.registry.acquire(task.meta.get("detector"), task.meta.get("recognizer")) as pipeline:
+                result = pipeline.recognize_regions(image, task.meta["filename"], task.meta["regions"], deadline)
+        except Exception as e:
+            logger.error(f"Region re-read task failed: {e}")
+            self._fail(task, e)
+            return
+        self.broker.complete(task.id, {}, result.model_dump_json().encode("utf-8"))
+        self.processed += 1
+    
+    def _fail(self, task: BrokerTask, error: Exception):
+        self.failed += 1
+        meta = {"error": str(error)}
+        if isinstance(error, RequestAborted):
+            meta.update(aborted=error.reason, stage=error.stage)
+        elif isinstance(error, ValueError):
+            meta.update(invalid=True)
+        self.broker.complete(task.id, meta)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "processed": self.processed,
+            "failed": self.failed,
+            "mean_batch_size": (self.processed + self.failed) / self.batches if self.batches else 0.0
+        }
@@ -0,0 +1,163 @@
+"""
+Persistent SQLite store for asynchronous OCR jobs
+"""
+import os
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, Optional
+from app.core.config import settings
+
+logger = logging.getLogger("api")
+
+
+class JobStore:
+    """SQLite-backed job queue and result store"""
+    
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or settings.JOBS_DB_PATH
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self._create_tables()
+    
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """Connection for this process; a forked worker opens its own"""
+        if self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._connection.row_factory = sqlite3.Row
+            self._pid = os.getpid()
+        return self._connection
+    
+    def _create_tables(self):
+        """Create the jobs table if it doesn't exist"""
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    image_path TEXT NOT NULL,
+                    callback_url TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "attempts" not in columns:
+                # Databases created before attempts were counted
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+    
+    def create(self, filename: str, image_path: str, callback_url: Optional[str] = None, job_id: str = None) -> Dict[str, Any]:
+        """Insert a new queued job"""
+        job_id = job_id or uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, filename, image_path, callback_url, created_at) VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, filename, image_path, callback_url, time.time())
+            )
+        return self.get(job_id)
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job by id"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+    
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job to running and count the attempt"""
+        try:
+            with self._lock, self._conn:
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    return None
+                started_at = time.time()
+                # Another worker process may have claimed it since the SELECT
+                claimed = self._conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1 "
+                    "WHERE id = ? AND status = 'queued'",
+                    (started_at, row["id"])
+                ).rowcount
+                if not claimed:
+                    return None
+        except sqlite3.OperationalError as e:
+            # Lost a write race with another worker process; retry on the next poll
+            logger.debug(f"Job claim contended: {e}")
+            return None
+        job = dict(row)
+        job.update(status="running", started_at=started_at, attempts=job["attempts"] + 1)
+        return job
+    
+    def complete(self, job_id: str, result: str):
+        """Store a successful result (JSON text)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'completed', result = ?, finished_at = ? WHERE id = ?",
+                (result, time.time(), job_id)
+            )
+    
+    def fail(self, job_id: str, error: str):
+        """Mark a job as failed"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                (error, time.time(), job_id)
+            )
+    
+    def requeue_running(self, max_attempts: int = None) -> int:
+        """
+        Put jobs interrupted by a restart back in the queue
+        
+        Jobs already started max_attempts times are marked failed instead, so
+        a job that takes the worker down every time is not retried forever.
+        
+        Returns:
+            Number of jobs requeued
+        """
+        max_attempts = settings.JOB_MAX_ATTEMPTS if max_attempts is None else max_attempts
+        with self._lock, self._conn:
+            gave_up = self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE status = 'running' AND attempts >= ?",
+                (f"Interrupted {max_attempts} times; not retried", time.time(), max_attempts)
+            ).rowcount
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'"
+            )
+        if gave_up:
+            logger.warning(f"Failed {gave_up} jobs interrupted {max_attempts} times")
+        return cursor.rowcount
+    
+    def expire(self, ttl: int = None) -> int:
+        """Delete finished jobs older than ttl seconds"""
+        ttl = settings.JOB_RESULT_TTL if ttl is None else ttl
+        cutoff = time.time() - ttl
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('completed', 'failed') AND finished_at < ?",
+                (cutoff,)
+            )
+        return cursor.rowcount
+    
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,173 @@
+"""
+Background worker that drains the asynchronous job queue
+"""
+import os
+import json
+import time
+import socket
+import asyncio
+import logging
+import ipaddress
+import urllib.parse
+import urllib.request
+from typing import Dict, Any, Optional, Set
+from app.services.job_store import JobStore
+from app.services.model_manager import ModelManager
+from app.services.priority_scheduler import PriorityScheduler
+from app.core.config import settings
+from app.utils.deadline import Deadline
+
+logger = logging.getLogger("api")
+
+
+def check_callback_url(callback_url: str):
+    """
+    Reject callback URLs that could reach internal services
+    
+    The host must be in JOB_CALLBACK_ALLOWED_HOSTS when that list is set,
+    and must never resolve to a private, loopback, link-local or otherwise
+    non-public address.
+    
+    Raises:
+        ValueError: If the URL is not an allowed public http(s) URL
+    """
+    parsed = urllib.parse.urlparse(callback_url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError("callback_url must be an http(s) URL")
+    host = parsed.hostname.lower()
+    if settings.JOB_CALLBACK_ALLOWED_HOSTS and host not in settings.JOB_CALLBACK_ALLOWED_HOSTS:
+        raise ValueError(f"callback_url host '{host}' is not allowed")
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, parsed.port or None, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError) as e:
+        raise ValueError(f"callback_url host '{host}' cannot be resolved: {e}")
+    for address in addresses:
+        if not ipaddress.ip_address(address.split("%")[0]).is_global:
+            raise ValueError(f"callback_url host '{host}' resolves to non-public address {address}")
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Callbacks are not redirected, so a checked URL cannot bounce to an internal one"""
+    
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_callback_opener = urllib.request.build_opener(_NoRedirect)
+
+
+class JobWorker:
+    """Runs queued jobs through the OCR pipeline at a bounded concurrency"""
+    
+    def __init__(self, store: JobStore, models: ModelManager, scheduler: PriorityScheduler = None, concurrency: int = None):
+        self.store = store
+        self.models = models
+        self.scheduler = scheduler or PriorityScheduler()
+        if settings.JOB_PRIORITY_LANE not in self.scheduler.lanes:
+            raise ValueError(f"Unknown JOB_PRIORITY_LANE '{settings.JOB_PRIORITY_LANE}'. Available: {sorted(self.scheduler.lanes)}")
+        self.concurrency = concurrency or settings.JOB_WORKER_CONCURRENCY
+        self._task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+        self._last_expire = 0.0
+        self.requeue_on_start = True  # off in prefork workers; the master requeues once
+    
+    async def start(self):
+        """Start the worker loop"""
+        if self._task is not None:
+            return
+        loop = asyncio.get_running_loop()
+        if self.requeue_on_start:
+            requeued = await loop.run_in_executor(None, self.store.requeue_running)
+            if requeued:
+                logger.info(f"Requeued {requeued} interrupted jobs")
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Job worker started with concurrency {self.concurrency}")
+    
+    async def stop(self):
+        """Stop the worker loop and wait for running jobs"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        logger.info("Job worker stopped")
+    
+    async def _run(self):
+        """Claim jobs while there is capacity, expire old results periodically"""
+        # SQLite calls run in the executor so a locked database never stalls the event loop
+        loop = asyncio.get_running_loop()
+        while True:
+            if time.time() - self._last_expire > 60:
+                self._last_expire = time.time()
+                expired = await loop.run_in_executor(None, self.store.expire)
+                if expired:
+                    logger.info(f"Expired {expired} finished jobs")
+            
+            job = None
+            if len(self._running) < self.concurrency:
+                job = await loop.run_in_executor(None, self.store.claim_next)
+            if job is None:
+                await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+                continue
+            
+            task = asyncio.create_task(self._process(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+    
+    def _run_pipeline(self, image_path: str, deadline: Deadline):
+        with self.models.acquire() as pipeline:
+            return pipeline.process_image(image_path, deadline)
+    
+    async def _process(self, job: Dict[str, Any]):
+        """Run one job and record its outcome"""
+        loop = asyncio.get_running_loop()
+        logger.info(f"Processing job {job['id']} ({job['filename']})")
+        try:
+            async with self.scheduler.slot(settings.JOB_PRIORITY_LANE):
+                # Jobs have no client waiting, but a lost broker task must still end
+                deadline = Deadline(settings.JOB_TIMEOUT, allow_partial=False)
+                result = await loop.run_in_executor(None, self._run_pipeline, job["image_path"], deadline)
+            await loop.run_in_executor(None, self.store.complete, job["id"], result.model_dump_json())
+        except Exception as e:
+            logger.error(f"Job {job['id']} failed: {e}")
+            await loop.run_in_executor(None, self.store.fail, job["id"], str(e))
+        finally:
+            try:
+                os.remove(job["image_path"])
+            except OSError:
+                pass
+        
+        if job["callback_url"]:
+            await loop.run_in_executor(None, self._send_callback, job["id"], job["callback_url"])
+    
+    def _send_callback(self, job_id: str, callback_url: str):
+        """POST the finished job to the client's callback URL"""
+        try:
+            # Checked again at send time in case the host now resolves elsewhere
+            check_callback_url(callback_url)
+        except ValueError as e:
+            logger.warning(f"Callback for job {job_id} refused: {e}")
+            return
+        
+        job = self.store.get(job_id)
+        payload = {
+            "job_id": job_id,
+            "status": job["status"],
+            "result": json.loads(job["result"]) if job["result"] else None,
+            "error": job["error"]
+        }
+        request = urllib.request.Request(
+            callback_url,
+            data=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json"}
+        )
+        try:
+            with _callback_opener.open(request, timeout=settings.JOB_CALLBACK_TIMEOUT) as response:
+                logger.info(f"Callback for job {job_id} returned {response.status}")
+        except Exception as e:
+            logger.warning(f"Callback for job {job_id} to {callback_url} failed: {e}")
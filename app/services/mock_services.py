@@ -1,18 +1,131 @@
 """
 Mock services for testing FastAPI structure without AI dependencies
 """
+import glob
+import json
+import math
 import time
+import random
+import hashlib
 import logging
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, Optional, Union
+import numpy as np
 from app.core.config import settings
+from app.utils.deadline import Deadline
+from app.utils.image import describe_image
 
 logger = logging.getLogger("models")
 
 
+class MockLatencyModel:
+    """Samples and spends mock processing time"""
+    
+    def __init__(self):
+        self.mode = settings.MOCK_LATENCY_MODE
+        self.distribution = settings.MOCK_LATENCY_DISTRIBUTION
+        self.cv = settings.MOCK_LATENCY_CV
+        self.hold_gil = settings.MOCK_CPU_HOLD_GIL
+        self._rng = random.Random()
+        self._matrix = np.random.rand(64, 64).astype(np.float32)
+    
+    def sample(self, mean: float) -> float:
+        """Sample a duration with the given mean from the configured distribution"""
+        if mean <= 0:
+            return 0.0
+        if self.distribution == "normal":
+            return max(0.0, self._rng.gauss(mean, self.cv * mean))
+        if self.distribution == "lognormal":
+            sigma2 = math.log(1 + self.cv ** 2)
+            return self._rng.lognormvariate(math.log(mean) - sigma2 / 2, math.sqrt(sigma2))
+        if self.distribution == "exponential":
+            return self._rng.expovariate(1.0 / mean)
+        return mean
+    
+    def spend(self, duration: float) -> float:
+        """
+        Spend the given duration sleeping or burning CPU
+        
+        Returns:
+            Actual elapsed time in seconds
+        """
+        start_time = time.time()
+        if duration <= 0:
+            return 0.0
+        
+        if self.mode == "sleep":
+            time.sleep(duration)
+        elif self.hold_gil:
+            # Pure-Python spin keeps the GIL like Python-heavy pre/post-processing
+            deadline = start_time + duration
+            x = 0
+            while time.time() < deadline:
+                for i in range(1000):
+                    x += i * i
+        else:
+            # numpy matmuls release the GIL and load cores like torch kernels
+            deadline = start_time + duration
+            m = self._matrix
+            while time.time() < deadline:
+                m = np.tanh(m @ self._matrix)
+        
+        return time.time() - start_time
+    
+    def info(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "distribution": self.distribution,
+            "cv": self.cv,
+            "hold_gil": self.hold_gil
+        }
+
+
+class MockReplayStore:
+    """Regions and timings recorded in output/*.json, replayed per image"""
+    
+    def __init__(self, pattern: str = None):
+        self.pattern = pattern or settings.MOCK_REPLAY_GLOB
+        self.records = []
+        for path in sorted(glob.glob(self.pattern)):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.records.append(json.load(f))
+            except Exception as e:
+                logger.warning(f"Skipping replay record {path}: {e}")
+        
+        if not self.records:
+            raise ValueError(f"No replay records found for {self.pattern}")
+        logger.info(f"Loaded {len(self.records)} replay records from {self.pattern}")
+    
+    def pick(self, image: Union[str, np.ndarray]) -> Dict[str, Any]:
+        """Pick a record deterministically from the image content"""
+        if isinstance(image, np.ndarray):
+            digest = hashlib.md5(image.tobytes()).digest()
+        else:
+            with open(image, "rb") as f:
+                digest = hashlib.md5(f.read()).digest()
+        return self.records[int.from_bytes(digest[:4], "little") % len(self.records)]
+    
+    @staticmethod
+    def to_regions(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Convert recorded results into YOLO region dicts"""
+        return [
+            {
+                'id': i + 1,
+                'bbox': result['bbox'],
+                'confidence': result['yolo_confidence'],
+                'class_id': result['class_id'],
+                'class_name': result['class_name'],
+                'extracted_text': result['extracted_text'],
+                'ocr_time': record['timing']['ocr_time'] / max(1, len(record['results']))
+            }
+            for i, result in enumerate(record['results'])
+        ]
+
+
 class MockYOLOService:
     """Mock YOLO service for testing"""
     
-    def __init__(self):
+    def __init__(self, latency: Optional[MockLatencyModel] = None, replay: Optional[MockReplayStore] = None):
         self.class_names = {
             0: "bhyt", 1: "cccd", 2: "current_place1", 3: "current_place2",
             4: "dob", 5: "expire_date", 6: "gender", 7: "id", 8: "id_",
@@ -20,15 +133,17 @@ class MockYOLOService:
             13: "nationality", 14: "origin_place1", 15: "origin_place2", 16: "personal_identifi"
         }
         self.text_class_ids = [2, 3, 4, 6, 7, 12, 13]
+        self.latency = latency or MockLatencyModel()
+        self.replay = replay
         logger.info("Mock YOLO service initialized")
     
-    def detect_text_regions(self, image_path: str) -> Tuple[List[Dict[str, Any]], float, List[Dict[str, Any]]]:
-        """Mock text detection"""
-        logger.info(f"Mock YOLO detecting text regions in {image_path}")
-        time.sleep(0.1)  # Simulate processing time
+    def _mock_regions(self, image: Union[str, np.ndarray]) -> List[Dict[str, Any]]:
+        """Regions for one image, replayed or fixed"""
+        if self.replay is not None:
+            return self.replay.to_regions(self.replay.pick(image))
         
         # Mock detected regions
-        mock_regions = [
+        return [
             {
                 'id': 1,
                 'bbox': [100, 50, 300, 80],
@@ -44,8 +159,29 @@ class MockYOLOService:
                 'class_name': 'id'
             }
         ]
-        
-        return mock_regions, 0.1, mock_regions
+    
+    def _detection_cost(self, images: List[Union[str, np.ndarray]]) -> float:
+        """Replayed detection time, or one sampled detection per image"""
+        if self.replay is not None:
+            return sum(self.replay.pick(image)['timing']['detection_time'] for image in images)
+        return sum(self.latency.sample(settings.MOCK_DETECTION_TIME) for _ in images)
+    
+    def detect_text_regions(self, image: Union[str, np.ndarray]) -> Tuple[List[Dict[str, Any]], float, List[Dict[str, Any]]]:
+        """Mock text detection"""
+        logger.info(f"Mock YOLO detecting text regions in {describe_image(image)}")
+        detection_time = self.latency.spend(self._detection_cost([image]))
+        mock_regions = self._mock_regions(image)
+        return mock_regions, detection_time, mock_regions
+    
+    def detect_text_regions_batch(self, images: List[np.ndarray]) -> Tuple[List[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]], float]:
+        """Mock batch text detection"""
+        logger.info(f"Mock YOLO detecting text regions in batch of {len(images)} images")
+        detection_time = self.latency.spend(self._detection_cost(images))
+        regions = []
+        for image in images:
+            mock_regions = self._mock_regions(image)
+            regions.append((mock_regions, mock_regions))
+        return regions, detection_time
     
     def get_model_info(self) -> Dict[str, Any]:
         return {
@@ -53,40 +189,85 @@ class MockYOLOService:
             "num_classes": len(self.class_names),
             "class_names": self.class_names,
             "text_class_ids": self.text_class_ids,
-            "text_labels": settings.TEXT_LABELS
+            "text_labels": settings.TEXT_LABELS,
+            "latency": self.latency.info(),
+            "replay_records": len(self.replay.records) if self.replay else 0
         }
 
 
 class MockOCRService:
     """Mock OCR service for testing"""
     
-    def __init__(self):
+    def __init__(self, latency: Optional[MockLatencyModel] = None):
+        self.latency = latency or MockLatencyModel()
+        self.batch_size = settings.MOCK_OCR_BATCH_SIZE
         logger.info("Mock OCR service initialized")
     
-    def extract_text_from_regions(self, image_path: str, text_regions: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], float]:
-        """Mock text extraction"""
-        logger.info(f"Mock OCR extracting text from {len(text_regions)} regions")
-        time.sleep(0.2)  # Simulate processing time
+    def _recognition_cost(self, text_regions: List[Dict[str, Any]]) -> float:
+        """Per-batch overhead plus per-region cost, or the replayed per-region time"""
+        if text_regions and all('ocr_time' in region for region in text_regions):
+            return sum(region['ocr_time'] for region in text_regions)
+        
+        num_batches = math.ceil(len(text_regions) / self.batch_size)
+        cost = sum(self.latency.sample(settings.MOCK_OCR_BATCH_OVERHEAD) for _ in range(num_batches))
+        cost += sum(self.latency.sample(settings.MOCK_OCR_TIME_PER_REGION) for _ in text_regions)
+        return cost
+    
+    def extract_text_from_images(
+        self,
+        images: List[Union[str, np.ndarray]],
+        text_regions_list: List[List[Dict[str, Any]]],
+        deadline: Optional[Deadline] = None
+    ) -> Tuple[List[List[Dict[str, Any]]], float]:
+        """Mock text extraction for several images in shared batches"""
+        all_regions = [region for text_regions in text_regions_list for region in text_regions]
+        logger.info(f"Mock OCR extracting text from {len(all_regions)} regions in {len(images)} images")
+        
+        # Spend batch by batch so deadlines are checked where the real service checks them
+        ocr_time = 0.0
+        recognized = 0
+        for start in range(0, len(all_regions), self.batch_size):
+            if deadline is not None and deadline.stop_recognition("recognition"):
+                break
+            ocr_time += self.latency.spend(self._recognition_cost(all_regions[start:start + self.batch_size]))
+            recognized = min(len(all_regions), start + self.batch_size)
         
         # Mock extracted results
-        mock_results = []
-        for region in text_regions:
-            mock_text = f"Mock text for {region['class_name']}"
-            mock_results.append({
-                'bbox': region['bbox'],
-                'extracted_text': mock_text,
-                'yolo_confidence': region['confidence'],
-                'ocr_confidence': 0.95,
-                'class_id': region['class_id'],
-                'class_name': region['class_name']
-            })
+        mock_results_list = []
+        remaining = recognized
+        for text_regions in text_regions_list:
+            mock_results = []
+            for region in text_regions:
+                # Regions past the deadline are returned without text, as in OCRService
+                mock_text = region.get('extracted_text', f"Mock text for {region['class_name']}") if remaining else None
+                remaining = max(0, remaining - 1)
+                mock_results.append({
+                    'bbox': region['bbox'],
+                    'extracted_text': mock_text,
+                    'yolo_confidence': region['confidence'],
+                    'ocr_confidence': 0.95 if mock_text is not None else 0.0,
+                    'class_id': region['class_id'],
+                    'class_name': region['class_name']
+                })
+            mock_results_list.append(mock_results)
         
-        return mock_results, 0.2
+        return mock_results_list, ocr_time
+    
+    def extract_text_from_regions(
+        self,
+        image: Union[str, np.ndarray],
+        text_regions: List[Dict[str, Any]],
+        deadline: Optional[Deadline] = None
+    ) -> Tuple[List[Dict[str, Any]], float]:
+        """Mock text extraction"""
+        mock_results_list, ocr_time = self.extract_text_from_images([image], [text_regions], deadline)
+        return mock_results_list[0], ocr_time
     
     def get_model_info(self) -> Dict[str, Any]:
         return {
             "model_name": "mock_vietocr",
             "weights_path": "mock_weights.pth",
-            "device": "cpu"
+            "device": "cpu",
+            "batch_size": self.batch_size,
+            "latency": self.latency.info()
         }
-
@@ -0,0 +1,225 @@
+"""
+Versioned serving models with background reload and atomic swap
+"""
+import os
+import gc
+import sys
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Iterator, Type
+from app.services.ocr_pipeline import OCRPipeline
+from app.core.config import settings
+
+logger = logging.getLogger("models")
+
+
+class ModelSlot:
+    """A loaded pipeline and the number of requests currently using it"""
+    
+    def __init__(self, pipeline: OCRPipeline):
+        self.pipeline = pipeline
+        self.version = pipeline.model_version
+        self.active = 0
+        self.loaded_at = time.time()
+
+
+class ModelManager:
+    """
+    Serves one pipeline version at a time and swaps in new versions without downtime
+    
+    Requests lease the current slot for their duration. A reload builds and
+    warms the new pipeline in a background thread, swaps it in under the
+    lock, then waits for leases on the old slot to drain before freeing it.
+    """
+    
+    def __init__(self, pipeline_class: Type[OCRPipeline] = OCRPipeline):
+        self.pipeline_class = pipeline_class
+        self._slot: Optional[ModelSlot] = None
+        self._draining: Dict[str, ModelSlot] = {}
+        self._lock = threading.Condition()
+        self._load_lock = threading.Lock()
+        self._reload_thread: Optional[threading.Thread] = None
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
+        self.state: Dict[str, Any] = {"status": "idle"}
+        self.history = deque(maxlen=10)
+    
+    def lease(self) -> ModelSlot:
+        """Take a lease on the serving slot, loading the initial version if needed"""
+        while True:
+            with self._lock:
+                if self._slot is not None:
+                    self._slot.active += 1
+                    return self._slot
+            
+            # Load outside self._lock so status() and releases are not held up meanwhile
+            with self._load_lock:
+                if self._slot is None:
+                    pipeline = self.pipeline_class()
+                    with self._lock:
+                        if self._slot is None:
+                            self._slot = ModelSlot(pipeline)
+                            logger.info(f"Serving model version {self._slot.version}")
+    
+    def release(self, slot: ModelSlot):
+        with self._lock:
+            slot.active -= 1
+            self._lock.notify_all()
+    
+    @contextmanager
+    def acquire(self) -> Iterator[OCRPipeline]:
+        """Use the serving pipeline for the duration of the block"""
+        slot = self.lease()
+        try:
+            yield slot.pipeline
+        finally:
+            self.release(slot)
+    
+    @property
+    def version(self) -> Optional[str]:
+        return self._slot.version if self._slot else None
+    
+    def reload(
+        self,
+        yolo_model_path: Optional[str] = None,
+        ocr_weights_path: Optional[str] = None,
+        version: Optional[str] = None
+    ) -> bool:
+        """
+        Start loading a new model version in the background
+        
+        Args:
+            yolo_model_path: Detector weights, default the currently served path
+            ocr_weights_path: Recognizer weights, default the currently served path
+            version: Version label, default derived from the file contents
+        
+        Returns:
+            False if another reload is still in progress
+        """
+        with self._lock:
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return False
+            current = self._slot.pipeline if self._slot else None
+            yolo_model_path = yolo_model_path or (current.yolo_model_path if current else None)
+            ocr_weights_path = ocr_weights_path or (current.ocr_weights_path if current else None)
+            self.state = {
+                "status": "loading",
+                "yolo_model_path": yolo_model_path,
+                "ocr_weights_path": ocr_weights_path,
+                "started_at": time.time()
+            }
+            self._reload_thread = threading.Thread(
+                target=self._reload, args=(yolo_model_path, ocr_weights_path, version),
+                name="model-reload", daemon=True
+            )
+            self._reload_thread.start()
+            return True
+    
+    def _reload(self, yolo_model_path: Optional[str], ocr_weights_path: Optional[str], version: Optional[str]):
+        try:
+            pipeline = self.pipeline_class(yolo_model_path, ocr_weights_path, version)
+            self.state["status"] = "warming"
+            self.state["version"] = pipeline.model_version
+            pipeline.warm_up()
+        except Exception as e:
+            logger.error(f"Model reload failed, keeping version {self.version}: {e}")
+            self.state.update(status="failed", error=str(e), finished_at=time.time())
+            self.history.append(dict(self.state))
+            return
+        
+        with self._lock:
+            old_slot = self._slot
+            self._slot = ModelSlot(pipeline)
+            if old_slot is not None:
+                self._draining[old_slot.version] = old_slot
+        logger.info(f"Swapped to model version {pipeline.model_version}"
+                    + (f" (was {old_slot.version})" if old_slot else ""))
+        
+        if old_slot is not None:
+            self.state["status"] = "draining"
+            with self._lock:
+                drained = self._lock.wait_for(lambda: old_slot.active == 0, timeout=settings.MODEL_DRAIN_TIMEOUT)
+                self._draining.pop(old_slot.version, None)
+            if not drained:
+                logger.warning(f"Version {old_slot.version} still has {old_slot.active} requests after "
+                               f"{settings.MODEL_DRAIN_TIMEOUT}s; releasing it anyway")
+            self._free(old_slot)
+        
+        self.state.update(status="idle", finished_at=time.time())
+        self.history.append(dict(self.state))
+    
+    @staticmethod
+    def _free(slot: ModelSlot):
+        """Drop the old pipeline and return its memory"""
+        slot.pipeline = None
+        gc.collect()
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    
+    def _file_state(self) -> Optional[tuple]:
+        if self._slot is None:
+            return None
+        paths = (self._slot.pipeline.yolo_model_path, self._slot.pipeline.ocr_weights_path)
+        try:
+            return tuple((os.path.getmtime(path), os.path.getsize(path)) for path in paths)
+        except OSError:
+            return None
+    
+    def _watch(self):
+        """Reload when the served model files change and have stopped changing"""
+        last_state = self._file_state()
+        pending_state = None
+        while not self._watch_stop.wait(settings.MODEL_WATCH_INTERVAL):
+            state = self._file_state()
+            if state is None or state == last_state:
+                pending_state = None
+                continue
+            if last_state is None:
+                last_state = state
+                continue
+            # Wait one more interval so a file still being copied is not loaded
+            if state != pending_state:
+                pending_state = state
+                continue
+            logger.info("Model files changed on disk, reloading")
+            if self.reload():
+                last_state = state
+                pending_state = None
+    
+    def start_watch(self):
+        if self._watch_thread is not None:
+            return
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(target=self._watch, name="model-watch", daemon=True)
+        self._watch_thread.start()
+        logger.info(f"Watching model files every {settings.MODEL_WATCH_INTERVAL}s")
+    
+    def stop_watch(self):
+        if self._watch_thread is None:
+            return
+        self._watch_stop.set()
+        self._watch_thread.join()
+        self._watch_thread = None
+    
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            serving = None
+            if self._slot is not None:
+                serving = {
+                    "version": self._slot.version,
+                    "active_requests": self._slot.active,
+                    "loaded_at": self._slot.loaded_at,
+                    "yolo_model_path": self._slot.pipeline.yolo_model_path,
+                    "ocr_weights_path": self._slot.pipeline.ocr_weights_path
+                }
+            return {
+                "serving": serving,
+                "draining": {version: slot.active for version, slot in self._draining.items()},
+                "reload": dict(self.state),
+                "history": list(self.history),
+                "watching": self._watch_thread is not None
+            }
@@ -0,0 +1,210 @@
+"""
+Registry of detector and recognizer variants with memory-budgeted loading
+"""
+import os
+import gc
+import sys
+import time
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Iterator, Tuple, List
+from app.services.model_manager import ModelManager
+from app.services.ocr_pipeline import OCRPipeline
+from app.services.card_aligner import CardAligner, CORNER_CLASSES
+from app.core.config import settings
+
+logger = logging.getLogger("models")
+
+
+class RegistryEntry:
+    """A loaded variant, its estimated size and the number of requests using it"""
+    
+    def __init__(self, service, memory_bytes: int):
+        self.service = service
+        self.memory_bytes = memory_bytes
+        self.active = 0
+        self.loaded_at = time.time()
+        self.uses = 0
+
+
+class ModelRegistry:
+    """
+    Detector and recognizer variants selectable per request
+    
+    The default detector and recognizer come from the hot-reload
+    ModelManager. Other variants are loaded on first use and the least
+    recently used idle ones are evicted when their total size exceeds
+    MODEL_MEMORY_BUDGET_MB.
+    """
+    
+    KINDS = ("detector", "recognizer")
+    
+    def __init__(self, model_manager: ModelManager):
+        self.model_manager = model_manager
+        self._entries: "OrderedDict[Tuple[str, str], RegistryEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.evictions = 0
+    
+    def variants(self, kind: str) -> Dict[str, Dict[str, Any]]:
+        return settings.DETECTOR_VARIANTS if kind == "detector" else settings.RECOGNIZER_VARIANTS
+    
+    def default(self, kind: str) -> str:
+        return settings.DEFAULT_DETECTOR if kind == "detector" else settings.DEFAULT_RECOGNIZER
+    
+    def validate(self, detector: Optional[str], recognizer: Optional[str]):
+        """Raise ValueError for variant names that are not configured"""
+        for kind, name in zip(self.KINDS, (detector, recognizer)):
+            if name and name not in self.variants(kind):
+                raise ValueError(f"Unknown {kind} '{name}'. Available: {sorted(self.variants(kind))}")
+    
+    def _load(self, kind: str, name: str):
+        spec = self.variants(kind)[name]
+        logger.info(f"Loading {kind} variant '{name}'")
+        if kind == "detector":
+            from app.services.yolo_service import YOLOService
+            return YOLOService(spec["path"], spec.get("text_labels"))
+        from app.services.ocr_service import OCRService
+        return OCRService(spec["path"], spec.get("model_name", name))
+    
+    @staticmethod
+    def _measure(service, spec: Dict[str, Any]) -> int:
+        try:
+            return int(service.memory_bytes())
+        except Exception:
+            # Fall back to the weight file size
+            path = spec.get("path")
+            return os.path.getsize(path) if path and os.path.exists(path) else 0
+    
+    def _lease(self, kind: str, name: str) -> RegistryEntry:
+        key = (kind, name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.active += 1
+                entry.uses += 1
+                return entry
+        
+        # One load at a time; re-check in case another request loaded it meanwhile
+        with self._load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    entry.active += 1
+                    entry.uses += 1
+                    return entry
+            
+            service = self._load(kind, name)
+            entry = RegistryEntry(service, self._measure(service, self.variants(kind)[name]))
+            entry.active = 1
+            entry.uses = 1
+            with self._lock:
+                self._entries[key] = entry
+                self._evict()
+            logger.info(f"Loaded {kind} variant '{name}' ({entry.memory_bytes / 1024 / 1024:.0f} MB)")
+            return entry
+    
+    def _release(self, entry: RegistryEntry):
+        with self._lock:
+            entry.active -= 1
+    
+    def _evict(self):
+        """Drop least recently used idle variants until within budget; caller holds the lock"""
+        budget = settings.MODEL_MEMORY_BUDGET_MB * 1024 * 1024
+        total = sum(entry.memory_bytes for entry in self._entries.values())
+        for key in list(self._entries):
+            if total <= budget:
+                break
+            entry = self._entries[key]
+            if entry.active > 0:
+                continue
+            del self._entries[key]
+            total -= entry.memory_bytes
+            entry.service = None
+            self.evictions += 1
+            logger.info(f"Evicted {key[0]} variant '{key[1]}' ({entry.memory_bytes / 1024 / 1024:.0f} MB)")
+        else:
+            if total > budget:
+                logger.warning(f"Model memory {total / 1024 / 1024:.0f} MB exceeds budget; all variants in use")
+        
+        gc.collect()
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    
+    @contextmanager
+    def acquire(self, detector: Optional[str] = None, recognizer: Optional[str] = None) -> Iterator[OCRPipeline]:
+        """
+        Use a pipeline made of the requested variants for the duration of the block
+        
+        Args:
+            detector: Detector variant name, default DEFAULT_DETECTOR
+            recognizer: Recognizer variant name, default DEFAULT_RECOGNIZER
+        """
+        self.validate(detector, recognizer)
+        detector = detector or settings.DEFAULT_DETECTOR
+        recognizer = recognizer or settings.DEFAULT_RECOGNIZER
+        if detector == settings.DEFAULT_DETECTOR and recognizer == settings.DEFAULT_RECOGNIZER:
+            with self.model_manager.acquire() as pipeline:
+                yield pipeline
+            return
+        
+        slot = None
+        entries: List[RegistryEntry] = []
+        try:
+            services = {}
+            for kind, name in zip(self.KINDS, (detector, recognizer)):
+                if name == self.default(kind):
+                    # Share the serving default instead of loading a second copy
+                    slot = slot or self.model_manager.lease()
+                    services[kind] = slot.pipeline.yolo_service if kind == "detector" else slot.pipeline.ocr_service
+                else:
+                    entry = self._lease(kind, name)
+                    entries.append(entry)
+                    services[kind] = entry.service
+            
+            aligner = None
+            if settings.ALIGN_ENABLED:
+                if services["detector"].has_classes(CORNER_CLASSES):
+                    aligner = CardAligner(services["detector"])
+                else:
+                    # Reuse the serving pipeline's aligner instead of loading ALIGN_DETECTOR per request
+                    slot = slot or self.model_manager.lease()
+                    aligner = slot.pipeline.aligner
+            
+            yield OCRPipeline.from_services(
+                services["detector"], services["recognizer"], f"{detector}+{recognizer}", aligner
+            )
+        finally:
+            for entry in entries:
+                self._release(entry)
+            if slot is not None:
+                self.model_manager.release(slot)
+    
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            loaded = [
+                {
+                    "kind": kind,
+                    "name": name,
+                    "memory_mb": round(entry.memory_bytes / 1024 / 1024, 1),
+                    "active_requests": entry.active,
+                    "uses": entry.uses,
+                    "loaded_at": entry.loaded_at
+                }
+                for (kind, name), entry in self._entries.items()
+            ]
+            return {
+                "detectors": sorted(settings.DETECTOR_VARIANTS),
+                "recognizers": sorted(settings.RECOGNIZER_VARIANTS),
+                "default_detector": settings.DEFAULT_DETECTOR,
+                "default_recognizer": settings.DEFAULT_RECOGNIZER,
+                "loaded": loaded,
+                "memory_mb": round(sum(entry.memory_bytes for entry in self._entries.values()) / 1024 / 1024, 1),
+                "budget_mb": settings.MODEL_MEMORY_BUDGET_MB,
+                "evictions": self.evictions
+            }
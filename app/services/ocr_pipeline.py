@@ -3,13 +3,20 @@ Main OCR pipeline service that combines YOLO + VietOCR
 """
 import os
 import time
+import hashlib
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
+import numpy as np
 from app.services.yolo_service import YOLOService
 from app.services.ocr_service import OCRService
+from app.services.card_aligner import CardAligner, Alignment, CORNER_CLASSES
+from app.services.quality_gate import quality_gate
 from app.models.schemas import OCRResponse, DetectedText, BoundingBox, ProcessingTiming
 from app.core.config import settings
+from app.utils.deadline import Deadline, RequestAborted
+from app.utils.image import load_image
+from app.utils.serialization import build_model
 
 logger = logging.getLogger("api")
 
@@ -17,32 +24,238 @@ logger = logging.getLogger("api")
 class OCRPipeline:
     """Main OCR pipeline service"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        yolo_model_path: Optional[str] = None,
+        ocr_weights_path: Optional[str] = None,
+        model_version: Optional[str] = None
+    ):
+        self.yolo_model_path = yolo_model_path or settings.YOLO_MODEL_PATH
+        self.ocr_weights_path = ocr_weights_path or settings.VIETOCR_WEIGHTS_PATH
         self.yolo_service = None
         self.ocr_service = None
+        self.aligner = None
         self.start_time = time.time()
         self._initialize_services()
+        self.model_version = model_version or self._compute_model_version()
+    
+    @classmethod
+    def from_services(
+        cls,
+        yolo_service,
+        ocr_service,
+        model_version: str,
+        aligner: Optional[CardAligner] = None
+    ) -> "OCRPipeline":
+        """Compose a pipeline from already loaded services and an optional card aligner"""
+        pipeline = cls.__new__(cls)
+        pipeline.yolo_model_path = getattr(yolo_service, "model_path", None)
+        pipeline.ocr_weights_path = getattr(ocr_service, "weights_path", None)
+        pipeline.yolo_service = yolo_service
+        pipeline.ocr_service = ocr_service
+        pipeline.aligner = aligner
+        pipeline.start_time = time.time()
+        pipeline.model_version = model_version
+        return pipeline
     
     def _initialize_services(self):
         """Initialize YOLO and OCR services"""
         try:
             logger.info("Initializing OCR pipeline services...")
-            self.yolo_service = YOLOService()
-            self.ocr_service = OCRService()
+            self.yolo_service = YOLOService(self.yolo_model_path)
+            self.ocr_service = OCRService(self.ocr_weights_path)
+            self.aligner = self._create_aligner()
             logger.info("OCR pipeline services initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize OCR pipeline: {e}")
             raise
     
-    def process_image(self, image_path: str) -> OCRResponse:
+    def _create_aligner(self) -> Optional[CardAligner]:
+        """Card aligner when enabled, on the serving detector if it predicts corners"""
+        if not settings.ALIGN_ENABLED:
+            return None
+        
+        detector = self.yolo_service
+        if not detector.has_classes(CORNER_CLASSES):
+            variant = settings.DETECTOR_VARIANTS.get(settings.ALIGN_DETECTOR)
+            if variant is None:
+                logger.warning(f"Alignment disabled: unknown detector variant '{settings.ALIGN_DETECTOR}'")
+                return None
+            detector = YOLOService(variant["path"], variant.get("text_labels"))
+            if not detector.has_classes(CORNER_CLASSES):
+                logger.warning(f"Alignment disabled: '{settings.ALIGN_DETECTOR}' does not predict {CORNER_CLASSES}")
+                return None
+        logger.info(f"Card alignment enabled using {detector.model_path}")
+        return CardAligner(detector)
+    
+    def _align(self, image) -> Tuple[Any, Optional[Alignment]]:
+        """The aligned card image when alignment is enabled and succeeds, else the input"""
+        if self.aligner is None:
+            return image, None
+        image = load_image(image)
+        alignment = self.aligner.align(image)
+        if alignment is None:
+            return image, None
+        return alignment.image, alignment
+    
+    def _check_quality(self, image: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Quality gate report for a decoded image, None when the gate is disabled"""
+        if not settings.QUALITY_GATE_ENABLED:
+            return None
+        return quality_gate.check(image)
+    
+    def _rejected_response(self, image_path: str, quality: Dict[str, Any]) -> OCRResponse:
+        """Response for an image the quality gate kept away from the models"""
+        return build_model(
+            OCRResponse,
+            success=False,
+            image_path=image_path,
+            total_regions=0,
+            detected_texts=[],
+            timing=build_model(ProcessingTiming, detection_time=0.0, ocr_time=0.0, total_time=0.0),
+            message=f"Image rejected by quality gate: {', '.join(quality['issues'])}",
+            model_version=self.model_version,
+            quality=quality
+        )
+    
+    def _use_two_stage(self) -> bool:
+        """Two-stage detection is enabled and the detector has a card class to localize"""
+        return settings.TWO_STAGE_DETECTION and bool(getattr(self.yolo_service, "card_class_ids", None))
+    
+    def _compute_model_version(self) -> str:
+        """Version string from the content hashes of the model files"""
+        parts = []
+        for path in (self.yolo_model_path, self.ocr_weights_path):
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            parts.append(f"{os.path.splitext(os.path.basename(path))[0]}@{digest.hexdigest()[:8]}")
+        return "+".join(parts)
+    
+    def warm_up(self, runs: int = None):
+        """
+        Run dummy inputs through both models so the first real requests
+        don't pay for lazy initialization (CUDA context, kernels, caches)
+        """
+        runs = runs if runs is not None else settings.MODEL_WARMUP_RUNS
+        image = np.full((640, 640, 3), 255, dtype=np.uint8)
+        region = {
+            'id': 1,
+            'bbox': [100, 100, 400, 132],
+            'confidence': 1.0,
+            'class_id': 0,
+            'class_name': 'warmup'
+        }
+        start_time = time.time()
+        for _ in range(runs):
+            self.yolo_service.detect_text_regions(image)
+            self.ocr_service.extract_text_from_regions(image, [region])
+        logger.info(f"Warmed up model version {self.model_version} in {time.time() - start_time:.2f}s")
+    
+    def _build_response(
+        self,
+        image_path: str,
+        text_regions: List[Dict[str, Any]],
+        all_regions: List[Dict[str, Any]],
+        extracted_results: List[Dict[str, Any]],
+        detection_time: float,
+        ocr_time: float,
+        partial: bool = False,
+        stages: Optional[Dict[str, float]] = None,
+        quality: Optional[Dict[str, Any]] = None
+    ) -> OCRResponse:
+        """Convert pipeline results to response format"""
+        if not text_regions:
+            logger.warning("No text regions detected for OCR")
+            return build_model(
+                OCRResponse,
+                success=True,
+                image_path=image_path,
+                total_regions=len(all_regions),
+                detected_texts=[],
+                timing=build_model(
+                    ProcessingTiming,
+                    detection_time=detection_time,
+                    ocr_time=0.0,
+                    total_time=detection_time,
+                    stages=stages
+                ),
+                message="No text regions detected",
+                model_version=self.model_version,
+                quality=quality
+            )
+        
+        total_time = detection_time + ocr_time
+        
+        detected_texts = []
+        for result in extracted_results:
+            bbox = build_model(
+                BoundingBox,
+                x1=result['bbox'][0],
+                y1=result['bbox'][1], 
+                x2=result['bbox'][2],
+                y2=result['bbox'][3]
+            )
+            
+            detected_text = build_model(
+                DetectedText,
+                class_name=result['class_name'],
+                extracted_text=result['extracted_text'],
+                bbox=bbox,
+                confidence=result['yolo_confidence'],
+                class_id=result['class_id']
+            )
+            detected_texts.append(detected_text)
+        
+        # Log results
+        logger.info(f"Pipeline completed successfully:")
+        logger.info(f"  - Total regions: {len(all_regions)}")
+        logger.info(f"  - Text regions: {len(text_regions)}")
+        logger.info(f"  - Extracted texts: {len(extracted_results)}")
+        logger.info(f"  - Detection time: {detection_time:.3f}s")
+        logger.info(f"  - OCR time: {ocr_time:.3f}s")
+        logger.info(f"  - Total time: {total_time:.3f}s")
+        
+        message = None
+        if partial:
+            recognized = sum(result['extracted_text'] is not None for result in extracted_results)
+            message = f"Deadline reached: {recognized} of {len(text_regions)} text regions recognized"
+            logger.warning(message)
+        
+        return build_model(
+            OCRResponse,
+            success=True,
+            image_path=image_path,
+            total_regions=len(all_regions),
+            detected_texts=detected_texts,
+            timing=build_model(
+                ProcessingTiming,
+                detection_time=detection_time,
+                ocr_time=ocr_time,
+                total_time=total_time,
+                stages=stages
+            ),
+            message=message,
+            model_version=self.model_version,
+            partial=partial,
+            quality=quality
+        )
+    
+    def process_image(self, image_path: str, deadline: Optional[Deadline] = None) -> OCRResponse:
         """
         Process image through YOLO + VietOCR pipeline
         
         Args:
             image_path: Path to input image
+            deadline: Request deadline, checked after detection and between OCR batches
             
         Returns:
-            OCRResponse with results
+            OCRResponse with results; success is False when the quality gate
+            rejected the image
+        
+        Raises:
+            RequestAborted: If the deadline passed or the client disconnected
         """
         logger.info(f"Processing image: {image_path}")
         
@@ -50,80 +263,200 @@ class OCRPipeline:
             raise FileNotFoundError(f"Image not found: {image_path}")
         
         try:
+            # Step 0: Quality gate on the decoded image
+            image, quality = image_path, None
+            if settings.QUALITY_GATE_ENABLED:
+                image = load_image(image_path)
+                quality = self._check_quality(image)
+                if quality["rejected"]:
+                    return self._rejected_response(image_path, quality)
+            
             # Step 1: YOLO Detection
-            text_regions, detection_time, all_regions = self.yolo_service.detect_text_regions(image_path)
+            image, alignment = self._align(image)
+            if deadline is not None:
+                deadline.check("alignment")
+            stages = None
+            if alignment is None and self._use_two_stage():
+                image = load_image(image)
+                regions, stages = self.yolo_service.detect_text_regions_two_stage([image])
+                (text_regions, all_regions), detection_time = regions[0], sum(stages.values())
+            else:
+                text_regions, detection_time, all_regions = self.yolo_service.detect_text_regions(image)
+            if deadline is not None:
+                # Past the deadline with partial results allowed, the regions are returned without text
+                deadline.stop_recognition("detection")
             
-            if not text_regions:
-                logger.warning("No text regions detected for OCR")
-                return OCRResponse(
-                    success=True,
-                    image_path=image_path,
-                    total_regions=len(all_regions),
-                    detected_texts=[],
-                    timing=ProcessingTiming(
-                        detection_time=detection_time,
-                        ocr_time=0.0,
-                        total_time=detection_time
-                    ),
-                    message="No text regions detected"
+            # Step 2: OCR Text Extraction
+            extracted_results, ocr_time = [], 0.0
+            if text_regions:
+                extracted_results, ocr_time = self.ocr_service.extract_text_from_regions(
+                    image, text_regions, deadline
                 )
             
-            # Step 2: OCR Text Extraction
-            extracted_results, ocr_time = self.ocr_service.extract_text_from_regions(
-                image_path, text_regions
+            if alignment is not None:
+                # Report boxes in the uploaded image's coordinates
+                alignment.restore_regions(all_regions)
+                stages = {"alignment": alignment.elapsed, "fields": detection_time}
+                detection_time += alignment.elapsed
+            
+            # Step 3: Convert to response format
+            return self._build_response(
+                image_path, text_regions, all_regions, extracted_results, detection_time, ocr_time,
+                deadline is not None and deadline.partial, stages, quality
+            )
+            
+        except RequestAborted as e:
+            logger.warning(f"Pipeline stopped early: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Pipeline processing failed: {e}")
+            raise
+    
+    def process_batch(
+        self,
+        images: List[np.ndarray],
+        image_paths: List[str],
+        deadline: Optional[Deadline] = None
+    ) -> List[OCRResponse]:
+        """
+        Process a batch of decoded images with one detection call and shared OCR batches
+        
+        Args:
+            images: Decoded BGR images
+            image_paths: Source path of each image, reported in the responses
+            deadline: Request deadline, checked after detection and between OCR batches
+            
+        Returns:
+            OCRResponse per image; timings are the batch time split evenly across
+            the images that passed the quality gate, rejected images get
+            success False
+        """
+        logger.info(f"Processing batch of {len(images)} images")
+        
+        qualities = [self._check_quality(image) for image in images]
+        responses = {
+            i: self._rejected_response(image_path, quality)
+            for i, (image_path, quality) in enumerate(zip(image_paths, qualities))
+            if quality is not None and quality["rejected"]
+        }
+        accepted = [i for i in range(len(images)) if i not in responses]
+        if accepted:
+            results = self._process_accepted(
+                [images[i] for i in accepted], [image_paths[i] for i in accepted],
+                [qualities[i] for i in accepted], deadline
             )
+            responses.update(zip(accepted, results))
+        return [responses[i] for i in range(len(images))]
+    
+    def _process_accepted(
+        self,
+        images: List[np.ndarray],
+        image_paths: List[str],
+        qualities: List[Optional[Dict[str, Any]]],
+        deadline: Optional[Deadline]
+    ) -> List[OCRResponse]:
+        """Batch pipeline for the images that passed the quality gate"""
+        try:
+            aligned = [self._align(image) for image in images]
+            images = [image for image, _ in aligned]
+            alignments = [alignment for _, alignment in aligned]
             
-            total_time = detection_time + ocr_time
+            stages = None
+            if all(alignment is None for alignment in alignments) and self._use_two_stage():
+                regions, stages = self.yolo_service.detect_text_regions_two_stage(images)
+                detection_time = sum(stages.values())
+                stages = {name: elapsed / len(images) for name, elapsed in stages.items()}
+            else:
+                regions, detection_time = self.yolo_service.detect_text_regions_batch(images)
+            text_regions_list = [text_regions for text_regions, _ in regions]
+            if deadline is not None:
+                # Past the deadline with partial results allowed, the regions are returned without text
+                deadline.stop_recognition("detection")
             
-            # Step 3: Convert to response format
-            detected_texts = []
-            for result in extracted_results:
-                bbox = BoundingBox(
-                    x1=result['bbox'][0],
-                    y1=result['bbox'][1], 
-                    x2=result['bbox'][2],
-                    y2=result['bbox'][3]
-                )
-                
-                detected_text = DetectedText(
-                    class_name=result['class_name'],
-                    extracted_text=result['extracted_text'],
-                    bbox=bbox,
-                    confidence=result['yolo_confidence'],
-                    class_id=result['class_id']
-                )
-                detected_texts.append(detected_text)
+            extracted_results_list, ocr_time = self.ocr_service.extract_text_from_images(
+                images, text_regions_list, deadline
+            )
             
-            # Log results
-            logger.info(f"Pipeline completed successfully:")
-            logger.info(f"  - Total regions: {len(all_regions)}")
-            logger.info(f"  - Text regions: {len(text_regions)}")
-            logger.info(f"  - Extracted texts: {len(extracted_results)}")
-            logger.info(f"  - Detection time: {detection_time:.3f}s")
-            logger.info(f"  - OCR time: {ocr_time:.3f}s")
-            logger.info(f"  - Total time: {total_time:.3f}s")
+            if any(alignment is not None for alignment in alignments):
+                for alignment, (_, all_regions) in zip(alignments, regions):
+                    if alignment is not None:
+                        alignment.restore_regions(all_regions)
+                alignment_time = sum(alignment.elapsed for alignment in alignments if alignment is not None)
+                stages = {"alignment": alignment_time / len(images), "fields": detection_time / len(images)}
+                detection_time += alignment_time
             
-            return OCRResponse(
-                success=True,
-                image_path=image_path,
-                total_regions=len(all_regions),
-                detected_texts=detected_texts,
-                timing=ProcessingTiming(
-                    detection_time=detection_time,
-                    ocr_time=ocr_time,
-                    total_time=total_time
+            per_image_detection = detection_time / len(images)
+            per_image_ocr = ocr_time / len(images)
+            return [
+                self._build_response(
+                    image_path, text_regions, all_regions, extracted_results,
+                    per_image_detection, per_image_ocr, deadline is not None and deadline.partial, stages, quality
                 )
-            )
+                for image_path, (text_regions, all_regions), extracted_results, quality
+                in zip(image_paths, regions, extracted_results_list, qualities)
+            ]
             
+        except RequestAborted as e:
+            logger.warning(f"Pipeline stopped early: {e}")
+            raise
         except Exception as e:
-            logger.error(f"Pipeline processing failed: {e}")
+            logger.error(f"Batch processing failed: {e}")
             raise
     
+    def recognize_regions(
+        self,
+        image: np.ndarray,
+        image_path: str,
+        regions: List[Dict[str, Any]],
+        deadline: Optional[Deadline] = None
+    ) -> OCRResponse:
+        """
+        Recognize given regions of a decoded image, skipping detection
+        
+        Args:
+            image: Decoded BGR image
+            image_path: Name reported in the response
+            regions: Dicts with 'bbox' [x1, y1, x2, y2] and 'class_name'
+            deadline: Request deadline, checked between OCR batches
+        
+        Returns:
+            OCRResponse with one text per region; the boxes are given, so their
+            confidence is 1.0
+        
+        Raises:
+            ValueError: If a class name is not a detector class
+            RequestAborted: If the deadline passed or the client disconnected
+        """
+        logger.info(f"Recognizing {len(regions)} given regions of {image_path}")
+        
+        class_ids = {class_name: int(class_id) for class_id, class_name in self.yolo_service.class_names.items()}
+        unknown = sorted({region['class_name'] for region in regions} - set(class_ids))
+        if unknown:
+            raise ValueError(f"Unknown class names: {', '.join(unknown)}")
+        
+        text_regions = [
+            {
+                'id': i,
+                'bbox': [int(value) for value in region['bbox']],
+                'confidence': 1.0,
+                'class_id': class_ids[region['class_name']],
+                'class_name': region['class_name']
+            }
+            for i, region in enumerate(regions)
+        ]
+        extracted_results, ocr_time = self.ocr_service.extract_text_from_regions(image, text_regions, deadline)
+        return self._build_response(
+            image_path, text_regions, text_regions, extracted_results, 0.0, ocr_time,
+            deadline is not None and deadline.partial
+        )
+    
     def get_service_info(self) -> Dict[str, Any]:
         """Get information about loaded services"""
         return {
             "yolo": self.yolo_service.get_model_info() if self.yolo_service else None,
             "ocr": self.ocr_service.get_model_info() if self.ocr_service else None,
+            "model_version": self.model_version,
+            "alignment": self.aligner.stats() if self.aligner else None,
             "uptime": time.time() - self.start_time
         }
     
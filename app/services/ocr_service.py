@@ -1,102 +1,341 @@
 """
 VietOCR text recognition service
 """
+import os
+import re
+import math
 import time
 import logging
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Union, Optional
 import cv2
-from PIL import Image
-from vietocr.tool.predictor import Predictor
-from vietocr.tool.config import Cfg
+import numpy as np
 from app.core.config import settings
+from app.utils.crops import clamp_boxes, prepare_crop_batches
+from app.utils.deadline import Deadline
+from app.utils.image import load_image
 
 logger = logging.getLogger("ocr")
 
+# vietocr's beam search defaults
+BEAM_SIZE = 4
+MAX_SEQ_LENGTH = 128
+SOS_TOKEN = 1
+EOS_TOKEN = 2
+
 
 class OCRService:
     """VietOCR text recognition service"""
     
-    def __init__(self):
+    def __init__(self, weights_path: Optional[str] = None, model_name: Optional[str] = None):
+        self.weights_path = weights_path or settings.VIETOCR_WEIGHTS_PATH
+        self.model_name = model_name or settings.VIETOCR_MODEL_NAME
         self.ocr = None
+        self._torch = None
+        self._translate = None
+        self._beam = None
+        self.digit_recognizer = None
+        self.digit_reads = 0
+        self.digit_fallbacks = 0
         self._load_model()
+        self._load_digit_recognizer()
     
     def _load_model(self):
         """Load VietOCR model"""
         try:
-            logger.info(f"Loading VietOCR model: {settings.VIETOCR_MODEL_NAME}")
-            config = Cfg.load_config_from_name(settings.VIETOCR_MODEL_NAME)
-            config['weights'] = settings.VIETOCR_WEIGHTS_PATH
+            import torch
+            from vietocr.tool.predictor import Predictor
+            from vietocr.tool.config import Cfg
+            from vietocr.tool.translate import translate
+            from vietocr.model.beam import Beam
+            
+            logger.info(f"Loading VietOCR model: {self.model_name}")
+            config = Cfg.load_config_from_name(self.model_name)
+            config['weights'] = self.weights_path
             config['device'] = settings.DEVICE
             self.ocr = Predictor(config)
-            logger.info("VietOCR model loaded successfully")
+            self._torch = torch
+            self._translate = translate
+            self._beam = Beam
+            logger.info("VietOCR model loaded successfully"
+                        + (" (beam search decoding)" if config['predictor']['beamsearch'] else ""))
         except Exception as e:
             logger.error(f"Failed to load VietOCR model: {e}")
             raise
     
-    def extract_text_from_regions(self, image_path: str, text_regions: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], float]:
+    def _load_digit_recognizer(self):
+        """Digit recognizer for DIGIT_FIELD_PATTERNS classes, when enabled and trained"""
+        if not settings.DIGIT_RECOGNIZER_ENABLED:
+            return
+        if not os.path.exists(settings.DIGIT_RECOGNIZER_PATH):
+            logger.warning(f"Digit recognizer weights not found at {settings.DIGIT_RECOGNIZER_PATH}; "
+                           f"numeric fields use VietOCR")
+            return
+        from app.services.digit_recognizer import DigitRecognizer
+        self.digit_recognizer = DigitRecognizer(settings.DIGIT_RECOGNIZER_PATH)
+        self._digit_patterns = {name: re.compile(pattern) for name, pattern in settings.DIGIT_FIELD_PATTERNS.items()}
+    
+    def _translate_batch(self, batch: np.ndarray) -> List[Tuple[str, float]]:
+        """Run one prepared (n, 3, H, W) batch through the VietOCR model, greedy or beam search per its config"""
+        tensor = self._torch.from_numpy(batch).to(self.ocr.device)
+        if self.ocr.config['predictor']['beamsearch']:
+            return self._beam_search_batch(tensor)
+        sentences, probs = self._translate(tensor, self.ocr.model)
+        texts = self.ocr.vocab.batch_decode(sentences.tolist())
+        return list(zip(texts, (float(prob) for prob in probs.tolist())))
+    
+    def _beam_search_batch(self, tensor) -> List[Tuple[str, float]]:
         """
-        Extract text from detected regions
+        Beam search decoding of a batch, encoded once and searched per crop
+        
+        Follows vietocr's batch_translate_beam_search and beamsearch, which
+        fail on batches in vietocr 0.3.13 and drop the score. The probability
+        is the best hypothesis's per-token geometric mean.
+        """
+        model = self.ocr.model
+        outputs = []
+        with self._torch.no_grad():
+            memories = model.transformer.forward_encoder(model.cnn(tensor))
+            for i in range(len(tensor)):
+                memory = model.transformer.expand_memory(model.transformer.get_memory(memories, i), BEAM_SIZE)
+                beam = self._beam(beam_size=BEAM_SIZE, min_length=0, n_top=1, ranker=None,
+                                  start_token_id=SOS_TOKEN, end_token_id=EOS_TOKEN)
+                for _ in range(MAX_SEQ_LENGTH):
+                    tgt_inp = beam.get_current_state().transpose(0, 1).to(tensor.device)
+                    decoder_outputs, memory = model.transformer.forward_decoder(tgt_inp, memory)
+                    beam.advance(self._torch.log_softmax(decoder_outputs[:, -1, :].squeeze(0), dim=-1).cpu())
+                    if beam.done():
+                        break
+                scores, finished = beam.sort_finished(minimum=1)
+                tokens = [int(token) for token in beam.get_hypothesis(*finished[0])]
+                text = self.ocr.vocab.decode([SOS_TOKEN] + tokens)
+                outputs.append((text, math.exp(float(scores[0]) / max(len(tokens), 1))))
+        return outputs
+    
+    def recognize(
+        self,
+        images: List[np.ndarray],
+        boxes_list: List[np.ndarray],
+        deadline: Optional[Deadline] = None
+    ) -> List[Optional[Tuple[str, float]]]:
+        """
+        Recognize text in the given boxes of several images
+        
+        Crops are resized straight into width-bucketed batches of at most
+        OCR_BATCH_SIZE and passed to the model without PIL conversion.
         
         Args:
-            image_path: Path to input image
-            text_regions: List of text regions from YOLO
-            
+            images: RGB images
+            boxes_list: Clamped, non-empty boxes per image
+            deadline: Checked before each batch; batches past it are skipped
+                when partial results are allowed
+        
         Returns:
-            Tuple of (extracted_results, extraction_time)
+            (text, probability) per box in order, None where recognition failed
+            or was skipped
         """
-        logger.info(f"Extracting text from {len(text_regions)} regions")
-        start_time = time.time()
-        extracted_results = []
+        dataset = self.ocr.config['dataset']
+        batches = prepare_crop_batches(
+            images, boxes_list,
+            dataset['image_height'], dataset['image_min_width'], dataset['image_max_width'],
+            settings.OCR_BATCH_SIZE
+        )
+        
+        recognized: List[Optional[Tuple[str, float]]] = [None] * sum(len(boxes) for boxes in boxes_list)
+        for batch_index, (indices, batch) in enumerate(batches):
+            if deadline is not None and deadline.stop_recognition("recognition"):
+                logger.warning(f"Deadline reached after {batch_index} of {len(batches)} OCR batches")
+                break
+            try:
+                outputs = self._translate_batch(batch)
+            except Exception as e:
+                # Fall back to one crop at a time so a bad crop only loses itself
+                logger.warning(f"Batch OCR failed, retrying per crop: {e}")
+                outputs = []
+                for i in range(len(batch)):
+                    try:
+                        outputs.extend(self._translate_batch(batch[i:i + 1]))
+                    except Exception as crop_error:
+                        logger.warning(f"OCR failed for crop: {crop_error}")
+                        outputs.append(None)
+            for index, output in zip(indices.tolist(), outputs):
+                recognized[index] = output
+        return recognized
+    
+    def recognize_routed(
+        self,
+        images: List[np.ndarray],
+        boxes_list: List[np.ndarray],
+        class_names_list: List[List[str]],
+        deadline: Optional[Deadline] = None
+    ) -> List[Optional[Tuple[str, float]]]:
+        """
+        Recognize boxes with the digit recognizer or VietOCR depending on their class
+        
+        Numeric classes run first, so they are kept when the deadline cuts the
+        VietOCR batches short. Digit reads below DIGIT_MIN_CONFIDENCE or not
+        matching their class pattern (e.g. an expiry of "Không thời hạn") are
+        recognized again by VietOCR.
+        
+        Args:
+            images: RGB images
+            boxes_list: Clamped, non-empty boxes per image
+            class_names_list: Class name of each box
+            deadline: Request deadline, see recognize()
+        
+        Returns:
+            (text, probability) per box in order, None where recognition failed
+            or was skipped
+        """
+        digit_masks = [
+            np.array([name in settings.DIGIT_FIELD_PATTERNS for name in class_names], dtype=bool)
+            for class_names in class_names_list
+        ]
+        if self.digit_recognizer is None or not any(mask.any() for mask in digit_masks):
+            return self.recognize(images, boxes_list, deadline)
+        
+        digit_outputs = iter(self.digit_recognizer.recognize(
+            images, [boxes[mask] for boxes, mask in zip(boxes_list, digit_masks)], deadline
+        ))
+        digit_results, retry_masks = [], []
+        for mask, class_names in zip(digit_masks, class_names_list):
+            results = [next(digit_outputs) for _ in range(int(mask.sum()))]
+            names = [name for name, is_digit in zip(class_names, mask.tolist()) if is_digit]
+            retry_masks.append(np.array([
+                output is None or output[1] < settings.DIGIT_MIN_CONFIDENCE
+                or not self._digit_patterns[name].fullmatch(output[0])
+                for output, name in zip(results, names)
+            ], dtype=bool))
+            digit_results.append(results)
+        
+        # Free-text fields and unsure digit reads share the VietOCR batches
+        vietocr_outputs = iter(self.recognize(
+            images,
+            [
+                np.concatenate([boxes[~mask], boxes[mask][retry]])
+                for boxes, mask, retry in zip(boxes_list, digit_masks, retry_masks)
+            ],
+            deadline
+        ))
+        recognized = []
+        for mask, results, retry in zip(digit_masks, digit_results, retry_masks):
+            text_outputs = iter([next(vietocr_outputs) for _ in range(int((~mask).sum()))])
+            retried = iter([next(vietocr_outputs) for _ in range(int(retry.sum()))])
+            digit_iter = iter([next(retried) if is_retry else output for output, is_retry in zip(results, retry.tolist())])
+            recognized.extend(next(digit_iter) if is_digit else next(text_outputs) for is_digit in mask.tolist())
+        
+        self.digit_reads += sum(len(results) for results in digit_results)
+        self.digit_fallbacks += sum(int(retry.sum()) for retry in retry_masks)
+        return recognized
+    
+    def extract_text_from_images(
+        self,
+        images: List[Union[str, np.ndarray]],
+        text_regions_list: List[List[Dict[str, Any]]],
+        deadline: Optional[Deadline] = None
+    ) -> Tuple[List[List[Dict[str, Any]]], float]:
+        """
+        Extract text from detected regions of several images in shared batches
         
-        # Load original image
-        image = cv2.imread(image_path)
-        if image is None:
-            logger.error(f"Cannot read image: {image_path}")
-            raise ValueError(f"Cannot read image: {image_path}")
+        Args:
+            images: Paths to input images or decoded BGR images
+            text_regions_list: Text regions from YOLO, one list per image
+            deadline: Request deadline; regions not reached before it are left out
+        
+        Returns:
+            Tuple of (extracted_results per image, extraction_time)
+        """
+        total_regions = sum(len(regions) for regions in text_regions_list)
+        logger.info(f"Extracting text from {total_regions} regions in {len(images)} images")
+        start_time = time.time()
         
-        for region in text_regions:
+        rgb_images = []
+        boxes_list = []
+        class_names_list = []
+        valid_list = []
+        for image, text_regions in zip(images, text_regions_list):
+            # Load original image
             try:
-                x1, y1, x2, y2 = region['bbox']
-                cropped_image = image[y1:y2, x1:x2]
-                
-                # Convert OpenCV image to PIL Image for VietOCR
-                cropped_pil = Image.fromarray(cv2.cvtColor(cropped_image, cv2.COLOR_BGR2RGB))
-                
-                # Extract text
-                text = self.ocr.predict(cropped_pil)
+                image = load_image(image)
+            except ValueError as e:
+                logger.error(str(e))
+                raise
+            
+            # Convert color once per image; crops are views into the RGB image
+            rgb_images.append(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+            boxes, valid = clamp_boxes([region['bbox'] for region in text_regions], image.shape[1], image.shape[0])
+            boxes_list.append(boxes[valid])
+            class_names_list.append([region['class_name'] for region, is_valid in zip(text_regions, valid.tolist()) if is_valid])
+            valid_list.append(valid)
+        
+        recognized = iter(self.recognize_routed(rgb_images, boxes_list, class_names_list, deadline))
+        outputs = iter([next(recognized) if is_valid else None for valid in valid_list for is_valid in valid.tolist()])
+        
+        extracted_results_list = []
+        for text_regions in text_regions_list:
+            extracted_results = []
+            for region in text_regions:
+                output = next(outputs)
+                if output is None and deadline is not None and deadline.partial:
+                    # Not reached before the deadline
+                    text, prob = None, 0.0
+                elif output is None:
+                    logger.warning(f"OCR failed for region {region['id']} ({region['class_name']})")
+                    text, prob = '', 0.0
+                else:
+                    text, prob = output
+                    logger.debug(f"Extracted text from {region['class_name']}: '{text}' ({prob:.3f})")
                 
                 extracted_results.append({
                     'bbox': region['bbox'],
                     'extracted_text': text,
                     'yolo_confidence': region['confidence'],
-                    'ocr_confidence': 1.0,  # VietOCR doesn't return confidence
-                    'class_id': region['class_id'],
-                    'class_name': region['class_name']
-                })
-                
-                logger.debug(f"Extracted text from {region['class_name']}: '{text}'")
-                
-            except Exception as e:
-                logger.warning(f"OCR failed for region {region['id']} ({region['class_name']}): {e}")
-                extracted_results.append({
-                    'bbox': region['bbox'],
-                    'extracted_text': '',
-                    'yolo_confidence': region['confidence'],
-                    'ocr_confidence': 0.0,
+                    'ocr_confidence': prob,  # mean character probability from VietOCR or the digit recognizer
                     'class_id': region['class_id'],
                     'class_name': region['class_name']
                 })
+            extracted_results_list.append(extracted_results)
         
         extraction_time = time.time() - start_time
-        logger.info(f"OCR completed: {len(extracted_results)} texts extracted in {extraction_time:.3f}s")
+        logger.info(f"OCR completed: {total_regions} texts extracted in {extraction_time:.3f}s")
         
-        return extracted_results, extraction_time
+        return extracted_results_list, extraction_time
+    
+    def extract_text_from_regions(
+        self,
+        image: Union[str, np.ndarray],
+        text_regions: List[Dict[str, Any]],
+        deadline: Optional[Deadline] = None
+    ) -> Tuple[List[Dict[str, Any]], float]:
+        """
+        Extract text from detected regions
+        
+        Args:
+            image: Path to input image or decoded BGR image
+            text_regions: List of text regions from YOLO
+            deadline: Request deadline; regions not reached before it are left out
+        
+        Returns:
+            Tuple of (extracted_results, extraction_time)
+        """
+        extracted_results_list, extraction_time = self.extract_text_from_images([image], [text_regions], deadline)
+        return extracted_results_list[0], extraction_time
     
     def get_model_info(self) -> Dict[str, Any]:
         """Get model information"""
         return {
-            "model_name": settings.VIETOCR_MODEL_NAME,
-            "weights_path": settings.VIETOCR_WEIGHTS_PATH,
-            "device": settings.DEVICE
+            "model_name": self.model_name,
+            "weights_path": self.weights_path,
+            "device": settings.DEVICE,
+            "batch_size": settings.OCR_BATCH_SIZE,
+            "digit_recognizer": self.digit_recognizer.get_model_info() if self.digit_recognizer else None,
+            "digit_reads": self.digit_reads,
+            "digit_fallbacks": self.digit_fallbacks
         }
-
+    
+    def memory_bytes(self) -> int:
+        """Size of the model parameters and buffers"""
+        module = self.ocr.model
+        total = sum(t.numel() * t.element_size() for t in list(module.parameters()) + list(module.buffers()))
+        if self.digit_recognizer is not None:
+            total += self.digit_recognizer.memory_bytes()
+        return total
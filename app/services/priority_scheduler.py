@@ -0,0 +1,186 @@
+"""
+Priority lanes in front of the OCR pipeline
+"""
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, AsyncIterator, Deque, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger("api")
+
+
+class Lane:
+    """Waiting requests and wait-time statistics of one priority class"""
+    
+    def __init__(self, name: str, weight: int, max_slots: int):
+        self.name = name
+        self.weight = weight
+        self.max_slots = max_slots
+        self.waiters: Deque[Tuple[float, asyncio.Future]] = deque()
+        self.active = 0
+        self.credit = 0
+        self.served = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_waits: Deque[float] = deque(maxlen=1000)
+    
+    def record_wait(self, wait: float):
+        self.served += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.recent_waits.append(wait)
+    
+    def status(self) -> Dict[str, Any]:
+        waits = sorted(self.recent_waits)
+        p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0
+        return {
+            "weight": self.weight,
+            "max_slots": self.max_slots,
+            "queued": len(self.waiters),
+            "active": self.active,
+            "served": self.served,
+            "mean_wait_ms": round(self.total_wait / self.served * 1000, 1) if self.served else 0.0,
+            "p95_wait_ms": round(p95 * 1000, 1),
+            "max_wait_ms": round(self.max_wait * 1000, 1)
+        }
+
+
+class PriorityScheduler:
+    """
+    Bounded pipeline slots shared by weighted priority lanes
+    
+    A request takes a slot at once when one is free and its lane is under
+    its slot limit; otherwise it queues in its lane. Each freed slot goes to
+    the urgent lane if its oldest request has waited past the target, else
+    to a lane picked by smooth weighted round robin. Lane slot limits keep
+    capacity free for other lanes, so bulk work cannot fill every slot.
+    """
+    
+    def __init__(
+        self,
+        slots: int = None,
+        weights: Dict[str, int] = None,
+        max_slots: Dict[str, int] = None,
+        urgent_lane: str = None,
+        target_wait: float = None,
+        default_lane: str = None,
+        api_key_lanes: Dict[str, str] = None
+    ):
+        self.slots = slots or settings.PRIORITY_SLOTS
+        weights = weights or settings.PRIORITY_LANE_WEIGHTS
+        max_slots = max_slots if max_slots is not None else settings.PRIORITY_LANE_MAX_SLOTS
+        self.lanes: Dict[str, Lane] = {
+            name: Lane(name, weight, min(self.slots, max_slots.get(name, self.slots)))
+            for name, weight in weights.items()
+        }
+        self.urgent_lane = urgent_lane or settings.PRIORITY_URGENT_LANE
+        self.target_wait = target_wait if target_wait is not None else settings.PRIORITY_TARGET_WAIT
+        self.default_lane = default_lane or settings.PRIORITY_DEFAULT_LANE
+        self.api_key_lanes = api_key_lanes if api_key_lanes is not None else settings.PRIORITY_API_KEY_LANES
+        self.active = 0
+        
+        # Fail at startup rather than with a KeyError on the first request
+        configured = {"default lane": self.default_lane}
+        configured.update({f"lane of API key {api_key[:4]}...": lane for api_key, lane in self.api_key_lanes.items()})
+        for source, lane in configured.items():
+            if lane not in self.lanes:
+                raise ValueError(f"Unknown {source} '{lane}'. Available: {sorted(self.lanes)}")
+    
+    def resolve_lane(self, priority: Optional[str], api_key: Optional[str]) -> str:
+        """
+        Lane of a request: the API key's lane, else the requested one, else the default
+        
+        Raises:
+            ValueError: If the requested lane does not exist
+        """
+        if api_key and api_key in self.api_key_lanes:
+            return self.api_key_lanes[api_key]
+        if priority:
+            if priority not in self.lanes:
+                raise ValueError(f"Unknown priority '{priority}'. Available: {sorted(self.lanes)}")
+            return priority
+        return self.default_lane
+    
+    def _can_start(self, lane: Lane) -> bool:
+        return self.active < self.slots and lane.active < lane.max_slots
+    
+    def _start(self, lane: Lane):
+        self.active += 1
+        lane.active += 1
+    
+    def _pick(self) -> Optional[Lane]:
+        """Lane whose oldest waiter gets the next free slot"""
+        candidates = [lane for lane in self.lanes.values() if lane.waiters and lane.active < lane.max_slots]
+        if not candidates:
+            return None
+        
+        urgent = self.lanes.get(self.urgent_lane)
+        if urgent in candidates and time.time() - urgent.waiters[0][0] >= self.target_wait:
+            return urgent
+        
+        total_weight = sum(lane.weight for lane in candidates)
+        for lane in candidates:
+            lane.credit += lane.weight
+        chosen = max(candidates, key=lambda lane: lane.credit)
+        chosen.credit -= total_weight
+        return chosen
+    
+    def _dispatch(self):
+        """Hand free slots to queued requests"""
+        while self.active < self.slots:
+            lane = self._pick()
+            if lane is None:
+                return
+            enqueued_at, future = lane.waiters.popleft()
+            if future.done():
+                continue
+            self._start(lane)
+            lane.record_wait(time.time() - enqueued_at)
+            future.set_result(None)
+    
+    def _finish(self, lane: Lane):
+        self.active -= 1
+        lane.active -= 1
+        self._dispatch()
+    
+    @asynccontextmanager
+    async def slot(self, lane_name: str) -> AsyncIterator[None]:
+        """Hold a pipeline slot in the given lane for the duration of the block"""
+        if not settings.PRIORITY_ENABLED:
+            yield
+            return
+        
+        lane = self.lanes[lane_name]
+        if not lane.waiters and self._can_start(lane):
+            self._start(lane)
+            lane.record_wait(0.0)
+        else:
+            waiter = (time.time(), asyncio.get_running_loop().create_future())
+            lane.waiters.append(waiter)
+            try:
+                await waiter[1]
+            except asyncio.CancelledError:
+                if waiter[1].done() and not waiter[1].cancelled():
+                    # The slot was granted just as the request went away
+                    self._finish(lane)
+                elif waiter in lane.waiters:
+                    # _dispatch may already have popped and skipped the cancelled future
+                    lane.waiters.remove(waiter)
+                raise
+        
+        try:
+            yield
+        finally:
+            self._finish(lane)
+    
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.PRIORITY_ENABLED,
+            "slots": self.slots,
+            "active": self.active,
+            "target_wait_ms": self.target_wait * 1000,
+            "lanes": {name: lane.status() for name, lane in self.lanes.items()}
+        }
@@ -0,0 +1,134 @@
+"""
+Image quality gate: cheap checks on a thumbnail before any model runs
+"""
+import time
+import logging
+from typing import Dict, Any, List
+import cv2
+import numpy as np
+from app.core.config import settings
+
+logger = logging.getLogger("api")
+
+QUALITY_ISSUES = ["blurry", "dark", "overexposed", "glare", "small_card"]
+
+
+def _edge_span(counts: np.ndarray) -> float:
+    """Fraction of an axis between the 1st and 99th percentile of edge pixels"""
+    cumulative = np.cumsum(counts)
+    low, high = np.searchsorted(cumulative, [cumulative[-1] * 0.01, cumulative[-1] * 0.99])
+    return (high - low) / len(counts)
+
+
+def measure_quality(image: np.ndarray) -> Dict[str, float]:
+    """
+    Quality metrics of an image, computed on a thumbnail
+    
+    sharpness is the Laplacian variance relative to the intensity variance,
+    so it does not depend on contrast. card_ratio is the share of the frame
+    spanned by edges, a rough size of the card against a plain background.
+    
+    Args:
+        image: Decoded BGR image
+    
+    Returns:
+        Dict with sharpness, brightness (mean 0-255), glare (fraction of
+        pixels at or above QUALITY_GLARE_LEVEL) and card_ratio
+    """
+    height, width = image.shape[:2]
+    scale = min(1.0, settings.QUALITY_THUMBNAIL_SIZE / max(height, width))
+    if scale < 1.0:
+        image = cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))),
+                           interpolation=cv2.INTER_LINEAR)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    
+    mean, std = cv2.meanStdDev(gray)
+    laplacian_var = float(cv2.Laplacian(gray, cv2.CV_32F).var())
+    glare = np.count_nonzero(gray >= settings.QUALITY_GLARE_LEVEL) / gray.size
+    
+    edges = cv2.Canny(gray, 50, 150) > 0
+    card_ratio = 0.0
+    if np.count_nonzero(edges) >= 50:
+        card_ratio = _edge_span(edges.sum(axis=0)) * _edge_span(edges.sum(axis=1))
+    
+    return {
+        "sharpness": round(laplacian_var / max(float(std[0][0]) ** 2, 1.0), 4),
+        "brightness": round(float(mean[0][0]), 1),
+        "glare": round(float(glare), 4),
+        "card_ratio": round(float(card_ratio), 3)
+    }
+
+
+def find_issues(metrics: Dict[str, float]) -> List[str]:
+    """Names of the QUALITY_* thresholds the metrics fail"""
+    issues = []
+    if metrics["sharpness"] < settings.QUALITY_MIN_SHARPNESS:
+        issues.append("blurry")
+    if metrics["brightness"] < settings.QUALITY_MIN_BRIGHTNESS:
+        issues.append("dark")
+    if metrics["brightness"] > settings.QUALITY_MAX_BRIGHTNESS:
+        issues.append("overexposed")
+    if metrics["glare"] > settings.QUALITY_MAX_GLARE_FRACTION:
+        issues.append("glare")
+    if metrics["card_ratio"] < settings.QUALITY_MIN_CARD_RATIO:
+        issues.append("small_card")
+    return issues
+
+
+class QualityGate:
+    """
+    Rejects images that cannot give a usable result before detection runs
+    
+    Issues listed in QUALITY_REJECT_ISSUES reject the image; the others are
+    only reported in the response so the client can ask for a retake.
+    """
+    
+    def __init__(self):
+        self.checked = 0
+        self.rejected = 0
+        self.flagged = 0
+        self.issue_counts = {issue: 0 for issue in QUALITY_ISSUES}
+        self.total_time = 0.0
+    
+    def check(self, image: np.ndarray) -> Dict[str, Any]:
+        """
+        Measure an image and decide whether it goes through the pipeline
+        
+        Args:
+            image: Decoded BGR image
+        
+        Returns:
+            Quality report: the metrics plus issues (failed checks) and
+            rejected (True when a rejecting issue was found)
+        """
+        start_time = time.time()
+        report: Dict[str, Any] = measure_quality(image)
+        issues = find_issues(report)
+        report["issues"] = issues
+        report["rejected"] = any(issue in settings.QUALITY_REJECT_ISSUES for issue in issues)
+        
+        self.checked += 1
+        self.total_time += time.time() - start_time
+        for issue in issues:
+            self.issue_counts[issue] += 1
+        if report["rejected"]:
+            self.rejected += 1
+            logger.warning(f"Image rejected by quality gate: {', '.join(issues)} {report}")
+        elif issues:
+            self.flagged += 1
+            logger.info(f"Image flagged by quality gate: {', '.join(issues)}")
+        return report
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.QUALITY_GATE_ENABLED,
+            "checked": self.checked,
+            "passed": self.checked - self.rejected - self.flagged,
+            "rejected": self.rejected,
+            "flagged": self.flagged,
+            "issues": dict(self.issue_counts),
+            "mean_time_ms": self.total_time / self.checked * 1000 if self.checked else 0.0
+        }
+
+
+quality_gate = QualityGate()
@@ -0,0 +1,142 @@
+"""
+Pipeline stand-in for API nodes in broker mode
+"""
+import os
+import time
+import logging
+from concurrent import futures
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from app.models.schemas import OCRResponse
+from app.services.broker import Broker, get_broker
+from app.services.inference_worker import encode_task_image
+from app.core.config import settings
+from app.utils.deadline import Deadline, RequestAborted
+
+logger = logging.getLogger("api")
+
+
+class RemotePipeline:
+    """
+    Sends images to inference workers through the broker and waits for their responses
+    
+    Has the OCRPipeline methods used by the endpoints and the job worker, so
+    ModelManager serves it in place of the real pipeline and the API node
+    never loads a model. Variants are forwarded to the workers by name.
+    """
+    
+    def __init__(
+        self,
+        yolo_model_path: Optional[str] = None,
+        ocr_weights_path: Optional[str] = None,
+        model_version: Optional[str] = None,
+        broker: Optional[Broker] = None,
+        detector: Optional[str] = None,
+        recognizer: Optional[str] = None
+    ):
+        self.yolo_model_path = yolo_model_path or settings.YOLO_MODEL_PATH
+        self.ocr_weights_path = ocr_weights_path or settings.VIETOCR_WEIGHTS_PATH
+        self.model_version = model_version or "broker"
+        self.broker = broker or get_broker()
+        self.detector = detector
+        self.recognizer = recognizer
+        self.start_time = time.time()
+        self._variants: Dict[Tuple[str, str], "RemotePipeline"] = {}
+    
+    def variant(self, detector: Optional[str], recognizer: Optional[str]) -> "RemotePipeline":
+        """Pipeline for other model variants; kept so identical uploads still coalesce"""
+        if not detector and not recognizer:
+            return self
+        key = (detector, recognizer)
+        if key not in self._variants:
+            self._variants[key] = RemotePipeline(
+                self.yolo_model_path, self.ocr_weights_path, f"{self.model_version}:{detector}+{recognizer}",
+                self.broker, detector, recognizer
+            )
+        return self._variants[key]
+    
+    def warm_up(self, runs: int = None):
+        """Nothing to warm; workers warm their own models"""
+    
+    def _submit(self, meta: Dict[str, Any], payload: bytes, deadline: Optional[Deadline]) -> futures.Future:
+        meta.update(detector=self.detector, recognizer=self.recognizer, expires_at=None)
+        if deadline is not None:
+            meta.update(expires_at=time.time() + deadline.remaining(), allow_partial=deadline.allow_partial)
+        return self.broker.submit(meta, payload)
+    
+    def _wait(self, future: futures.Future, deadline: Optional[Deadline]) -> OCRResponse:
+        """
+        Wait for a worker's response
+        
+        Past the deadline the worker may still be sending a partial result, so
+        the wait ends BROKER_RESULT_GRACE seconds later.
+        
+        Raises:
+            RequestAborted: If the deadline passed, the client disconnected, or the worker stopped the task
+            ValueError: If the worker found the task's input invalid
+        """
+        while True:
+            try:
+                meta, payload = future.result(timeout=settings.DISCONNECT_POLL_INTERVAL)
+                break
+            except futures.TimeoutError:
+                if deadline is not None and (deadline.abandoned or deadline.remaining() < -settings.BROKER_RESULT_GRACE):
+                    future.cancel()
+                    deadline.check("broker")
+        
+        if "error" in meta:
+            if meta.get("aborted"):
+                raise RequestAborted(meta["aborted"], meta["stage"])
+            if meta.get("invalid"):
+                raise ValueError(meta["error"])
+            raise RuntimeError(f"Inference worker failed: {meta['error']}")
+        return OCRResponse.model_validate_json(payload)
+    
+    def process_image(self, image_path: str, deadline: Optional[Deadline] = None) -> OCRResponse:
+        """Same contract as OCRPipeline.process_image; the file bytes are sent as they are"""
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"Image not found: {image_path}")
+        with open(image_path, "rb") as f:
+            payload = f.read()
+        return self._wait(self._submit({"filename": image_path, "encoding": "file"}, payload, deadline), deadline)
+    
+    def process_batch(
+        self,
+        images: List[np.ndarray],
+        image_paths: List[str],
+        deadline: Optional[Deadline] = None
+    ) -> List[OCRResponse]:
+        """Same contract as OCRPipeline.process_batch; each image is a separate task"""
+        submitted = []
+        for image, image_path in zip(images, image_paths):
+            meta, payload = encode_task_image(image)
+            meta["filename"] = image_path
+            submitted.append(self._submit(meta, payload, deadline))
+        try:
+            return [self._wait(future, deadline) for future in submitted]
+        finally:
+            for future in submitted:
+                future.cancel()
+    
+    def recognize_regions(
+        self,
+        image: np.ndarray,
+        image_path: str,
+        regions: List[Dict[str, Any]],
+        deadline: Optional[Deadline] = None
+    ) -> OCRResponse:
+        """Same contract as OCRPipeline.recognize_regions; the image is sent with the regions"""
+        meta, payload = encode_task_image(image)
+        meta.update(filename=image_path, regions=regions)
+        return self._wait(self._submit(meta, payload, deadline), deadline)
+    
+    def get_service_info(self) -> Dict[str, Any]:
+        return {
+            "broker": self.broker.stats(),
+            "model_version": self.model_version,
+            "uptime": time.time() - self.start_time
+        }
+    
+    def is_ready(self) -> bool:
+        """Ready while at least one inference worker is fetching from the broker"""
+        return self.broker.stats().get("workers", 0) > 0
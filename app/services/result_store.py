@@ -0,0 +1,72 @@
+"""
+Store of recent OCR results for on-demand annotated image rendering
+"""
+import uuid
+import logging
+from typing import Optional, Tuple, Dict, Any
+from app.models.schemas import OCRResponse
+from app.utils.cache import LRUCache
+from app.utils.image import decode_image
+from app.utils.visualization import render_annotated_image
+from app.core.config import settings
+
+logger = logging.getLogger("api")
+
+
+class ResultStore:
+    """Keeps uploaded image bytes with their results and caches rendered images"""
+    
+    def __init__(self):
+        self.results = LRUCache(
+            settings.RESULT_STORE_MAX_ITEMS,
+            settings.RESULT_STORE_MAX_BYTES,
+            sizeof=lambda entry: len(entry[0])
+        )
+        self.renders = LRUCache(
+            settings.RENDER_CACHE_MAX_ITEMS,
+            settings.RENDER_CACHE_MAX_BYTES,
+            sizeof=len
+        )
+    
+    def add(self, file_content: bytes, result: OCRResponse) -> str:
+        """Store a result with its source image and return the result id"""
+        result_id = uuid.uuid4().hex
+        self.results.put(result_id, (file_content, result))
+        return result_id
+    
+    def get(self, result_id: str) -> Optional[Tuple[bytes, OCRResponse]]:
+        return self.results.get(result_id)
+    
+    def render(self, result_id: str, max_width: int, image_format: str, quality: int) -> Optional[bytes]:
+        """
+        Render the annotated image for a stored result, cached per parameters
+        
+        Returns:
+            Encoded image bytes, or None if the result is unknown or evicted
+        """
+        key = (result_id, max_width, image_format, quality)
+        rendered = self.renders.get(key)
+        if rendered is not None:
+            return rendered
+        
+        entry = self.results.get(result_id)
+        if entry is None:
+            return None
+        
+        file_content, result = entry
+        rendered = render_annotated_image(
+            decode_image(file_content), result.detected_texts, max_width, image_format, quality
+        )
+        self.renders.put(key, rendered)
+        logger.info(f"Rendered result {result_id} as {image_format} ({len(rendered)} bytes)")
+        return rendered
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "results": self.results.stats(),
+            "renders": self.renders.stats()
+        }
+
+
+# Global result store instance
+result_store = ResultStore()
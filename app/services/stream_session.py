@@ -0,0 +1,138 @@
+"""
+Per-connection state for streaming camera frames
+"""
+import time
+import logging
+from typing import List, Dict, Any, Optional
+import cv2
+import numpy as np
+from app.core.config import settings
+from app.services.field_tracker import FieldTracker
+from app.utils.boxes import box_iou
+from app.utils.deadline import Deadline
+
+logger = logging.getLogger("api")
+
+
+def sharpness(image: np.ndarray, box: List[int]) -> float:
+    """Variance of the Laplacian inside box; low values mean motion or focus blur"""
+    x1, y1, x2, y2 = box
+    crop = image[max(y1, 0):y2, max(x1, 0):x2]
+    if crop.size == 0:
+        return 0.0
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+class StreamSession:
+    """
+    Detection on every frame, recognition once the card is stable and sharp
+    
+    Further stable, sharp frames go through a FieldTracker, which only
+    re-recognizes fields whose crop changed and fuses text across frames;
+    a new result is sent whenever the fused text changes.
+    """
+    
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.tracker = FieldTracker()
+        self.card_box: Optional[List[int]] = None
+        self.stable_frames = 0
+        self.recognized = False
+        self.fused_texts: Optional[tuple] = None
+        self.frames = 0
+        self.recognitions = 0
+    
+    @staticmethod
+    def _card_box(text_regions: List[Dict[str, Any]], all_regions: List[Dict[str, Any]]) -> Optional[List[int]]:
+        """Box of the card itself, or the extent of the text regions if no card class was detected"""
+        cards = [r for r in all_regions if r['class_name'] in settings.STREAM_CARD_CLASSES]
+        if cards:
+            return max(cards, key=lambda r: r['confidence'])['bbox']
+        if not text_regions:
+            return None
+        boxes = np.array([r['bbox'] for r in text_regions])
+        return [int(boxes[:, 0].min()), int(boxes[:, 1].min()), int(boxes[:, 2].max()), int(boxes[:, 3].max())]
+    
+    def _update_stability(self, card_box: Optional[List[int]]):
+        if card_box is None:
+            self.card_box = None
+            self.stable_frames = 0
+            self.recognized = False
+            return
+        
+        if self.card_box is not None and box_iou(card_box, self.card_box) >= settings.STREAM_STABLE_IOU:
+            self.stable_frames += 1
+        else:
+            # Card moved: a new position needs a new recognition
+            self.stable_frames = 0
+            self.recognized = False
+        self.card_box = card_box
+    
+    def process_frame(self, image: np.ndarray, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """
+        Run one frame through the session
+        
+        Args:
+            image: Decoded BGR frame
+            deadline: Frame deadline, checked after detection
+        
+        Returns:
+            Message for the client: type "quality" when the quality gate
+            rejected the frame, "detection" with stability info, or "result"
+            with the full OCR response
+        
+        Raises:
+            RequestAborted: If the deadline passed before recognition
+        """
+        self.frames += 1
+        quality = self.pipeline._check_quality(image)
+        if quality is not None and quality["rejected"]:
+            # Not counted as a stable frame, but the last result stays valid
+            self.stable_frames = 0
+            return {"type": "quality", "frame": self.frames, "quality": quality}
+        
+        text_regions, detection_time, all_regions = self.pipeline.yolo_service.detect_text_regions(image)
+        if deadline is not None:
+            deadline.check("detection")
+        card_box = self._card_box(text_regions, all_regions)
+        self._update_stability(card_box)
+        frame_sharpness = sharpness(image, card_box) if card_box is not None else 0.0
+        
+        ready = (
+            bool(text_regions)
+            and self.stable_frames >= settings.STREAM_STABLE_FRAMES
+            and frame_sharpness >= settings.STREAM_MIN_SHARPNESS
+        )
+        fused_texts = None
+        if ready:
+            extracted_results, ocr_time = self.tracker.update(image, text_regions, self.pipeline.ocr_service)
+            fused_texts = tuple((r['class_name'], r['extracted_text']) for r in extracted_results)
+        
+        if fused_texts is None or (self.recognized and fused_texts == self.fused_texts):
+            return {
+                "type": "detection",
+                "frame": self.frames,
+                "card_box": card_box,
+                "stable_frames": self.stable_frames,
+                "sharpness": frame_sharpness,
+                "recognized": self.recognized,
+                "regions": [
+                    {"class_name": r['class_name'], "bbox": r['bbox'], "confidence": r['confidence']}
+                    for r in text_regions
+                ],
+                "detection_time": detection_time
+            }
+        
+        result = self.pipeline._build_response(
+            f"stream_frame_{self.frames}", text_regions, all_regions, extracted_results, detection_time, ocr_time
+        )
+        self.recognized = True
+        self.fused_texts = fused_texts
+        self.recognitions += 1
+        logger.info(f"Stream recognition on frame {self.frames} (sharpness {frame_sharpness:.1f})")
+        return {
+            "type": "result",
+            "frame": self.frames,
+            "result": result.model_dump(mode="json")
+        }
@@ -0,0 +1,153 @@
+"""
+Traffic capture service for recording /detect requests
+"""
+import io
+import os
+import time
+import json
+import queue
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple
+from PIL import Image
+from app.models.schemas import OCRResponse
+from app.core.config import settings
+
+logger = logging.getLogger("api")
+
+
+class TrafficCapture:
+    """
+    Append-only store of request metadata (and optionally payloads)
+    
+    Handlers only enqueue; a writer thread hashes, writes payloads and
+    appends the log, so disk latency stays off the event loop. When the
+    queue is full records are dropped rather than slowing requests. The
+    writer starts on the first submit unless start_writer is False, in
+    which case records stay queued until start() is called.
+    """
+    
+    def __init__(self, capture_dir: str = None, save_payload: bool = None, queue_size: int = None,
+                 start_writer: bool = True):
+        self.capture_dir = capture_dir or settings.CAPTURE_DIR
+        self.save_payload = settings.CAPTURE_SAVE_PAYLOAD if save_payload is None else save_payload
+        self.log_path = os.path.join(self.capture_dir, "traffic.jsonl")
+        self.payload_dir = os.path.join(self.capture_dir, "payloads")
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size or settings.CAPTURE_QUEUE_SIZE)
+        self._writer: Optional[threading.Thread] = None
+        self.start_writer = start_writer
+        self.dropped = 0
+        os.makedirs(self.payload_dir if self.save_payload else self.capture_dir, exist_ok=True)
+        logger.info(f"Traffic capture enabled: {self.log_path} (payloads: {self.save_payload})")
+    
+    def start(self):
+        """Start the writer thread if it is not running yet"""
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="traffic-capture", daemon=True)
+                self._writer.start()
+    
+    def submit(self, *args):
+        """Queue a record() call for the writer thread without blocking"""
+        if self._writer is None and self.start_writer:
+            self.start()
+        try:
+            self._queue.put_nowait(args)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 100 == 1:
+                logger.warning(f"Traffic capture queue full; {self.dropped} records dropped so far")
+    
+    def _write_loop(self):
+        while True:
+            args = self._queue.get()
+            try:
+                self.record(*args)
+            except Exception as e:
+                logger.warning(f"Failed to capture request: {e}")
+            finally:
+                self._queue.task_done()
+    
+    def flush(self):
+        """Wait until every queued record is written"""
+        self._queue.join()
+    
+    @staticmethod
+    def _image_size(file_content: bytes) -> Tuple[Optional[int], Optional[int]]:
+        """Read image dimensions from the header without decoding pixels"""
+        try:
+            with Image.open(io.BytesIO(file_content)) as image:
+                return image.size
+        except Exception:
+            return None, None
+    
+    def record(
+        self,
+        file_content: bytes,
+        filename: str,
+        arrival_time: float,
+        status_code: int,
+        timing: Dict[str, float]
+    ) -> Dict[str, Any]:
+        """
+        Record one request
+        
+        Args:
+            file_content: Uploaded image bytes
+            filename: Original filename
+            arrival_time: Unix time the request arrived
+            status_code: HTTP status returned to the client
+            timing: Per-stage latency in seconds
+        
+        Returns:
+            The record written to the capture log
+        """
+        content_hash = hashlib.sha256(file_content).hexdigest()
+        width, height = self._image_size(file_content)
+        
+        payload_path = None
+        if self.save_payload:
+            file_ext = os.path.splitext(filename)[1].lower()
+            payload_path = os.path.join(self.payload_dir, f"{content_hash}{file_ext}")
+            if not os.path.exists(payload_path):
+                with open(payload_path, "wb") as buffer:
+                    buffer.write(file_content)
+        
+        record = {
+            "arrival_time": arrival_time,
+            "filename": filename,
+            "content_sha256": content_hash,
+            "size_bytes": len(file_content),
+            "width": width,
+            "height": height,
+            "status_code": status_code,
+            "timing": timing,
+            "payload_path": payload_path
+        }
+        
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        
+        return record
+
+
+# Global capture instance, only created when capture is enabled
+traffic_capture: Optional[TrafficCapture] = TrafficCapture() if settings.CAPTURE_ENABLED else None
+
+
+def capture_request(file_content: bytes, filename: str, arrival_time: float,
+                    status_code: int, read_time: float, result: Optional[OCRResponse] = None):
+    """Record request metadata when traffic capture is enabled"""
+    if traffic_capture is None:
+        return
+    timing = {
+        "read_time": read_time,
+        "handler_time": time.time() - arrival_time
+    }
+    if result is not None:
+        timing.update(result.timing.model_dump())
+    traffic_capture.submit(file_content, filename, arrival_time, status_code, timing)
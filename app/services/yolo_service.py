@@ -3,9 +3,10 @@ YOLO detection service
 """
 import time
 import logging
-from typing import List, Tuple, Dict, Any
-from ultralytics import YOLO
+from typing import List, Tuple, Dict, Any, Union, Optional
+import numpy as np
 from app.core.config import settings
+from app.utils.image import describe_image
 
 logger = logging.getLogger("models")
 
@@ -13,18 +14,25 @@ logger = logging.getLogger("models")
 class YOLOService:
     """YOLO text detection service"""
     
-    def __init__(self):
+    def __init__(self, model_path: Optional[str] = None, text_labels: Optional[List[str]] = None):
+        self.model_path = model_path or settings.YOLO_MODEL_PATH
+        self.text_labels = text_labels or settings.TEXT_LABELS
         self.model = None
         self.class_names = {}
         self.text_class_ids = []
+        self.predict_args: Dict[str, Any] = {}
+        self.pruned_regions = 0
         self._load_model()
         self._setup_text_labels()
+        self._setup_postprocess()
     
     def _load_model(self):
         """Load YOLO model"""
         try:
-            logger.info(f"Loading YOLO model from {settings.YOLO_MODEL_PATH}")
-            self.model = YOLO(settings.YOLO_MODEL_PATH)
+            from ultralytics import YOLO
+            
+            logger.info(f"Loading YOLO model from {self.model_path}")
+            self.model = YOLO(self.model_path)
             self.class_names = self.model.names
             logger.info(f"YOLO model loaded successfully with {len(self.class_names)} classes")
         except Exception as e:
@@ -37,56 +45,124 @@ class YOLOService:
             return
             
         for class_id, class_name in self.class_names.items():
-            if class_name in settings.TEXT_LABELS:
+            if class_name in self.text_labels:
                 self.text_class_ids.append(int(class_id))
         
-        logger.info(f"Text labels to process: {settings.TEXT_LABELS}")
+        logger.info(f"Text labels to process: {self.text_labels}")
         logger.info(f"Class IDs for text processing: {self.text_class_ids}")
     
-    def detect_text_regions(self, image_path: str) -> Tuple[List[Dict[str, Any]], float, List[Dict[str, Any]]]:
+    def _setup_postprocess(self):
+        """Model call arguments and per-class lookup tables for pruning text boxes"""
+        name_to_id = {class_name: int(class_id) for class_id, class_name in self.class_names.items()}
+        self.predict_args = {
+            "conf": settings.DETECTION_CONF,
+            "iou": settings.DETECTION_IOU,
+            "max_det": settings.DETECTION_MAX_DET
+        }
+        if settings.DETECTION_FILTER_CLASSES:
+            # The card class is still needed by stream sessions, which look for it in all_regions
+            extra_ids = [name_to_id[name] for name in settings.STREAM_CARD_CLASSES if name in name_to_id]
+            self.predict_args["classes"] = sorted(set(self.text_class_ids + extra_ids))
+        
+        # Indexed by class id; classes without a policy keep every box above the threshold
+        num_ids = max(name_to_id.values(), default=-1) + 1
+        self._min_conf = np.full(num_ids, settings.OCR_MIN_DETECTION_CONF, dtype=np.float32)
+        self._max_count = np.full(num_ids, np.iinfo(np.int32).max, dtype=np.int32)
+        for class_name, policy in settings.DETECTION_CLASS_POLICIES.items():
+            if class_name not in name_to_id:
+                continue
+            if "min_conf" in policy:
+                self._min_conf[name_to_id[class_name]] = policy["min_conf"]
+            if "max_count" in policy:
+                self._max_count[name_to_id[class_name]] = policy["max_count"]
+        self._is_text = np.zeros(num_ids, dtype=bool)
+        self._is_text[self.text_class_ids] = True
+        self.card_class_ids = [name_to_id[name] for name in settings.STREAM_CARD_CLASSES if name in name_to_id]
+    
+    def _text_mask(self, classes: np.ndarray, confidences: np.ndarray) -> np.ndarray:
+        """
+        Select the boxes worth recognizing
+        
+        Keeps text-class boxes at or above their class's minimum confidence,
+        then the max_count most confident boxes of each class.
+        
+        Args:
+            classes: Class id per box
+            confidences: Confidence per box
+        
+        Returns:
+            Boolean mask over the boxes
+        """
+        mask = self._is_text[classes] & (confidences >= self._min_conf[classes])
+        candidates = np.flatnonzero(mask)
+        if len(candidates) == 0:
+            return mask
+        
+        # Rank candidates within their class by descending confidence
+        order = candidates[np.lexsort((-confidences[candidates], classes[candidates]))]
+        sorted_classes = classes[order]
+        ranks = np.arange(len(order)) - np.searchsorted(sorted_classes, sorted_classes, side="left")
+        mask[order[ranks >= self._max_count[sorted_classes]]] = False
+        return mask
+    
+    def _parse_result(self, result) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Convert one YOLO result into region dicts
+        
+        Returns:
+            Tuple of (text_regions, all_regions)
+        """
+        if result.boxes is None or len(result.boxes) == 0:
+            return [], []
+        
+        boxes = result.boxes.xyxy.cpu().numpy().astype(int).tolist()
+        confidences = result.boxes.conf.cpu().numpy()
+        classes = result.boxes.cls.cpu().numpy().astype(int)
+        
+        all_regions = [
+            {
+                'id': i + 1,
+                'bbox': box,
+                'confidence': confidence,
+                'class_id': class_id,
+                'class_name': self.class_names.get(class_id, f"class_{class_id}")
+            }
+            for i, (box, confidence, class_id) in enumerate(zip(boxes, confidences.tolist(), classes.tolist()))
+        ]
+        
+        # Only add text regions that we want to OCR
+        text_mask = self._text_mask(classes, confidences)
+        text_regions = [all_regions[i] for i in np.flatnonzero(text_mask).tolist()]
+        
+        pruned = int(self._is_text[classes].sum()) - len(text_regions)
+        if pruned:
+            self.pruned_regions += pruned
+            logger.info(f"Skipped OCR for {pruned} duplicate or low-confidence text boxes")
+        return text_regions, all_regions
+    
+    def detect_text_regions(self, image: Union[str, np.ndarray]) -> Tuple[List[Dict[str, Any]], float, List[Dict[str, Any]]]:
         """
         Detect text regions in image
         
         Args:
-            image_path: Path to input image
+            image: Path to input image or decoded BGR image
             
         Returns:
             Tuple of (text_regions, detection_time, all_regions)
         """
-        logger.info(f"Detecting text regions in {image_path}")
+        logger.info(f"Detecting text regions in {describe_image(image)}")
         start_time = time.time()
         
         try:
-            results = self.model(image_path)
+            results = self.model(image, **self.predict_args)
             detection_time = time.time() - start_time
             
             text_regions = []
             all_regions = []
-            
             for result in results:
-                if result.boxes is not None:
-                    boxes = result.boxes.xyxy.cpu().numpy()
-                    confidences = result.boxes.conf.cpu().numpy()
-                    classes = result.boxes.cls.cpu().numpy()
-                    
-                    for i, (box, conf, cls) in enumerate(zip(boxes, confidences, classes)):
-                        x1, y1, x2, y2 = box.astype(int)
-                        class_id = int(cls)
-                        class_name = self.class_names.get(class_id, f"class_{class_id}")
-                        
-                        region_info = {
-                            'id': i + 1,
-                            'bbox': [int(x1), int(y1), int(x2), int(y2)],
-                            'confidence': float(conf),
-                            'class_id': class_id,
-                            'class_name': class_name
-                        }
-                        
-                        all_regions.append(region_info)
-                        
-                        # Only add text regions that we want to OCR
-                        if class_id in self.text_class_ids:
-                            text_regions.append(region_info)
+                result_text_regions, result_all_regions = self._parse_result(result)
+                text_regions.extend(result_text_regions)
+                all_regions.extend(result_all_regions)
             
             logger.info(f"YOLO detected {len(all_regions)} total regions")
             logger.info(f"Text regions for OCR: {len(text_regions)}")
@@ -98,13 +174,131 @@ class YOLOService:
             logger.error(f"YOLO detection failed: {e}")
             raise
     
+    def detect_classes(self, image: np.ndarray, class_names: List[str], imgsz: int) -> List[Dict[str, Any]]:
+        """
+        Detect only the given classes at a reduced input size
+        
+        Used by the cheap passes that run before field detection.
+        
+        Args:
+            image: Decoded BGR image
+            class_names: Classes to keep
+            imgsz: Model input size
+            
+        Returns:
+            Region dicts of the requested classes
+        """
+        class_ids = [int(class_id) for class_id, class_name in self.class_names.items() if class_name in class_names]
+        if not class_ids:
+            return []
+        results = self.model(image, imgsz=imgsz, classes=class_ids, conf=settings.DETECTION_CONF, verbose=False)
+        return self._parse_result(results[0])[1]
+    
+    def detect_text_regions_two_stage(self, images: List[np.ndarray]) -> Tuple[List[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]], Dict[str, float]]:
+        """
+        Find the card at low resolution, then detect fields in the card crop
+        
+        The localization pass keeps only the most confident card box at
+        LOCALIZE_IMGSZ. The field pass runs on the crops at FIELD_IMGSZ, so
+        the card fills the model input instead of a letterboxed photo. Images
+        without a card box get the field pass on the full image.
+        
+        Args:
+            images: Decoded BGR images
+            
+        Returns:
+            Tuple of ([(text_regions, all_regions) per image], stage times in seconds);
+            boxes are in the coordinates of the input images
+        """
+        start_time = time.time()
+        results = self.model(
+            images, imgsz=settings.LOCALIZE_IMGSZ, classes=self.card_class_ids,
+            conf=settings.LOCALIZE_CONF, max_det=1, verbose=False
+        )
+        crops, cards = [], []
+        for image, result in zip(images, results):
+            card = next(iter(self._parse_result(result)[1]), None)
+            if card is None:
+                crops.append(image)
+                cards.append(None)
+                continue
+            x1, y1, x2, y2 = card['bbox']
+            margin_x = int((x2 - x1) * settings.LOCALIZE_MARGIN)
+            margin_y = int((y2 - y1) * settings.LOCALIZE_MARGIN)
+            x1, y1 = max(0, x1 - margin_x), max(0, y1 - margin_y)
+            x2, y2 = min(image.shape[1], x2 + margin_x), min(image.shape[0], y2 + margin_y)
+            crops.append(image[y1:y2, x1:x2])
+            cards.append((card, x1, y1))
+        localization_time = time.time() - start_time
+        
+        start_time = time.time()
+        field_args = dict(self.predict_args, imgsz=settings.FIELD_IMGSZ)
+        if "classes" in field_args:
+            field_args["classes"] = self.text_class_ids
+        results = self.model(crops, verbose=False, **field_args)
+        
+        regions = []
+        for result, card in zip(results, cards):
+            text_regions, all_regions = self._parse_result(result)
+            if card is not None:
+                card_region, offset_x, offset_y = card
+                # Text regions are the same dicts, so they are shifted too
+                for region in all_regions:
+                    x1, y1, x2, y2 = region['bbox']
+                    region['bbox'] = [x1 + offset_x, y1 + offset_y, x2 + offset_x, y2 + offset_y]
+                all_regions = [region for region in all_regions if region['class_id'] not in self.card_class_ids]
+                all_regions.append(card_region)
+                for i, region in enumerate(all_regions):
+                    region['id'] = i + 1
+            regions.append((text_regions, all_regions))
+        field_time = time.time() - start_time
+        
+        found = sum(card is not None for card in cards)
+        logger.info(f"Two-stage detection: card found in {found}/{len(images)} images, "
+                    f"localization {localization_time:.3f}s, fields {field_time:.3f}s")
+        return regions, {"localization": localization_time, "fields": field_time}
+    
+    def has_classes(self, class_names: List[str]) -> bool:
+        """Whether the model predicts every one of the given classes"""
+        return set(class_names) <= set(self.class_names.values())
+    
+    def detect_text_regions_batch(self, images: List[np.ndarray]) -> Tuple[List[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]], float]:
+        """
+        Detect text regions in a batch of decoded images with one model call
+        
+        Args:
+            images: Decoded BGR images
+            
+        Returns:
+            Tuple of ([(text_regions, all_regions) per image], detection_time)
+        """
+        logger.info(f"Detecting text regions in batch of {len(images)} images")
+        start_time = time.time()
+        
+        try:
+            results = self.model(images, verbose=False, **self.predict_args)
+            detection_time = time.time() - start_time
+            regions = [self._parse_result(result) for result in results]
+            logger.info(f"Batch detection completed in {detection_time:.3f}s")
+            return regions, detection_time
+        except Exception as e:
+            logger.error(f"YOLO batch detection failed: {e}")
+            raise
+    
     def get_model_info(self) -> Dict[str, Any]:
         """Get model information"""
         return {
-            "model_path": settings.YOLO_MODEL_PATH,
+            "model_path": self.model_path,
             "num_classes": len(self.class_names),
             "class_names": self.class_names,
             "text_class_ids": self.text_class_ids,
-            "text_labels": settings.TEXT_LABELS
+            "text_labels": self.text_labels,
+            "predict_args": self.predict_args,
+            "pruned_regions": self.pruned_regions
         }
+    
+    def memory_bytes(self) -> int:
+        """Size of the model parameters and buffers"""
+        module = self.model.model
+        return sum(t.numel() * t.element_size() for t in list(module.parameters()) + list(module.buffers()))
 
@@ -0,0 +1,41 @@
+"""
+Bounding box helpers
+"""
+from typing import List
+import cv2
+import numpy as np
+
+
+def box_iou(a: List[int], b: List[int]) -> float:
+    """Intersection over union of two [x1, y1, x2, y2] boxes"""
+    inter_w = min(a[2], b[2]) - max(a[0], b[0])
+    inter_h = min(a[3], b[3]) - max(a[1], b[1])
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    inter = inter_w * inter_h
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def warp_boxes(boxes: np.ndarray, matrix: np.ndarray, width: int, height: int) -> np.ndarray:
+    """
+    Map axis-aligned boxes through a perspective transform
+    
+    Args:
+        boxes: (n, 4) [x1, y1, x2, y2] boxes
+        matrix: 3x3 perspective matrix from the boxes' image to the target image
+        width: Target image width, used for clipping
+        height: Target image height, used for clipping
+    
+    Returns:
+        (n, 4) int boxes enclosing the transformed box corners
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    if len(boxes) == 0:
+        return np.zeros((0, 4), dtype=np.int32)
+    corners = boxes[:, [0, 1, 2, 1, 2, 3, 0, 3]].reshape(-1, 1, 2)
+    warped = cv2.perspectiveTransform(corners, matrix).reshape(-1, 4, 2)
+    mapped = np.concatenate([warped.min(axis=1), warped.max(axis=1)], axis=1)
+    mapped[:, 0::2] = np.clip(mapped[:, 0::2], 0, width - 1)
+    mapped[:, 1::2] = np.clip(mapped[:, 1::2], 0, height - 1)
+    return np.round(mapped).astype(np.int32)
@@ -0,0 +1,104 @@
+"""
+Bounded in-memory caches
+"""
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache bounded by item count and total size
+    
+    With a ttl, items also expire that many seconds after they were last
+    stored or read.
+    """
+    
+    def __init__(
+        self,
+        max_items: int,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = None,
+        ttl: Optional[float] = None
+    ):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self.ttl = ttl
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._items: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._expires: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            self._expire()
+            if key not in self._items:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self._touch(key)
+            self.hits += 1
+            return self._items[key]
+    
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            if key in self._items:
+                self.total_bytes -= self.sizeof(self._items.pop(key))
+            self._items[key] = value
+            self._touch(key)
+            self.total_bytes += self.sizeof(value)
+            self._expire()
+            self._evict()
+    
+    def pop(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._items.pop(key, None)
+            self._expires.pop(key, None)
+            if value is not None:
+                self.total_bytes -= self.sizeof(value)
+            return value
+    
+    def _touch(self, key: Hashable):
+        if self.ttl is not None:
+            self._expires[key] = time.monotonic() + self.ttl
+    
+    def _expire(self):
+        """Drop expired items; the least recently used expire first"""
+        if self.ttl is None:
+            return
+        now = time.monotonic()
+        while self._items:
+            key = next(iter(self._items))
+            if self._expires[key] > now:
+                break
+            self.total_bytes -= self.sizeof(self._items.pop(key))
+            del self._expires[key]
+            self.expired += 1
+    
+    def _evict(self):
+        """Drop least recently used items until within bounds"""
+        while len(self._items) > self.max_items or (
+            self.max_bytes is not None and self.total_bytes > self.max_bytes and len(self._items) > 1
+        ):
+            key, value = self._items.popitem(last=False)
+            self._expires.pop(key, None)
+            self.total_bytes -= self.sizeof(value)
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def stats(self) -> dict:
+        stats = {
+            "items": len(self._items),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+        if self.ttl is not None:
+            stats["expired"] = self.expired
+        return stats
@@ -0,0 +1,57 @@
+"""
+Minimal HTTP client for internal services calling the OCR API
+"""
+import urllib.parse
+import urllib.request
+from typing import Optional
+from app.models.schemas import OCRResponse
+from app.utils.compact import MSGPACK_MEDIA_TYPE, msgpack_available, unpack_response
+
+
+class OCRClient:
+    """Sends raw image bytes to /detect/raw, preferring the MessagePack encoding"""
+    
+    def __init__(self, base_url: str = "http://localhost:8000/api/v1", binary: Optional[bool] = None, timeout: float = 60.0):
+        self.base_url = base_url.rstrip("/")
+        self.binary = msgpack_available() if binary is None else binary
+        self.timeout = timeout
+        if self.binary and not msgpack_available():
+            raise RuntimeError("msgpack is required for the binary encoding")
+    
+    def detect_raw(self, image: bytes, filename: str = "upload.jpg") -> bytes:
+        """
+        Send an encoded image and return the undecoded response body
+        
+        Args:
+            image: Encoded image bytes (JPEG, PNG, ...)
+            filename: Name reported in the response and server logs
+        
+        Returns:
+            Response body in the negotiated encoding
+        """
+        url = f"{self.base_url}/detect/raw?{urllib.parse.urlencode({'filename': filename})}"
+        request = urllib.request.Request(url, data=image, method="POST", headers={
+            "Content-Type": "application/octet-stream",
+            "Accept": MSGPACK_MEDIA_TYPE if self.binary else "application/json"
+        })
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return response.read()
+    
+    def parse(self, content: bytes) -> OCRResponse:
+        """Decode a /detect/raw response body"""
+        if self.binary:
+            return unpack_response(content)
+        return OCRResponse.model_validate_json(content)
+    
+    def detect(self, image: bytes, filename: str = "upload.jpg") -> OCRResponse:
+        """
+        Run detection and recognition on an encoded image
+        
+        Args:
+            image: Encoded image bytes (JPEG, PNG, ...)
+            filename: Name reported in the response and server logs
+        
+        Returns:
+            OCRResponse; image_path is empty in the binary encoding
+        """
+        return self.parse(self.detect_raw(image, filename))
@@ -0,0 +1,110 @@
+"""
+Compact MessagePack encoding of OCR responses for internal clients
+"""
+from datetime import datetime
+from typing import Any, Dict
+import numpy as np
+from app.models.schemas import OCRResponse
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+# Boxes are sent as little-endian int32 [x1, y1, x2, y2] rows
+BOX_DTYPE = np.dtype("<i4")
+
+
+def msgpack_available() -> bool:
+    return msgpack is not None
+
+
+def accepts_msgpack(accept: str) -> bool:
+    """Whether an Accept header asks for the compact encoding"""
+    return msgpack is not None and MSGPACK_MEDIA_TYPE in (accept or "")
+
+
+def to_compact(result: OCRResponse) -> Dict[str, Any]:
+    """
+    Convert a response to the compact layout
+    
+    Per-region fields become parallel arrays, boxes a packed int32 buffer and
+    class names a lookup table, so keys and names are sent once per response.
+    The server-side image_path is omitted.
+    """
+    texts = result.detected_texts
+    boxes = np.array(
+        [[t.bbox.x1, t.bbox.y1, t.bbox.x2, t.bbox.y2] for t in texts], dtype=BOX_DTYPE
+    ).reshape(-1, 4)
+    return {
+        "ok": result.success,
+        "n": result.total_regions,
+        "boxes": boxes.tobytes(),
+        "cls": [t.class_id for t in texts],
+        "names": {t.class_id: t.class_name for t in texts},
+        "conf": [t.confidence for t in texts],
+        "text": [t.extracted_text for t in texts],
+        "t": [result.timing.detection_time, result.timing.ocr_time, result.timing.total_time],
+        "st": result.timing.stages,
+        "ts": result.timestamp.timestamp(),
+        "msg": result.message,
+        "rid": result.result_id,
+        "ver": result.model_version,
+        "part": result.partial,
+        "q": result.quality,
+        "img": result.image_id
+    }
+
+
+def from_compact(data: Dict[str, Any]) -> OCRResponse:
+    """Rebuild an OCRResponse from the compact layout"""
+    boxes = np.frombuffer(data["boxes"], dtype=BOX_DTYPE).reshape(-1, 4).tolist()
+    names = data["names"]
+    # Validate one plain dict: pydantic-core is faster than constructing models field by field
+    return OCRResponse.model_validate({
+        "success": data["ok"],
+        "image_path": "",
+        "total_regions": data["n"],
+        "detected_texts": [
+            {
+                "class_name": names[class_id],
+                "extracted_text": text,
+                "bbox": {"x1": box[0], "y1": box[1], "x2": box[2], "y2": box[3]},
+                "confidence": confidence,
+                "class_id": class_id
+            }
+            for box, class_id, confidence, text in zip(boxes, data["cls"], data["conf"], data["text"])
+        ],
+        "timing": {**dict(zip(("detection_time", "ocr_time", "total_time"), data["t"])), "stages": data.get("st")},
+        "timestamp": datetime.fromtimestamp(data["ts"]),
+        "message": data["msg"],
+        "result_id": data["rid"],
+        "model_version": data.get("ver"),
+        "partial": data.get("part", False),
+        "quality": data.get("q"),
+        "image_id": data.get("img")
+    })
+
+
+def pack_response(result: OCRResponse) -> bytes:
+    return msgpack.packb(to_compact(result), use_bin_type=True)
+
+
+def unpack_compact(content: bytes) -> Dict[str, Any]:
+    return msgpack.unpackb(content, raw=False, strict_map_key=False)
+
+
+def unpack_response(content: bytes) -> OCRResponse:
+    return from_compact(unpack_compact(content))
+
+
+def unpack_request(content: bytes) -> Dict[str, Any]:
+    """
+    Decode a MessagePack request body of the form {"image": bytes, "filename": str}
+    """
+    data = msgpack.unpackb(content, raw=False)
+    if not isinstance(data, dict) or not isinstance(data.get("image"), bytes):
+        raise ValueError("MessagePack body must be a map with binary 'image' field")
+    return data
@@ -0,0 +1,83 @@
+"""
+Crop preparation for the text recognizer without PIL round trips
+"""
+from collections import defaultdict
+from typing import List, Tuple
+import cv2
+import numpy as np
+
+
+def clamp_boxes(boxes: np.ndarray, width: int, height: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Clip [x1, y1, x2, y2] boxes to the image bounds
+    
+    Returns:
+        Tuple of (clamped int boxes, mask of boxes with a non-empty area)
+    """
+    boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4).copy()
+    np.clip(boxes[:, 0::2], 0, width, out=boxes[:, 0::2])
+    np.clip(boxes[:, 1::2], 0, height, out=boxes[:, 1::2])
+    valid = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+    return boxes, valid
+
+
+def target_widths(boxes: np.ndarray, image_height: int, min_width: int, max_width: int, round_to: int = 10) -> np.ndarray:
+    """
+    Widths after resizing each box to image_height, as VietOCR's process_image computes them
+    
+    The width keeps the aspect ratio, is rounded up to a multiple of round_to
+    and clipped to [min_width, max_width].
+    """
+    widths = boxes[:, 2] - boxes[:, 0]
+    heights = boxes[:, 3] - boxes[:, 1]
+    new_widths = (image_height * widths.astype(np.float64) / heights).astype(np.int64)
+    new_widths = np.ceil(new_widths / round_to).astype(np.int64) * round_to
+    return np.clip(new_widths, min_width, max_width)
+
+
+def prepare_crop_batches(
+    images: List[np.ndarray],
+    boxes_list: List[np.ndarray],
+    image_height: int,
+    min_width: int,
+    max_width: int,
+    batch_size: int
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Resize crops of several images into width-bucketed, recognizer-ready batches
+    
+    Args:
+        images: RGB images, already color converted once per image
+        boxes_list: Clamped, non-empty [x1, y1, x2, y2] boxes per image
+        image_height: Recognizer input height
+        min_width: Minimum recognizer input width
+        max_width: Maximum recognizer input width
+        batch_size: Maximum crops per batch
+    
+    Returns:
+        List of (crop indices, float32 batch of shape (n, 3, image_height, width)),
+        crop indices counting across all images in order
+    """
+    image_ids = np.concatenate([np.full(len(boxes), i) for i, boxes in enumerate(boxes_list)]) if boxes_list else np.empty(0)
+    all_boxes = np.concatenate(boxes_list).reshape(-1, 4) if boxes_list else np.empty((0, 4), dtype=np.int64)
+    widths = target_widths(all_boxes, image_height, min_width, max_width)
+    
+    buckets = defaultdict(list)
+    for index, width in enumerate(widths.tolist()):
+        buckets[width].append(index)
+    
+    batches = []
+    for width, indices in buckets.items():
+        for start in range(0, len(indices), batch_size):
+            chunk = np.array(indices[start:start + batch_size])
+            # Resize straight into one uint8 buffer, then scale and transpose the whole batch at once
+            buffer = np.empty((len(chunk), image_height, width, 3), dtype=np.uint8)
+            for slot, index in enumerate(chunk):
+                x1, y1, x2, y2 = all_boxes[index]
+                crop = images[image_ids[index]][y1:y2, x1:x2]
+                interpolation = cv2.INTER_AREA if crop.shape[0] > image_height else cv2.INTER_LANCZOS4
+                cv2.resize(crop, (width, image_height), dst=buffer[slot], interpolation=interpolation)
+            batch = buffer.transpose(0, 3, 1, 2).astype(np.float32)
+            batch *= 1.0 / 255.0
+            batches.append((chunk, batch))
+    return batches
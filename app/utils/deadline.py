@@ -0,0 +1,92 @@
+"""
+Per-request deadlines checked between pipeline stages
+"""
+import time
+import threading
+from typing import Optional
+from app.core.config import settings
+
+
+class RequestAborted(Exception):
+    """Raised inside the pipeline when a request ran out of time or lost its client"""
+    
+    def __init__(self, reason: str, stage: str):
+        self.reason = reason  # "deadline" or "disconnected"
+        self.stage = stage
+        message = "Deadline exceeded" if reason == "deadline" else "Client disconnected"
+        super().__init__(f"{message} during {stage}")
+
+
+class Deadline:
+    """
+    Time budget of a request and whether anyone still waits for its result
+    
+    Created on the event loop and read by the worker thread running the
+    pipeline. Coalesced requests each keep their own deadline and join a
+    shared one for the run, which lasts until the last of them expires and
+    is abandoned only when every one of them has gone away.
+    """
+    
+    def __init__(self, timeout: Optional[float] = None, allow_partial: Optional[bool] = None):
+        timeout = timeout if timeout is not None else settings.REQUEST_TIMEOUT
+        self.expires_at = time.monotonic() + timeout
+        self.allow_partial = allow_partial if allow_partial is not None else settings.DEADLINE_PARTIAL_RESULTS
+        self.partial = False
+        self.waiters = 1
+        self._abandoned = threading.Event()
+    
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+    
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+    
+    @property
+    def abandoned(self) -> bool:
+        return self._abandoned.is_set()
+    
+    def share(self) -> "Deadline":
+        """Deadline for a run shared with other requests, starting with this request's budget"""
+        shared = Deadline(allow_partial=self.allow_partial)
+        shared.expires_at = self.expires_at
+        return shared
+    
+    def join(self, other: "Deadline"):
+        """Add another request to this shared deadline; the run lasts until the later expiry"""
+        self.waiters += 1
+        self.expires_at = max(self.expires_at, other.expires_at)
+        self.allow_partial = self.allow_partial and other.allow_partial
+    
+    def abandon(self):
+        """One waiting client went away; the work stops when none are left"""
+        self.waiters -= 1
+        if self.waiters <= 0:
+            self._abandoned.set()
+    
+    def check(self, stage: str):
+        """
+        Raise if the request should not continue past this stage
+        
+        Raises:
+            RequestAborted: If every client disconnected or the deadline passed
+        """
+        if self.abandoned:
+            raise RequestAborted("disconnected", stage)
+        if self.expired():
+            raise RequestAborted("deadline", stage)
+    
+    def stop_recognition(self, stage: str) -> bool:
+        """
+        Whether to stop recognizing and keep the fields recognized so far
+        
+        Returns:
+            True when the deadline passed and partial results are allowed
+        
+        Raises:
+            RequestAborted: If the request must be abandoned entirely
+        """
+        if self.expired() and self.allow_partial and not self.abandoned:
+            self.partial = True
+            return True
+        self.check(stage)
+        return False
@@ -0,0 +1,48 @@
+"""
+Image loading helpers shared by the services
+"""
+from typing import Union
+import cv2
+import numpy as np
+
+
+def describe_image(image: Union[str, np.ndarray]) -> str:
+    """Short description of an image argument for log messages"""
+    if isinstance(image, np.ndarray):
+        return f"array {image.shape[1]}x{image.shape[0]}"
+    return str(image)
+
+
+def load_image(image: Union[str, np.ndarray]) -> np.ndarray:
+    """
+    Load an image from a path, or pass a decoded BGR image through
+    
+    Args:
+        image: Path to input image or decoded BGR image
+    
+    Returns:
+        Decoded BGR image
+    """
+    if isinstance(image, np.ndarray):
+        return image
+    
+    decoded = cv2.imread(image)
+    if decoded is None:
+        raise ValueError(f"Cannot read image: {image}")
+    return decoded
+
+
+def decode_image(content: bytes) -> np.ndarray:
+    """
+    Decode encoded image bytes into a BGR image
+    
+    Args:
+        content: Encoded image bytes (JPEG, PNG, ...)
+    
+    Returns:
+        Decoded BGR image
+    """
+    decoded = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if decoded is None:
+        raise ValueError("Cannot decode image content")
+    return decoded
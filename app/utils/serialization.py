@@ -0,0 +1,52 @@
+"""
+Response construction and JSON encoding helpers
+"""
+from typing import Optional, Type, TypeVar
+from fastapi.responses import Response
+from pydantic import BaseModel
+from app.core.config import settings
+from app.models.schemas import OCRResponse
+from app.utils.compact import MSGPACK_MEDIA_TYPE, accepts_msgpack, pack_response
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def build_model(model_class: Type[ModelT], **fields) -> ModelT:
+    """
+    Create a response model, skipping validation in fast serialization mode
+    
+    Only use for data produced by the pipeline itself, whose types are
+    already correct; user input must still go through validation.
+    """
+    if settings.FAST_SERIALIZATION:
+        return model_class.model_construct(**fields)
+    return model_class(**fields)
+
+
+def model_response(model: BaseModel, status_code: int = 200):
+    """
+    Encode a model directly with pydantic-core's JSON serializer
+    
+    Returning a Response bypasses FastAPI's response_model re-validation and
+    stdlib json encoding; the route's response_model still drives OpenAPI.
+    Falls back to returning the model itself when fast serialization is off.
+    """
+    if not settings.FAST_SERIALIZATION:
+        return model
+    return Response(
+        content=model.model_dump_json(),
+        status_code=status_code,
+        media_type="application/json"
+    )
+
+
+def ocr_response(result: OCRResponse, accept: Optional[str] = None):
+    """
+    Encode an OCR result according to the request's Accept header
+    
+    Internal clients asking for application/x-msgpack get the compact
+    binary layout; everyone else gets JSON.
+    """
+    if accepts_msgpack(accept):
+        return Response(content=pack_response(result), media_type=MSGPACK_MEDIA_TYPE)
+    return model_response(result)
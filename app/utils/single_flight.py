@@ -0,0 +1,64 @@
+"""
+Coalescing of identical concurrent work
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """Run one computation per key at a time; concurrent callers with the same key share it"""
+    
+    def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+        self._inflight: Dict[Hashable, Tuple[asyncio.Task, Any]] = {}
+    
+    def state(self, key: Hashable) -> Any:
+        """State the running computation for key was started with, None when not running"""
+        entry = self._inflight.get(key)
+        return entry[1] if entry is not None else None
+    
+    async def run(self, key: Hashable, func: Callable[..., Awaitable], *args, state: Any = None) -> Tuple[Any, bool]:
+        """
+        Await func(*args) unless the same key is already running
+        
+        Args:
+            key: Identity of the computation
+            func: Coroutine function to run
+            state: Object kept with the computation while it runs, see state()
+        
+        Returns:
+            Tuple of (result, shared); shared is True when the result came from
+            another caller's run. Exceptions are raised to every caller.
+        """
+        entry = self._inflight.get(key)
+        shared = entry is not None
+        if shared:
+            self.coalesced += 1
+            task = entry[0]
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(func(*args))
+            self._inflight[key] = (task, state)
+            task.add_done_callback(lambda done: self._forget(key, done))
+        
+        # Shielded so a disconnecting caller does not cancel the run for the others
+        return await asyncio.shield(task), shared
+    
+    def detach(self, key: Hashable):
+        """Let the next run() for key start a new computation; the running one finishes for its callers"""
+        self._inflight.pop(key, None)
+    
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        entry = self._inflight.get(key)
+        if entry is not None and entry[0] is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every caller went away
+    
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._inflight),
+            "runs": self.leaders,
+            "coalesced": self.coalesced
+        }
@@ -0,0 +1,73 @@
+"""
+Annotated result image rendering
+"""
+from typing import List
+import cv2
+import numpy as np
+from app.models.schemas import DetectedText
+
+COLORS = [
+    (0, 255, 0),
+    (255, 0, 0),
+    (0, 0, 255),
+    (255, 255, 0),
+    (255, 0, 255),
+    (0, 255, 255),
+]
+
+ENCODE_PARAMS = {
+    "webp": [int(cv2.IMWRITE_WEBP_QUALITY)],
+    "jpeg": [int(cv2.IMWRITE_JPEG_QUALITY)],
+    "png": [int(cv2.IMWRITE_PNG_COMPRESSION)],
+}
+
+
+def render_annotated_image(
+    image: np.ndarray,
+    detected_texts: List[DetectedText],
+    max_width: int,
+    image_format: str = "webp",
+    quality: int = 80
+) -> bytes:
+    """
+    Draw bounding boxes and labels on a downscaled copy of the image
+    
+    Args:
+        image: Decoded BGR image
+        detected_texts: Detected texts from an OCRResponse
+        max_width: Maximum output width; the image is never upscaled
+        image_format: "webp", "jpeg" or "png"
+        quality: Encoder quality (0-100, PNG uses it as compression level 0-9)
+    
+    Returns:
+        Encoded image bytes
+    """
+    scale = min(1.0, max_width / image.shape[1])
+    if scale < 1.0:
+        size = (max(1, int(image.shape[1] * scale)), max(1, int(image.shape[0] * scale)))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    else:
+        image = image.copy()
+    
+    font_scale = max(0.3, 0.5 * scale)
+    for detected in detected_texts:
+        bbox = detected.bbox
+        x1, y1, x2, y2 = (int(v * scale) for v in (bbox.x1, bbox.y1, bbox.x2, bbox.y2))
+        color = COLORS[detected.class_id % len(COLORS)]
+        
+        # Bounding box
+        cv2.rectangle(image, (x1, y1), (x2, y2), color, 2)
+        
+        # Label with class name on a filled background
+        label = f"{detected.class_name} ({detected.confidence:.2f})"
+        label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, 1)[0]
+        cv2.rectangle(image, (x1, y1 - label_size[1] - 6), (x1 + label_size[0], y1), color, -1)
+        cv2.putText(image, label, (x1, y1 - 3), cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), 1)
+    
+    if image_format == "png":
+        quality = min(9, max(0, quality // 10))
+    ok, encoded = cv2.imencode(f".{'jpg' if image_format == 'jpeg' else image_format}", image,
+                               ENCODE_PARAMS[image_format] + [quality])
+    if not ok:
+        raise ValueError(f"Failed to encode {image_format} image")
+    return encoded.tobytes()
@@ -0,0 +1,34 @@
+"""
+Offline batch processing of a directory, glob or manifest of images
+"""
+import argparse
+from app.core.config import settings
+from app.core.logging import loggers
+from app.services.batch_processor import BatchProcessor, collect_inputs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=f"{settings.PROJECT_NAME} batch processing")
+    parser.add_argument("source", help="Image directory, glob pattern, or .txt/.jsonl manifest")
+    parser.add_argument("-o", "--output", default="output/batch_results.jsonl", help="Output .jsonl or .parquet file")
+    parser.add_argument("--batch-size", type=int, default=settings.BATCH_SIZE)
+    parser.add_argument("--prefetch-workers", type=int, default=settings.BATCH_PREFETCH_WORKERS)
+    parser.add_argument("--prefetch-batches", type=int, default=settings.BATCH_PREFETCH_BATCHES)
+    parser.add_argument("--progress-every", type=int, default=1, help="Report throughput every N batches")
+    parser.add_argument("--mock", action="store_true", help="Use the mock pipeline (no model weights)")
+    args = parser.parse_args()
+
+    if args.mock:
+        from app.services.mock_pipeline import MockOCRPipeline as Pipeline
+    else:
+        from app.services.ocr_pipeline import OCRPipeline as Pipeline
+
+    image_paths = collect_inputs(args.source)
+    print(f"Starting {settings.PROJECT_NAME} batch run on {args.source}")
+
+    processor = BatchProcessor(
+        Pipeline(),
+        batch_size=args.batch_size,
+        prefetch_workers=args.prefetch_workers,
+        prefetch_batches=args.prefetch_batches
+    )
+    processor.run(image_paths, args.output, progress_every=args.progress_every)
@@ -0,0 +1,62 @@
+"""
+Inference worker for broker mode: serves the models to API nodes started with BROKER_ENABLED
+"""
+import signal
+import argparse
+import threading
+from app.core.config import settings
+from app.core.logging import loggers
+from app.core.cpu_profile import apply_cpu_profile
+from app.services.broker import BrokerServer, SocketBroker
+from app.services.inference_worker import InferenceWorker
+from app.services.model_manager import ModelManager
+from app.services.model_registry import ModelRegistry
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=f"{settings.PROJECT_NAME} inference worker")
+    parser.add_argument("--address", default=settings.BROKER_ADDRESS, help="Broker unix socket path or host:port")
+    parser.add_argument("--serve", action="store_true",
+                        help="Also host the broker on --address (start one such process per broker)")
+    parser.add_argument("--threads", type=int, default=1, help="Worker loops sharing one copy of the models")
+    parser.add_argument("--batch-size", type=int, default=settings.BROKER_BATCH_SIZE)
+    parser.add_argument("--batch-wait", type=float, default=settings.BROKER_BATCH_WAIT)
+    parser.add_argument("--mock", action="store_true", help="Use the mock pipeline (no model weights)")
+    args = parser.parse_args()
+
+    if args.mock:
+        from app.services.mock_pipeline import MockOCRPipeline as Pipeline
+    else:
+        from app.services.ocr_pipeline import OCRPipeline as Pipeline
+
+    # Inference runs on the worker threads below, so only affinity and thread counts apply here, no executor
+    apply_cpu_profile()
+    models = ModelManager(Pipeline)
+    with models.acquire() as pipeline:
+        pipeline.warm_up()
+    registry = ModelRegistry(models)
+
+    server = None
+    if args.serve:
+        server = BrokerServer(address=args.address)
+        server.start()
+
+    workers = [
+        # Threads in the hosting process use the queue directly, others need their own connection
+        InferenceWorker(server.broker if server else SocketBroker(args.address), registry,
+                        args.batch_size, args.batch_wait)
+        for _ in range(args.threads)
+    ]
+    for worker in workers:
+        worker.start()
+    print(f"Inference worker ready: {args.threads} threads, broker {args.address}")
+
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopped.set())
+    try:
+        stopped.wait()
+    except KeyboardInterrupt:
+        pass
+    for worker in workers:
+        worker.stop()
+    if server is not None:
+        server.stop()
@@ -0,0 +1,32 @@
+"""
+Production entry point: pre-forked workers sharing one copy of the models
+"""
+import argparse
+from app.core.config import settings
+from app.core.logging import loggers
+from app.core.prefork import PreforkServer
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=f"{settings.PROJECT_NAME} production server")
+    parser.add_argument("--host", default=settings.PREFORK_HOST)
+    parser.add_argument("--port", type=int, default=settings.PREFORK_PORT)
+    parser.add_argument("--workers", type=int, default=settings.PREFORK_WORKERS)
+    parser.add_argument("--max-requests", type=int, default=settings.PREFORK_MAX_REQUESTS,
+                        help="Recycle a worker after this many requests (0 = never)")
+    parser.add_argument("--max-private-mb", type=int, default=settings.PREFORK_MAX_PRIVATE_MB,
+                        help="Recycle a worker when its private memory exceeds this (0 = never)")
+    parser.add_argument("--mock", action="store_true", help="Serve the mock pipeline (no model weights)")
+    args = parser.parse_args()
+
+    settings.PREFORK_MAX_REQUESTS = args.max_requests
+    settings.PREFORK_MAX_PRIVATE_MB = args.max_private_mb
+    if args.mock:
+        from app.api.endpoints import model_manager
+        from app.services.mock_pipeline import MockOCRPipeline
+        model_manager.pipeline_class = MockOCRPipeline
+
+    print(f"Starting {settings.PROJECT_NAME} v{settings.VERSION} with {args.workers} workers")
+    print(f"API Documentation: http://localhost:{args.port}/docs")
+    print(f"Health Check: http://localhost:{args.port}/api/v1/health")
+
+    PreforkServer(args.host, args.port, args.workers).run()
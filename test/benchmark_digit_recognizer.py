@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+So sánh tốc độ và độ chính xác đọc các trường số giữa VietOCR và recognizer chữ số
+Crop lấy theo bbox ground truth trong <ảnh>.json (xem test/train_digit_recognizer.py),
+nên chỉ đo phần recognition, không phụ thuộc YOLO.
+
+Ví dụ:
+    python test/benchmark_digit_recognizer.py --images synthetic --limit 300
+    python test/benchmark_digit_recognizer.py --images real_photos --weights models/Text_Recognition/Digits/digit_crnn.pth
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import cv2
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings  # noqa: E402
+from app.services.batch_processor import collect_inputs  # noqa: E402
+from app.services.digit_recognizer import DigitRecognizer  # noqa: E402
+from app.utils.crops import clamp_boxes  # noqa: E402
+from app.utils.image import load_image  # noqa: E402
+from train_digit_recognizer import PATTERNS, load_labels  # noqa: E402
+
+
+def load_fields(paths):
+    """
+    Ảnh RGB cùng bbox, nhãn và class của các trường số khớp pattern
+    """
+    images = []
+    for path in paths:
+        fields = [
+            (result['bbox'], result['extracted_text'].replace(' ', ''), result['class_name'])
+            for result in load_labels(path)
+            if result['class_name'] in PATTERNS
+        ]
+        fields = [field for field in fields if PATTERNS[field[2]].fullmatch(field[1])]
+        if not fields:
+            continue
+        image = cv2.cvtColor(load_image(path), cv2.COLOR_BGR2RGB)
+        boxes, valid = clamp_boxes([bbox for bbox, _, _ in fields], image.shape[1], image.shape[0])
+        fields = [field for field, is_valid in zip(fields, valid.tolist()) if is_valid]
+        images.append((image, boxes[valid], fields))
+    return images
+
+
+def run(name, recognize, images, batch_images):
+    """
+    Chạy recognizer trên toàn bộ trường, nhiều ảnh mỗi lần gọi như process_batch
+    
+    Returns:
+        dict thống kê tổng và theo class
+    """
+    # Warm-up
+    recognize([images[0][0]], [images[0][1]])
+    
+    per_class = {}
+    total_time = 0.0
+    for start in range(0, len(images), batch_images):
+        chunk = images[start:start + batch_images]
+        begin = time.perf_counter()
+        outputs = recognize([image for image, _, _ in chunk], [boxes for _, boxes, _ in chunk])
+        total_time += time.perf_counter() - begin
+        
+        fields = [field for _, _, image_fields in chunk for field in image_fields]
+        for (_, text, class_name), output in zip(fields, outputs):
+            stats = per_class.setdefault(class_name, {'fields': 0, 'correct': 0, 'low_confidence': 0})
+            stats['fields'] += 1
+            predicted, prob = output if output is not None else ('', 0.0)
+            stats['correct'] += predicted == text
+            stats['low_confidence'] += prob < settings.DIGIT_MIN_CONFIDENCE or not PATTERNS[class_name].fullmatch(predicted)
+    
+    fields = sum(stats['fields'] for stats in per_class.values())
+    return {
+        'recognizer': name,
+        'fields': fields,
+        'ms_per_field': total_time / fields * 1000,
+        'accuracy': sum(stats['correct'] for stats in per_class.values()) / fields,
+        'fallback_rate': sum(stats['low_confidence'] for stats in per_class.values()) / fields,
+        'per_class': {
+            class_name: {'fields': stats['fields'], 'accuracy': stats['correct'] / stats['fields']}
+            for class_name, stats in sorted(per_class.items())
+        }
+    }
+
+
+def print_result(result):
+    classes = ', '.join(f"{name} {stats['accuracy'] * 100:.1f}%" for name, stats in result['per_class'].items())
+    print(f"{result['recognizer']:>10}: {result['ms_per_field']:.2f} ms/trường, đúng {result['accuracy'] * 100:.2f}% "
+          f"({classes}), cần fallback {result['fallback_rate'] * 100:.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark VietOCR vs the digit recognizer on numeric fields')
+    parser.add_argument('--images', required=True, help='Thư mục, glob hoặc manifest ảnh có <ảnh>.json')
+    parser.add_argument('--weights', default=settings.DIGIT_RECOGNIZER_PATH)
+    parser.add_argument('--limit', type=int, default=200)
+    parser.add_argument('--batch-images', type=int, default=8, help='Số ảnh mỗi lần gọi recognizer')
+    parser.add_argument('--output', help='Ghi kết quả ra file JSON')
+    args = parser.parse_args()
+    
+    images = load_fields(collect_inputs(args.images)[:args.limit])
+    if not images:
+        print(f"ERROR: Không có trường số có nhãn trong {args.images}")
+        return
+    print(f"{sum(len(fields) for _, _, fields in images)} trường số từ {len(images)} ảnh, device {settings.DEVICE}")
+    
+    from app.services.ocr_service import OCRService
+    settings.DIGIT_RECOGNIZER_ENABLED = False  # đo VietOCR thuần
+    vietocr = OCRService()
+    digits = DigitRecognizer(args.weights)
+    
+    results = [
+        run('vietocr', vietocr.recognize, images, args.batch_images),
+        run('digits', digits.recognize, images, args.batch_images)
+    ]
+    for result in results:
+        print_result(result)
+    print(f"Tăng tốc mỗi trường: {results[0]['ms_per_field'] / results[1]['ms_per_field']:.1f}x "
+          f"({digits.get_model_info()['parameters'] / 1e6:.2f}M tham số so với {vietocr.memory_bytes() / 4e6:.1f}M)")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Đã ghi {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark chi phí serialize một response /detect
+So sánh đường cũ (tạo model có validate, FastAPI validate lại theo
+response_model rồi encode bằng json chuẩn) với đường nhanh
+(model_construct + model_dump_json).
+
+Ví dụ:
+    python test/benchmark_serialization.py
+    python test/benchmark_serialization.py --regions 8 16 64 --iterations 5000
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+from app.models.schemas import OCRResponse
+from app.services.mock_pipeline import MockOCRPipeline
+from app.utils.serialization import model_response
+
+
+def make_results(num_regions):
+    """
+    Tạo kết quả OCR giả giống output của OCRService
+    """
+    return [
+        {
+            'bbox': [100 + i, 50 + i, 300 + i, 80 + i],
+            'extracted_text': 'NGUYỄN VĂN AN',
+            'yolo_confidence': 0.91,
+            'class_id': 12,
+            'class_name': 'name'
+        }
+        for i in range(num_regions)
+    ]
+
+
+PIPELINE = None
+
+
+def build_response(results):
+    """
+    Gọi _build_response của pipeline mock (không cần load model)
+    """
+    global PIPELINE
+    if PIPELINE is None:
+        PIPELINE = MockOCRPipeline()
+    return PIPELINE._build_response(
+        'uploads/test.jpg', results, results, results, 0.05, 0.2
+    )
+
+
+def slow_path(results):
+    """
+    Đường cũ: validate khi tạo, validate lại theo response_model, json chuẩn
+    """
+    settings.FAST_SERIALIZATION = False
+    result = build_response(results)
+    validated = OCRResponse.model_validate(result.model_dump())
+    return JSONResponse(jsonable_encoder(validated.model_dump(mode='json'))).body
+
+
+def fast_path(results):
+    """
+    Đường nhanh: model_construct và encode bằng pydantic-core
+    """
+    settings.FAST_SERIALIZATION = True
+    return model_response(build_response(results)).body
+
+
+def orjson_path(results):
+    """
+    Để so sánh: model_construct rồi encode bằng orjson (nếu có cài)
+    """
+    import orjson
+    settings.FAST_SERIALIZATION = True
+    return orjson.dumps(build_response(results).model_dump())
+
+
+def bench(func, results, iterations):
+    """
+    Trả về thời gian trung bình mỗi lần gọi (micro giây)
+    """
+    func(results)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(results)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark serialize response')
+    parser.add_argument('--regions', type=int, nargs='+', default=[1, 8, 16, 64],
+                        help='Số vùng text mỗi response')
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+    
+    paths = [('validate + json', slow_path), ('construct + pydantic-core', fast_path)]
+    try:
+        import orjson  # noqa: F401
+        paths.append(('construct + orjson', orjson_path))
+    except ImportError:
+        print("orjson chưa được cài, bỏ qua so sánh orjson")
+    
+    print(f"{'regions':>8} " + " ".join(f"{name:>28}" for name, _ in paths))
+    for num_regions in args.regions:
+        results = make_results(num_regions)
+        timings = [bench(func, results, args.iterations) for _, func in paths]
+        row = " ".join(f"{t:>22.1f} us/op" for t in timings)
+        print(f"{num_regions:>8} {row}   (x{timings[0] / timings[1]:.1f})")
+    
+    # Kiểm tra hai đường cho cùng nội dung (trừ timestamp)
+    results = make_results(4)
+    slow = OCRResponse.model_validate_json(slow_path(results)).model_dump(exclude={'timestamp'})
+    fast = OCRResponse.model_validate_json(fast_path(results)).model_dump(exclude={'timestamp'})
+    print(f"\nKết quả giống nhau: {slow == fast}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+So sánh detect một bước và hai bước (tìm thẻ cccd ở độ phân giải thấp, rồi
+detect các trường trên ảnh crop của thẻ) về tốc độ và recall của các trường
+Ground truth là file <ảnh>.json sinh bởi test/generate_synthetic_cccd.py;
+nếu không có ground truth thì kết quả một bước được dùng làm chuẩn.
+
+Ví dụ:
+    python test/benchmark_two_stage.py --images synthetic --limit 200
+    python test/benchmark_two_stage.py --images synthetic --localize-imgsz 256 --field-imgsz 512
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.services.batch_processor import collect_inputs
+from app.services.yolo_service import YOLOService
+from app.utils.boxes import box_iou
+from app.utils.image import load_image
+
+
+def load_ground_truth(image_path):
+    """
+    Đọc các trường text từ <ảnh>.json, None nếu không có
+    """
+    gt_path = image_path + '.json'
+    if not os.path.exists(gt_path):
+        return None
+    with open(gt_path, 'r', encoding='utf-8') as f:
+        record = json.load(f)
+    return [(result['class_name'], result['bbox']) for result in record['results']]
+
+
+def matched_fields(truth, regions, iou_threshold):
+    """
+    Số trường trong truth được detect đúng class với IoU >= ngưỡng
+    """
+    used = set()
+    matched = 0
+    for class_name, bbox in truth:
+        for i, region in enumerate(regions):
+            if i in used or region['class_name'] != class_name:
+                continue
+            if box_iou(bbox, region['bbox']) >= iou_threshold:
+                used.add(i)
+                matched += 1
+                break
+    return matched
+
+
+def run_single(yolo, image):
+    start = time.perf_counter()
+    text_regions, _, _ = yolo.detect_text_regions(image)
+    return text_regions, {'fields': time.perf_counter() - start}
+
+
+def run_two_stage(yolo, image):
+    regions, stages = yolo.detect_text_regions_two_stage([image])
+    return regions[0][0], stages
+
+
+def benchmark(yolo, images, mode, iou_threshold, reference=None):
+    """
+    Chạy một chế độ trên toàn bộ ảnh, trả về thống kê và kết quả từng ảnh
+    """
+    detect = run_single if mode == 'single' else run_two_stage
+    
+    # Warm-up
+    detect(yolo, images[0][1])
+    
+    outputs = []
+    stage_totals = {}
+    truth_total = 0
+    matched_total = 0
+    start = time.perf_counter()
+    for index, (path, image) in enumerate(images):
+        text_regions, stages = detect(yolo, image)
+        outputs.append(text_regions)
+        for name, elapsed in stages.items():
+            stage_totals[name] = stage_totals.get(name, 0.0) + elapsed
+        
+        truth = load_ground_truth(path)
+        if truth is None and reference is not None:
+            truth = [(region['class_name'], region['bbox']) for region in reference[index]]
+        if truth is not None:
+            truth_total += len(truth)
+            matched_total += matched_fields(truth, text_regions, iou_threshold)
+    elapsed = time.perf_counter() - start
+    
+    return {
+        'mode': mode,
+        'images_per_second': len(images) / elapsed,
+        'ms_per_image': elapsed / len(images) * 1000,
+        'stages_ms': {name: total / len(images) * 1000 for name, total in stage_totals.items()},
+        'recall': matched_total / truth_total if truth_total else None,
+        'fields_per_image': sum(len(regions) for regions in outputs) / len(images)
+    }, outputs
+
+
+def print_result(result):
+    stages = ', '.join(f"{name} {ms:.1f} ms" for name, ms in result['stages_ms'].items())
+    recall = f"{result['recall'] * 100:.1f}%" if result['recall'] is not None else 'n/a'
+    print(f"{result['mode']:>10}: {result['images_per_second']:.2f} img/s, {result['ms_per_image']:.1f} ms/img "
+          f"({stages}), recall {recall}, {result['fields_per_image']:.1f} fields/img")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark single-stage vs two-stage detection')
+    parser.add_argument('--images', required=True, help='Thư mục, glob hoặc manifest ảnh')
+    parser.add_argument('--model', default=settings.YOLO_MODEL_PATH)
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--iou', type=float, default=0.5, help='Ngưỡng IoU để tính một trường là detect đúng')
+    parser.add_argument('--localize-imgsz', type=int, default=settings.LOCALIZE_IMGSZ)
+    parser.add_argument('--field-imgsz', type=int, default=settings.FIELD_IMGSZ)
+    parser.add_argument('--output', help='Ghi kết quả ra file JSON')
+    args = parser.parse_args()
+    
+    settings.LOCALIZE_IMGSZ = args.localize_imgsz
+    settings.FIELD_IMGSZ = args.field_imgsz
+    
+    paths = collect_inputs(args.images)[:args.limit]
+    if not paths:
+        print(f"ERROR: Không tìm thấy ảnh trong {args.images}")
+        return
+    images = [(path, load_image(path)) for path in paths]
+    print(f"{len(images)} ảnh, model {args.model}, device {settings.DEVICE}")
+    
+    yolo = YOLOService(args.model)
+    if not yolo.card_class_ids:
+        print(f"ERROR: Model không có class {settings.STREAM_CARD_CLASSES} để tìm thẻ")
+        return
+    
+    single, single_outputs = benchmark(yolo, images, 'single', args.iou)
+    print_result(single)
+    # Không có ground truth thì recall hai bước tính theo kết quả một bước
+    two_stage, _ = benchmark(yolo, images, 'two_stage', args.iou, reference=single_outputs)
+    print_result(two_stage)
+    print(f"Tăng tốc: {single['ms_per_image'] / two_stage['ms_per_image']:.2f}x "
+          f"(localize {args.localize_imgsz}px, fields {args.field_imgsz}px)")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'single': single, 'two_stage': two_stage}, f, indent=2, ensure_ascii=False)
+        print(f"Đã ghi {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+So sánh kích thước và thời gian parse của response JSON và MessagePack
+Chế độ offline dùng response giả với số vùng text khác nhau; nếu có --url
+và --image thì gửi request thật tới /detect/raw bằng OCRClient.
+
+Ví dụ:
+    python test/benchmark_wire_format.py
+    python test/benchmark_wire_format.py --url http://localhost:8000/api/v1 --image 49.jpg
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models.schemas import OCRResponse, DetectedText, BoundingBox, ProcessingTiming
+from app.utils.client import OCRClient
+from app.utils.compact import msgpack_available, pack_response, unpack_compact, unpack_response
+
+
+def make_response(num_regions):
+    """
+    Tạo response giả với num_regions vùng text
+    """
+    return OCRResponse(
+        success=True,
+        image_path='output/temp_1700000000_cccd_front_sample.jpg',
+        total_regions=num_regions,
+        detected_texts=[
+            DetectedText(
+                class_name='current_place1',
+                extracted_text='Phường Bến Nghé, Quận 1, TP Hồ Chí Minh',
+                bbox=BoundingBox(x1=100 + i, y1=200 + i, x2=700 + i, y2=240 + i),
+                confidence=0.93,
+                class_id=2
+            )
+            for i in range(num_regions)
+        ],
+        timing=ProcessingTiming(detection_time=0.05, ocr_time=0.2, total_time=0.25),
+        result_id='5eee773a2ddc44a79806513725931bd0'
+    )
+
+
+def time_per_call(func, content, iterations):
+    """
+    Thời gian trung bình mỗi lần gọi (micro giây)
+    """
+    func(content)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(content)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def parse_json(content):
+    return OCRResponse.model_validate_json(content)
+
+
+def offline_benchmark(regions, iterations):
+    """
+    So sánh trên response giả, không cần server
+    """
+    print("decode = chỉ giải mã ra dict, parse = giải mã + tạo OCRResponse")
+    print(f"{'regions':>8} {'JSON bytes':>11} {'msgpack bytes':>14} {'ratio':>6} "
+          f"{'JSON decode':>12} {'msgpack decode':>15} {'JSON parse':>11} {'msgpack parse':>14}")
+    for num_regions in regions:
+        response = make_response(num_regions)
+        json_body = response.model_dump_json().encode('utf-8')
+        msgpack_body = pack_response(response)
+        
+        timings = [
+            time_per_call(json.loads, json_body, iterations),
+            time_per_call(unpack_compact, msgpack_body, iterations),
+            time_per_call(parse_json, json_body, iterations),
+            time_per_call(unpack_response, msgpack_body, iterations)
+        ]
+        print(f"{num_regions:>8} {len(json_body):>11} {len(msgpack_body):>14} "
+              f"{len(msgpack_body) / len(json_body):>6.2f} "
+              + " ".join(f"{t:>{w - 3}.1f} us" for t, w in zip(timings, (12, 15, 11, 14))))
+
+
+def live_benchmark(url, image_path, requests):
+    """
+    Gửi request thật tới /detect/raw với cả hai encoding
+    """
+    with open(image_path, 'rb') as f:
+        image = f.read()
+    
+    for binary in (False, True):
+        client = OCRClient(url, binary=binary)
+        sizes, parse_times, latencies = [], [], []
+        for _ in range(requests):
+            start = time.perf_counter()
+            body = client.detect_raw(image, Path(image_path).name)
+            latencies.append(time.perf_counter() - start)
+            parse_start = time.perf_counter()
+            client.parse(body)
+            parse_times.append(time.perf_counter() - parse_start)
+            sizes.append(len(body))
+        
+        name = 'msgpack' if binary else 'JSON'
+        print(f"{name:>8}: {sum(sizes) / len(sizes):.0f} bytes/response, "
+              f"parse {sum(parse_times) / len(parse_times) * 1e6:.1f} us, "
+              f"round trip {sum(latencies) / len(latencies) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON vs MessagePack')
+    parser.add_argument('--regions', type=int, nargs='+', default=[1, 8, 16, 64])
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--url', help='Base URL của API, ví dụ http://localhost:8000/api/v1')
+    parser.add_argument('--image', help='Ảnh dùng cho chế độ live')
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+    
+    if not msgpack_available():
+        print("ERROR: Cần cài msgpack: pip install msgpack")
+        return
+    
+    offline_benchmark(args.regions, args.iterations)
+    
+    if args.url and args.image:
+        print(f"\nLive: {args.url}/detect/raw")
+        live_benchmark(args.url, args.image, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sinh bộ ảnh CCCD tổng hợp để benchmark tốc độ và độ chính xác offline
+Mỗi ảnh đi kèm file ground-truth JSON cùng định dạng với output/*.json
+
+Ví dụ:
+    python test/generate_synthetic_cccd.py --count 5000 --output-dir synthetic
+    python test/generate_synthetic_cccd.py --count 200 --max-rotation 15 --rotate-90
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+from multiprocessing import Pool
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.core.config import settings  # noqa: E402
+
+# Class names của model ID_CARD_2.pt
+CLASS_NAMES = {
+    0: 'bhyt', 1: 'cccd', 2: 'current_place1', 3: 'current_place2',
+    4: 'dob', 5: 'expire_date', 6: 'gender', 7: 'id', 8: 'id_',
+    9: 'ihos', 10: 'iplace', 11: 'issue_date', 12: 'name',
+    13: 'nationality', 14: 'origin_place1', 15: 'origin_place2', 16: 'personal_identifi'
+}
+CLASS_IDS = {name: class_id for class_id, name in CLASS_NAMES.items()}
+
+# Kích thước chuẩn của thẻ (tỉ lệ 85.6 x 54 mm)
+CARD_WIDTH = 856
+CARD_HEIGHT = 540
+
+FONT_CANDIDATES = [
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/TTF/DejaVuSans.ttf',
+    '/Library/Fonts/Arial Unicode.ttf',
+    'C:/Windows/Fonts/arial.ttf',
+]
+
+HO = ['NGUYỄN', 'TRẦN', 'LÊ', 'PHẠM', 'HOÀNG', 'HUỲNH', 'PHAN', 'VŨ', 'VÕ', 'ĐẶNG', 'BÙI', 'ĐỖ', 'HỒ', 'NGÔ', 'DƯƠNG', 'LÝ']
+TEN_DEM = ['VĂN', 'THỊ', 'HỮU', 'ĐỨC', 'MINH', 'NGỌC', 'THANH', 'QUỐC', 'XUÂN', 'THU', 'GIA', 'HOÀI', 'KHÁNH', '']
+TEN = ['AN', 'BÌNH', 'CƯỜNG', 'DŨNG', 'GIANG', 'HÀ', 'HẢI', 'HIẾU', 'HƯƠNG', 'KHOA', 'LINH', 'LỘC', 'MAI', 'NAM',
+       'NGHĨA', 'PHƯƠNG', 'QUÂN', 'SƠN', 'THẢO', 'THỦY', 'TRANG', 'TUẤN', 'VIỆT', 'YẾN', 'ĐẠT', 'ÁNH']
+XA = ['Phường Bến Nghé', 'Xã Tân Phú', 'Phường Láng Hạ', 'Xã Hòa Khánh', 'Phường Vĩnh Ninh', 'Thị trấn Đông Anh',
+      'Xã Nghĩa Hưng', 'Phường Trần Hưng Đạo', 'Xã Quỳnh Lưu', 'Phường Thạc Gián']
+HUYEN = ['Quận 1', 'Huyện Củ Chi', 'Quận Đống Đa', 'Thành phố Huế', 'Huyện Đông Anh', 'Quận Hải Châu',
+         'Thị xã Sơn Tây', 'Huyện Nghĩa Đàn', 'Thành phố Vinh', 'Quận Ninh Kiều']
+TINH = ['TP. Hồ Chí Minh', 'Hà Nội', 'Thừa Thiên Huế', 'Đà Nẵng', 'Nghệ An', 'Cần Thơ', 'Quảng Ninh',
+        'Thanh Hóa', 'Bình Định', 'Lâm Đồng']
+DUONG = ['Lê Lợi', 'Nguyễn Huệ', 'Trần Phú', 'Hai Bà Trưng', 'Điện Biên Phủ', 'Lý Thường Kiệt', 'Phạm Văn Đồng']
+DAC_DIEM = ['Nốt ruồi', 'Sẹo chấm', 'Sẹo', 'Nốt ruồi son']
+VI_TRI = ['trên đuôi mắt trái', 'dưới mép phải', 'cách 2cm trên đầu lông mày phải', 'trước vành tai trái',
+          'dưới cánh mũi trái', 'trên mép trái']
+
+
+def find_font(font_path=None):
+    """
+    Tìm font TrueType hỗ trợ dấu tiếng Việt
+    """
+    candidates = [font_path] if font_path else FONT_CANDIDATES
+    for path in candidates:
+        if path and os.path.exists(path):
+            return path
+    raise FileNotFoundError("Không tìm thấy font hỗ trợ tiếng Việt, hãy truyền --font")
+
+
+def random_date(rng, start_year, end_year):
+    """
+    Sinh ngày dạng dd/mm/yyyy
+    """
+    return f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(start_year, end_year)}"
+
+
+def random_identity(rng):
+    """
+    Sinh nội dung các trường trên thẻ
+    """
+    ten_dem = rng.choice(TEN_DEM)
+    name = ' '.join(part for part in [rng.choice(HO), ten_dem, rng.choice(TEN)] if part)
+    dob = random_date(rng, 1950, 2005)
+    issue_year = rng.randint(2016, 2024)
+    return {
+        'id': f"0{rng.randint(1, 96):02d}{rng.randint(0, 999999999):09d}",
+        'name': name,
+        'dob': dob,
+        'gender': 'Nữ' if ' THỊ ' in f' {name} ' or rng.random() < 0.4 else 'Nam',
+        'nationality': 'Việt Nam',
+        'origin_place1': f"{rng.choice(XA)}, {rng.choice(HUYEN)}",
+        'origin_place2': rng.choice(TINH),
+        'current_place1': f"Số {rng.randint(1, 300)} {rng.choice(DUONG)}, {rng.choice(XA)}",
+        'current_place2': f"{rng.choice(HUYEN)}, {rng.choice(TINH)}",
+        'expire_date': random_date(rng, issue_year + 10, issue_year + 25),
+        'issue_date': random_date(rng, issue_year, issue_year),
+        'personal_identifi': f"{rng.choice(DAC_DIEM)} {rng.choice(VI_TRI)}",
+    }
+
+
+# Bố cục (label tĩnh, vị trí label, trường, vị trí giá trị, font size, bold)
+FRONT_LAYOUT = [
+    ('Số / No.:', (250, 200), 'id', (360, 192), 34, True),
+    ('Họ và tên / Full name:', (250, 245), 'name', (250, 268), 30, True),
+    ('Ngày sinh / Date of birth:', (250, 312), 'dob', (470, 310), 22, False),
+    ('Giới tính / Sex:', (250, 346), 'gender', (380, 344), 22, False),
+    ('Quốc tịch / Nationality:', (480, 346), 'nationality', (680, 344), 22, False),
+    ('Quê quán / Place of origin:', (250, 380), 'origin_place1', (480, 378), 22, False),
+    (None, None, 'origin_place2', (250, 406), 22, False),
+    ('Nơi thường trú / Place of residence:', (250, 440), 'current_place1', (560, 438), 22, False),
+    (None, None, 'current_place2', (250, 466), 22, False),
+    ('Có giá trị đến:', (40, 440), 'expire_date', (40, 466), 20, False),
+]
+
+BACK_LAYOUT = [
+    ('Đặc điểm nhân dạng / Personal identification:', (40, 50), 'personal_identifi', (40, 80), 22, False),
+    ('Ngày, tháng, năm / Date, month, year:', (40, 130), 'issue_date', (420, 128), 22, False),
+]
+
+
+def render_card(rng, identity, font_path, bold_font_path, back_side):
+    """
+    Vẽ thẻ ở kích thước chuẩn, trả về (ảnh BGR, danh sách region)
+    """
+    base_color = tuple(int(c) for c in np.clip(np.array([225, 235, 240]) + rng.randint(-15, 15), 0, 255))
+    card = Image.new('RGB', (CARD_WIDTH, CARD_HEIGHT), base_color)
+    draw = ImageDraw.Draw(card)
+    label_font = ImageFont.truetype(font_path, 15)
+    ink = (rng.randint(0, 40), rng.randint(0, 40), rng.randint(0, 60))
+    
+    if back_side:
+        layout = BACK_LAYOUT
+        draw.rectangle([40, 180, 260, 420], outline=(120, 120, 120), width=2)
+        draw.rectangle([300, 180, 520, 420], outline=(120, 120, 120), width=2)
+        mrz = 'IDVNM' + identity['id'] + '<<<<<<<<<<<<'
+        draw.text((40, 450), mrz, font=ImageFont.truetype(font_path, 22), fill=ink)
+    else:
+        layout = FRONT_LAYOUT
+        header_font = ImageFont.truetype(bold_font_path, 20)
+        draw.text((250, 30), 'CỘNG HÒA XÃ HỘI CHỦ NGHĨA VIỆT NAM', font=header_font, fill=ink)
+        draw.text((330, 60), 'Độc lập - Tự do - Hạnh phúc', font=label_font, fill=ink)
+        draw.text((300, 110), 'CĂN CƯỚC CÔNG DÂN', font=ImageFont.truetype(bold_font_path, 32), fill=(180, 20, 20))
+        draw.rectangle([40, 170, 220, 410], fill=(200, 205, 210), outline=(150, 150, 150))
+    
+    regions = []
+    for label, label_pos, field, value_pos, size, bold in layout:
+        if field not in settings.TEXT_LABELS:
+            continue
+        if label:
+            draw.text(label_pos, label, font=label_font, fill=ink)
+        text = identity[field]
+        # Giảm cỡ chữ cho tới khi giá trị nằm gọn trong thẻ
+        while True:
+            font = ImageFont.truetype(bold_font_path if bold else font_path, size)
+            x1, y1, x2, y2 = draw.textbbox(value_pos, text, font=font)
+            if x2 <= CARD_WIDTH - 20 or size <= 10:
+                break
+            size -= 1
+        draw.text(value_pos, text, font=font, fill=ink)
+        regions.append({
+            'bbox': [x1 - 3, y1 - 3, x2 + 3, y2 + 3],
+            'extracted_text': text,
+            'yolo_confidence': 1.0,
+            'ocr_confidence': 1.0,
+            'class_id': CLASS_IDS[field],
+            'class_name': field
+        })
+    
+    return cv2.cvtColor(np.array(card), cv2.COLOR_RGB2BGR), regions
+
+
+def transform_boxes(regions, matrix, width, height):
+    """
+    Áp dụng ma trận affine 2x3 cho bbox, lấy hình chữ nhật bao ngoài
+    """
+    for region in regions:
+        x1, y1, x2, y2 = region['bbox']
+        corners = np.array([[x1, y1, 1], [x2, y1, 1], [x2, y2, 1], [x1, y2, 1]], dtype=np.float64)
+        moved = corners @ matrix.T
+        nx1, ny1 = np.floor(moved.min(axis=0)).astype(int)
+        nx2, ny2 = np.ceil(moved.max(axis=0)).astype(int)
+        region['bbox'] = [
+            int(np.clip(nx1, 0, width - 1)), int(np.clip(ny1, 0, height - 1)),
+            int(np.clip(nx2, 0, width - 1)), int(np.clip(ny2, 0, height - 1))
+        ]
+
+
+def augment(rng, card, regions, args):
+    """
+    Đặt thẻ lên nền, xoay, đổi độ phân giải và làm mờ
+    """
+    # Nền và lề ngẫu nhiên
+    margin_x = int(CARD_WIDTH * rng.uniform(0.02, args.max_margin))
+    margin_y = int(CARD_HEIGHT * rng.uniform(0.02, args.max_margin))
+    canvas_h, canvas_w = CARD_HEIGHT + 2 * margin_y, CARD_WIDTH + 2 * margin_x
+    np_rng = np.random.default_rng(rng.randint(0, 2**31))
+    background = np.full((canvas_h, canvas_w, 3), rng.randint(30, 220), dtype=np.uint8)
+    noise = np_rng.integers(-20, 20, background.shape, dtype=np.int16)
+    image = np.clip(background.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+    image[margin_y:margin_y + CARD_HEIGHT, margin_x:margin_x + CARD_WIDTH] = card
+    matrix = np.array([[1, 0, margin_x], [0, 1, margin_y]], dtype=np.float64)
+    transform_boxes(regions, matrix, canvas_w, canvas_h)
+    
+    # Xoay (góc nhỏ, tùy chọn thêm 90/180/270 độ)
+    angle = rng.uniform(-args.max_rotation, args.max_rotation)
+    if args.rotate_90 and rng.random() < 0.3:
+        angle += rng.choice([90, 180, 270])
+    if abs(angle) > 0.1:
+        center = (canvas_w / 2, canvas_h / 2)
+        matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+        cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+        new_w = int(canvas_h * sin + canvas_w * cos)
+        new_h = int(canvas_h * cos + canvas_w * sin)
+        matrix[0, 2] += new_w / 2 - center[0]
+        matrix[1, 2] += new_h / 2 - center[1]
+        image = cv2.warpAffine(image, matrix, (new_w, new_h), borderMode=cv2.BORDER_REPLICATE)
+        transform_boxes(regions, matrix, new_w, new_h)
+    
+    # Đổi độ phân giải
+    target_width = rng.choice(args.widths)
+    scale = target_width / image.shape[1]
+    new_size = (target_width, max(1, int(round(image.shape[0] * scale))))
+    image = cv2.resize(image, new_size, interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+    for region in regions:
+        region['bbox'] = [int(round(v * scale)) for v in region['bbox']]
+    
+    # Làm mờ
+    sigma = rng.uniform(0, args.max_blur)
+    if sigma > 0.3:
+        image = cv2.GaussianBlur(image, (0, 0), sigma)
+    
+    return image
+
+
+def generate_one(task):
+    """
+    Sinh một ảnh và file ground-truth tương ứng
+    """
+    index, args, font_path, bold_font_path = task
+    rng = random.Random(args.seed + index)
+    start_time = time.time()
+    
+    identity = random_identity(rng)
+    back_side = rng.random() < args.back_ratio
+    card, regions = render_card(rng, identity, font_path, bold_font_path, back_side)
+    image = augment(rng, card, regions, args)
+    
+    quality = rng.randint(args.min_quality, args.max_quality)
+    image_name = f"synth_{index:06d}.jpg"
+    image_path = os.path.join(args.output_dir, image_name)
+    cv2.imwrite(image_path, image, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    
+    result_data = {
+        'image_path': image_path,
+        'timing': {
+            'detection_time': 0.0,
+            'ocr_time': 0.0,
+            'total_time': time.time() - start_time
+        },
+        'total_regions': len(regions),
+        'results': regions
+    }
+    with open(f"{image_path}.json", 'w', encoding='utf-8') as f:
+        json.dump(result_data, f, ensure_ascii=False, indent=2)
+    
+    return image_path
+
+
+def main():
+    """
+    Hàm chính sinh bộ ảnh tổng hợp
+    """
+    parser = argparse.ArgumentParser(description="Generate synthetic CCCD images with ground truth")
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--output-dir', default='synthetic')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--font', default=None, help='Font TrueType có dấu tiếng Việt')
+    parser.add_argument('--bold-font', default=None)
+    parser.add_argument('--widths', type=int, nargs='+', default=[480, 640, 960, 1280, 1920, 2560])
+    parser.add_argument('--min-quality', type=int, default=40)
+    parser.add_argument('--max-quality', type=int, default=95)
+    parser.add_argument('--max-rotation', type=float, default=8.0, help='Góc xoay tối đa (độ)')
+    parser.add_argument('--rotate-90', action='store_true', help='Cho phép xoay thêm 90/180/270 độ')
+    parser.add_argument('--max-blur', type=float, default=2.0, help='Sigma Gaussian blur tối đa')
+    parser.add_argument('--max-margin', type=float, default=0.3, help='Lề nền tối đa (tỉ lệ kích thước thẻ)')
+    parser.add_argument('--back-ratio', type=float, default=0.3, help='Tỉ lệ ảnh mặt sau')
+    args = parser.parse_args()
+    
+    font_path = find_font(args.font)
+    bold_font_path = args.bold_font or font_path.replace('DejaVuSans.ttf', 'DejaVuSans-Bold.ttf')
+    if not os.path.exists(bold_font_path):
+        bold_font_path = font_path
+    
+    os.makedirs(args.output_dir, exist_ok=True)
+    print(f"Sinh {args.count} ảnh vào {args.output_dir}/ với {args.workers} worker")
+    
+    start_time = time.time()
+    tasks = ((i, args, font_path, bold_font_path) for i in range(args.count))
+    with Pool(processes=args.workers) as pool:
+        for done, _ in enumerate(pool.imap_unordered(generate_one, tasks, chunksize=16), start=1):
+            if done % 100 == 0 or done == args.count:
+                elapsed = time.time() - start_time
+                print(f"  {done}/{args.count} ảnh ({done / elapsed:.1f} ảnh/s)")
+    
+    print(f"Hoàn thành trong {time.time() - start_time:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
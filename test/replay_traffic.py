@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Replay traffic đã ghi bởi capture mode (captures/traffic.jsonl)
+Gửi lại các request tới server local theo đúng khoảng cách thời gian gốc,
+hoặc tăng tải lên N lần.
+
+Ví dụ:
+    python test/replay_traffic.py --url http://localhost:8000/api/v1/detect
+    python test/replay_traffic.py --speed 2 --scale 5
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+
+def load_records(capture_file):
+    """
+    Đọc các record từ file capture, sắp xếp theo thời gian đến
+    """
+    records = []
+    with open(capture_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    records.sort(key=lambda r: r['arrival_time'])
+    return records
+
+
+def load_payload(record, cache):
+    """
+    Lấy nội dung ảnh cho record: dùng payload đã lưu nếu có,
+    nếu không thì tạo ảnh giả cùng kích thước
+    """
+    key = record['content_sha256']
+    if key in cache:
+        return cache[key]
+    
+    payload_path = record.get('payload_path')
+    if payload_path and os.path.exists(payload_path):
+        with open(payload_path, 'rb') as f:
+            content = f.read()
+    else:
+        width = record.get('width') or 640
+        height = record.get('height') or 400
+        image = np.random.randint(0, 256, (height, width, 3), dtype=np.uint8)
+        content = cv2.imencode('.jpg', image)[1].tobytes()
+    
+    cache[key] = content
+    return content
+
+
+def build_multipart(filename, content):
+    """
+    Tạo body multipart/form-data cho field 'file'
+    """
+    boundary = uuid.uuid4().hex
+    head = (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f'Content-Type: application/octet-stream\r\n\r\n'
+    ).encode('utf-8')
+    tail = f'\r\n--{boundary}--\r\n'.encode('utf-8')
+    return head + content + tail, f'multipart/form-data; boundary={boundary}'
+
+
+def send_request(url, filename, content, timeout):
+    """
+    Gửi một request, trả về (status_code, latency)
+    """
+    body, content_type = build_multipart(filename, content)
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': content_type})
+    start_time = time.time()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = 0
+    return status, time.time() - start_time
+
+
+def build_schedule(records, speed, scale):
+    """
+    Tính thời điểm gửi (offset giây) cho từng request.
+    speed chia khoảng cách thời gian, scale nhân số request:
+    mỗi bản sao được rải ngẫu nhiên trong khoảng tới record kế tiếp.
+    """
+    if not records:
+        return []
+    
+    t0 = records[0]['arrival_time']
+    offsets = [(r['arrival_time'] - t0) / speed for r in records]
+    schedule = []
+    for i, record in enumerate(records):
+        gap = offsets[i + 1] - offsets[i] if i + 1 < len(offsets) else 0.0
+        schedule.append((offsets[i], record))
+        for _ in range(scale - 1):
+            schedule.append((offsets[i] + random.uniform(0, gap), record))
+    schedule.sort(key=lambda item: item[0])
+    return schedule
+
+
+def print_summary(results, wall_time):
+    """
+    In thống kê latency và tỉ lệ lỗi
+    """
+    if not results:
+        print("Không có request nào được gửi")
+        return
+    
+    latencies = np.array([latency for _, latency in results])
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    
+    print("\n" + "=" * 60)
+    print("KẾT QUẢ REPLAY")
+    print("=" * 60)
+    print(f"  Số request: {len(results)}")
+    print(f"  Thời gian chạy: {wall_time:.2f}s ({len(results) / wall_time:.2f} req/s)")
+    print(f"  Status codes: {statuses}")
+    print(f"  Latency p50: {np.percentile(latencies, 50):.3f}s")
+    print(f"  Latency p90: {np.percentile(latencies, 90):.3f}s")
+    print(f"  Latency p99: {np.percentile(latencies, 99):.3f}s")
+    print(f"  Latency max: {latencies.max():.3f}s")
+
+
+def main():
+    """
+    Hàm chính để replay traffic
+    """
+    parser = argparse.ArgumentParser(description="Replay captured /detect traffic")
+    parser.add_argument('--capture-file', default='captures/traffic.jsonl')
+    parser.add_argument('--url', default='http://localhost:8000/api/v1/detect')
+    parser.add_argument('--speed', type=float, default=1.0, help='Hệ số nén thời gian (2 = nhanh gấp đôi)')
+    parser.add_argument('--scale', type=int, default=1, help='Nhân số request lên N lần')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--max-workers', type=int, default=64)
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.capture_file):
+        print(f"ERROR: Không tìm thấy file capture: {args.capture_file}")
+        return
+    
+    records = load_records(args.capture_file)
+    schedule = build_schedule(records, args.speed, max(1, args.scale))
+    print(f"Replay {len(schedule)} request ({len(records)} record gốc) tới {args.url}")
+    
+    payload_cache = {}
+    results = []
+    lock = threading.Lock()
+    
+    def worker(record, content):
+        status, latency = send_request(args.url, record['filename'], content, args.timeout)
+        with lock:
+            results.append((status, latency))
+    
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=args.max_workers) as executor:
+        for offset, record in schedule:
+            content = load_payload(record, payload_cache)
+            delay = start_time + offset - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(worker, record, content)
+    wall_time = time.time() - start_time
+    
+    print_summary(results, wall_time)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Huấn luyện recognizer chữ số (CTC) cho các trường số: id, dob, issue_date, expire_date
+Nhãn lấy từ file <ảnh>.json cùng định dạng output/*.json: ground truth của
+test/generate_synthetic_cccd.py, kết quả đã kiểm tra tay, hoặc nhãn do
+VietOCR gán (--teacher, tức distill từ model lớn sang model nhỏ).
+Chỉ giữ nhãn khớp DIGIT_FIELD_PATTERNS nên "Không thời hạn" v.v. bị bỏ qua.
+
+Ví dụ:
+    python test/train_digit_recognizer.py --data synthetic --epochs 30
+    python test/train_digit_recognizer.py --data synthetic --data real_photos --teacher --save-labels
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings  # noqa: E402
+from app.services.batch_processor import collect_inputs  # noqa: E402
+from app.services.digit_recognizer import DIGIT_CHARSET, build_digit_model, ctc_greedy_decode  # noqa: E402
+from app.utils.image import load_image  # noqa: E402
+
+IMAGE_HEIGHT = 32
+MIN_WIDTH = 64
+MAX_WIDTH = 256
+# Crop rộng thêm để augment dịch/co bbox giống sai số của YOLO
+CROP_MARGIN = 0.08
+
+PATTERNS = {name: re.compile(pattern) for name, pattern in settings.DIGIT_FIELD_PATTERNS.items()}
+
+
+def teacher_labels(pipeline, path):
+    """
+    Gán nhãn bằng YOLO + VietOCR (tắt digit recognizer), trả về list kết quả như output/*.json
+    """
+    text_regions, _, _ = pipeline.yolo_service.detect_text_regions(path)
+    results, _ = pipeline.ocr_service.extract_text_from_regions(path, text_regions)
+    return results
+
+
+def load_labels(path, pipeline=None, save_labels=False):
+    """
+    Đọc nhãn của ảnh từ <ảnh>.json; nếu không có và có teacher thì gán nhãn bằng teacher
+    """
+    label_path = path + '.json'
+    if os.path.exists(label_path):
+        with open(label_path, 'r', encoding='utf-8') as f:
+            return json.load(f)['results']
+    if pipeline is None:
+        return []
+    
+    results = teacher_labels(pipeline, path)
+    if save_labels:
+        with open(label_path, 'w', encoding='utf-8') as f:
+            json.dump({'image_path': path, 'results': results, 'labeled_by': 'teacher'}, f, ensure_ascii=False, indent=2)
+    return results
+
+
+def load_samples(paths, min_confidence, pipeline=None, save_labels=False):
+    """
+    Cắt crop (có margin) của các trường số có nhãn hợp lệ
+    
+    Returns:
+        list of dict(crop=ảnh xám, box=bbox trong crop, text, class_name, path)
+    """
+    samples = []
+    skipped = 0
+    for path in paths:
+        results = [
+            result for result in load_labels(path, pipeline, save_labels)
+            if result['class_name'] in PATTERNS
+        ]
+        if not results:
+            continue
+        gray = cv2.cvtColor(load_image(path), cv2.COLOR_BGR2GRAY)
+        height, width = gray.shape
+        for result in results:
+            text = result['extracted_text'].replace(' ', '')
+            if result.get('ocr_confidence', 1.0) < min_confidence or not PATTERNS[result['class_name']].fullmatch(text):
+                skipped += 1
+                continue
+            x1, y1, x2, y2 = result['bbox']
+            margin_x, margin_y = int((x2 - x1) * CROP_MARGIN), int((y2 - y1) * CROP_MARGIN)
+            cx1, cy1 = max(0, x1 - margin_x), max(0, y1 - margin_y)
+            cx2, cy2 = min(width, x2 + margin_x), min(height, y2 + margin_y)
+            if cx2 - cx1 < 4 or cy2 - cy1 < 4:
+                skipped += 1
+                continue
+            samples.append({
+                'crop': gray[cy1:cy2, cx1:cx2].copy(),
+                'box': (x1 - cx1, y1 - cy1, x2 - cx1, y2 - cy1),
+                'text': text,
+                'class_name': result['class_name'],
+                'path': path
+            })
+    print(f"{len(samples)} crop từ {len(paths)} ảnh, bỏ {skipped} nhãn không hợp lệ hoặc độ tin cậy thấp")
+    return samples
+
+
+def resize_to_height(crop):
+    """
+    Resize về IMAGE_HEIGHT giữ tỉ lệ, width làm tròn lên bội số 10 như lúc inference
+    """
+    height, width = crop.shape[:2]
+    new_width = int(np.ceil(IMAGE_HEIGHT * width / height / 10)) * 10
+    new_width = int(np.clip(new_width, MIN_WIDTH, MAX_WIDTH))
+    interpolation = cv2.INTER_AREA if height > IMAGE_HEIGHT else cv2.INTER_LANCZOS4
+    return cv2.resize(crop, (new_width, IMAGE_HEIGHT), interpolation=interpolation)
+
+
+def render_sample(sample, rng, augment):
+    """
+    Ảnh đầu vào của một sample; khi augment thì lệch bbox, đổi độ sáng/tương phản và làm mờ
+    """
+    x1, y1, x2, y2 = sample['box']
+    crop = sample['crop']
+    if augment:
+        jitter_x, jitter_y = (x2 - x1) * 0.04, (y2 - y1) * 0.12
+        x1 = int(np.clip(x1 + rng.uniform(-jitter_x, jitter_x), 0, crop.shape[1] - 2))
+        x2 = int(np.clip(x2 + rng.uniform(-jitter_x, jitter_x), x1 + 2, crop.shape[1]))
+        y1 = int(np.clip(y1 + rng.uniform(-jitter_y, jitter_y), 0, crop.shape[0] - 2))
+        y2 = int(np.clip(y2 + rng.uniform(-jitter_y, jitter_y), y1 + 2, crop.shape[0]))
+    image = resize_to_height(crop[y1:y2, x1:x2]).astype(np.float32)
+    if augment:
+        image = image * rng.uniform(0.7, 1.3) + rng.uniform(-30, 30)
+        if rng.random() < 0.3:
+            image = cv2.GaussianBlur(image, (0, 0), rng.uniform(0.3, 1.2))
+        image = np.clip(image, 0, 255)
+    return image / 255.0
+
+
+def make_batches(samples, batch_size, rng, shuffle):
+    """
+    Gom sample có width gần nhau vào cùng batch để ít phải pad
+    """
+    order = sorted(range(len(samples)), key=lambda i: samples[i]['crop'].shape[1] / samples[i]['crop'].shape[0])
+    batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+    if shuffle:
+        rng.shuffle(batches)
+    return batches
+
+
+def collate(samples, indices, rng, augment):
+    """
+    Tensor đầu vào (pad phải bằng màu nền) và target cho CTCLoss
+    """
+    images = [render_sample(samples[i], rng, augment) for i in indices]
+    width = max(image.shape[1] for image in images)
+    batch = np.empty((len(images), 1, IMAGE_HEIGHT, width), dtype=np.float32)
+    for slot, image in enumerate(images):
+        batch[slot, 0, :, :image.shape[1]] = image
+        batch[slot, 0, :, image.shape[1]:] = np.median(image[:, -2:])
+    texts = [samples[i]['text'] for i in indices]
+    targets = [DIGIT_CHARSET.index(char) + 1 for text in texts for char in text]
+    return batch, texts, targets, [len(text) for text in texts]
+
+
+def evaluate(torch, model, samples, batch_size, device):
+    """
+    Tỉ lệ đọc đúng toàn bộ trường (exact match) trên tập validation
+    """
+    model.eval()
+    rng = random.Random(0)
+    correct = 0
+    with torch.inference_mode():
+        for indices in make_batches(samples, batch_size, rng, shuffle=False):
+            batch, texts, _, _ = collate(samples, indices, rng, augment=False)
+            log_probs = model(torch.from_numpy(batch).to(device)).cpu().numpy()
+            outputs = ctc_greedy_decode(log_probs, DIGIT_CHARSET)
+            correct += sum(text == output for text, (output, _) in zip(texts, outputs))
+    return correct / len(samples) if samples else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the digit-only CTC recognizer')
+    parser.add_argument('--data', action='append', required=True, help='Thư mục, glob hoặc manifest ảnh (lặp lại được)')
+    parser.add_argument('--output', default=settings.DIGIT_RECOGNIZER_PATH)
+    parser.add_argument('--epochs', type=int, default=30)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--lr', type=float, default=1e-3)
+    parser.add_argument('--val-split', type=float, default=0.1)
+    parser.add_argument('--min-confidence', type=float, default=0.9, help='Bỏ nhãn có ocr_confidence thấp hơn')
+    parser.add_argument('--teacher', action='store_true', help='Ảnh không có <ảnh>.json được VietOCR gán nhãn')
+    parser.add_argument('--save-labels', action='store_true', help='Ghi nhãn của teacher ra <ảnh>.json')
+    parser.add_argument('--device', default=settings.DEVICE)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    import torch
+    
+    rng = random.Random(args.seed)
+    torch.manual_seed(args.seed)
+    
+    paths = [path for source in args.data for path in collect_inputs(source)]
+    pipeline = None
+    if args.teacher:
+        from app.services.ocr_pipeline import OCRPipeline
+        settings.DIGIT_RECOGNIZER_ENABLED = False  # teacher là VietOCR
+        pipeline = OCRPipeline()
+    samples = load_samples(paths, args.min_confidence, pipeline, args.save_labels)
+    if len(samples) < 10:
+        print("ERROR: Quá ít crop có nhãn để huấn luyện")
+        return
+    
+    # Chia train/val theo ảnh để crop của cùng một ảnh không nằm ở cả hai tập
+    image_paths = sorted({sample['path'] for sample in samples})
+    rng.shuffle(image_paths)
+    val_paths = set(image_paths[:max(1, int(len(image_paths) * args.val_split))])
+    train = [sample for sample in samples if sample['path'] not in val_paths]
+    val = [sample for sample in samples if sample['path'] in val_paths]
+    print(f"Train {len(train)} crop, val {len(val)} crop, device {args.device}")
+    
+    model = build_digit_model(len(DIGIT_CHARSET) + 1, IMAGE_HEIGHT).to(args.device)
+    print(f"Tham số: {sum(p.numel() for p in model.parameters()) / 1e6:.2f}M")
+    optimizer = torch.optim.AdamW(model.parameters(), lr=args.lr, weight_decay=1e-4)
+    steps = args.epochs * len(make_batches(train, args.batch_size, rng, shuffle=False))
+    scheduler = torch.optim.lr_scheduler.OneCycleLR(optimizer, max_lr=args.lr, total_steps=steps)
+    ctc_loss = torch.nn.CTCLoss(blank=0, zero_infinity=True)
+    
+    best_accuracy = -1.0
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    for epoch in range(1, args.epochs + 1):
+        model.train()
+        start = time.time()
+        total_loss = 0.0
+        batches = make_batches(train, args.batch_size, rng, shuffle=True)
+        for indices in batches:
+            batch, _, targets, target_lengths = collate(train, indices, rng, augment=True)
+            log_probs = model(torch.from_numpy(batch).to(args.device))
+            input_lengths = torch.full((len(indices),), log_probs.shape[1], dtype=torch.long)
+            loss = ctc_loss(
+                log_probs.permute(1, 0, 2), torch.tensor(targets, dtype=torch.long),
+                input_lengths, torch.tensor(target_lengths, dtype=torch.long)
+            )
+            optimizer.zero_grad()
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(model.parameters(), 5.0)
+            optimizer.step()
+            scheduler.step()
+            total_loss += loss.item()
+        
+        accuracy = evaluate(torch, model, val, args.batch_size, args.device)
+        print(f"Epoch {epoch}/{args.epochs}: loss {total_loss / len(batches):.4f}, "
+              f"val exact match {accuracy * 100:.2f}%, {time.time() - start:.1f}s")
+        if accuracy > best_accuracy:
+            best_accuracy = accuracy
+            torch.save({
+                'state_dict': model.state_dict(),
+                'charset': DIGIT_CHARSET,
+                'image_height': IMAGE_HEIGHT,
+                'min_width': MIN_WIDTH,
+                'max_width': MAX_WIDTH,
+                'val_accuracy': accuracy,
+                'train_samples': len(train)
+            }, args.output)
+    
+    print(f"Đã lưu model tốt nhất ({best_accuracy * 100:.2f}% exact match) vào {args.output}")
+
+
+if __name__ == "__main__":
+    main()
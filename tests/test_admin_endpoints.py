@@ -0,0 +1,43 @@
+"""
+Tests for admin endpoint access and reload path checks
+"""
+import pytest
+from fastapi import HTTPException
+from app.api.endpoints import check_admin_token, resolve_model_path
+from app.core.config import settings
+
+
+def test_admin_endpoints_disabled_without_token(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "")
+    for token in (None, "", "anything"):
+        with pytest.raises(HTTPException) as denied:
+            check_admin_token(token)
+        assert denied.value.status_code == 403
+
+
+def test_admin_token_must_match(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    check_admin_token("secret")
+    for token in (None, "", "secre", "secret2"):
+        with pytest.raises(HTTPException):
+            check_admin_token(token)
+
+
+def test_reload_paths_stay_in_model_dir(monkeypatch, tmp_path):
+    model_dir = tmp_path / "models"
+    model_dir.mkdir()
+    weights = model_dir / "detector.pt"
+    weights.write_bytes(b"weights")
+    outside = tmp_path / "payload.pt"
+    outside.write_bytes(b"payload")
+    (model_dir / "link.pt").symlink_to(outside)
+    monkeypatch.setattr(settings, "MODEL_DIR", str(model_dir))
+    
+    assert resolve_model_path(None) is None
+    assert resolve_model_path(str(weights)) == str(weights.resolve())
+    for path in (str(outside), str(model_dir / ".." / "payload.pt"), str(model_dir / "link.pt"), "/etc/passwd"):
+        with pytest.raises(HTTPException) as rejected:
+            resolve_model_path(path)
+        assert rejected.value.status_code == 400
+    with pytest.raises(HTTPException):
+        resolve_model_path(str(model_dir / "missing.pt"))
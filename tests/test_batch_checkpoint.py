@@ -0,0 +1,120 @@
+"""
+Tests for resuming batch runs from the journal
+"""
+import os
+import json
+import cv2
+import numpy as np
+import pytest
+from app.services.batch_processor import BatchProcessor
+
+
+def write_records(path, paths):
+    with open(path, "w", encoding="utf-8") as f:
+        for image_path in paths:
+            f.write(json.dumps({"image_path": image_path, "success": True}) + "\n")
+
+
+def test_missing_journal(tmp_path):
+    assert BatchProcessor.load_checkpoint(str(tmp_path / "none.jsonl")) == set()
+
+
+def test_complete_journal_is_kept(tmp_path):
+    journal = tmp_path / "out.jsonl"
+    write_records(journal, ["a.jpg", "b.jpg"])
+    size = journal.stat().st_size
+    
+    assert BatchProcessor.load_checkpoint(str(journal)) == {"a.jpg", "b.jpg"}
+    assert journal.stat().st_size == size
+
+
+def test_truncated_last_record_is_dropped(tmp_path):
+    journal = tmp_path / "out.jsonl"
+    write_records(journal, ["a.jpg", "b.jpg"])
+    valid = journal.read_bytes()
+    with open(journal, "ab") as f:
+        f.write(b'{"image_path": "c.jp')
+    
+    assert BatchProcessor.load_checkpoint(str(journal)) == {"a.jpg", "b.jpg"}
+    assert journal.read_bytes() == valid
+    
+    # Appending after the repair yields well-formed lines again
+    with open(journal, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"image_path": "c.jpg"}) + "\n")
+    assert BatchProcessor.load_checkpoint(str(journal)) == {"a.jpg", "b.jpg", "c.jpg"}
+
+
+def test_records_after_a_bad_line_are_dropped(tmp_path):
+    journal = tmp_path / "out.jsonl"
+    journal.write_text('{"image_path": "a.jpg"}\n{"success": true}\n{"image_path": "b.jpg"}\n')
+    
+    assert BatchProcessor.load_checkpoint(str(journal)) == {"a.jpg"}
+    assert journal.read_text() == '{"image_path": "a.jpg"}\n'
+
+
+def test_failed_records_are_retried(tmp_path):
+    journal = tmp_path / "out.jsonl"
+    journal.write_text('{"image_path": "a.jpg", "success": true}\n{"image_path": "b.jpg", "success": false}\n')
+    
+    assert BatchProcessor.load_checkpoint(str(journal)) == {"a.jpg"}
+
+
+class Record:
+    def __init__(self, image_path, success):
+        self.image_path = image_path
+        self.success = success
+    
+    def model_dump(self, mode=None):
+        return {"image_path": self.image_path, "success": self.success}
+
+
+class FlakyPipeline:
+    """Fails the given images once, then succeeds"""
+    
+    def __init__(self, failing):
+        self.failing = set(failing)
+        self.seen = []
+    
+    def process_batch(self, images, paths):
+        self.seen.extend(paths)
+        records = [Record(path, path not in self.failing) for path in paths]
+        self.failing.clear()
+        return records
+
+
+def test_rerun_retries_only_failures(tmp_path):
+    paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.png"
+        cv2.imwrite(str(path), np.zeros((8, 8, 3), dtype=np.uint8))
+        paths.append(str(path))
+    output = str(tmp_path / "out.jsonl")
+    
+    pipeline = FlakyPipeline([paths[1]])
+    first = BatchProcessor(pipeline, batch_size=2, prefetch_workers=1, prefetch_batches=1).run(paths, output)
+    assert first["failed"] == 1
+    with open(BatchProcessor.failed_path(output), encoding="utf-8") as f:
+        assert [json.loads(line)["image_path"] for line in f] == [paths[1]]
+    
+    pipeline.seen.clear()
+    second = BatchProcessor(pipeline, batch_size=2, prefetch_workers=1, prefetch_batches=1).run(paths, output)
+    assert pipeline.seen == [paths[1]]
+    assert second["skipped"] == 2 and second["failed"] == 0
+    assert not os.path.exists(BatchProcessor.failed_path(output))
+    with open(output, encoding="utf-8") as f:
+        assert sorted(json.loads(line)["image_path"] for line in f) == paths
+
+
+def test_parquet_output_keeps_journal(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "a.png"
+    cv2.imwrite(str(path), np.zeros((8, 8, 3), dtype=np.uint8))
+    output = str(tmp_path / "out.parquet")
+    
+    pipeline = FlakyPipeline([])
+    BatchProcessor(pipeline, batch_size=2, prefetch_workers=1, prefetch_batches=1).run([str(path)], output)
+    BatchProcessor(pipeline, batch_size=2, prefetch_workers=1, prefetch_batches=1).run([str(path)], output)
+    
+    assert pipeline.seen == [str(path)]
+    assert os.path.exists(BatchProcessor.journal_path(output))
+    assert pq.read_table(output).column("image_path").to_pylist() == [str(path)]
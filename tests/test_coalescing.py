@@ -0,0 +1,103 @@
+"""
+Tests for sharing pipeline runs between identical concurrent uploads
+"""
+import asyncio
+import threading
+import pytest
+from app.api import endpoints
+from app.core.config import settings
+from app.utils.deadline import RequestAborted, Deadline
+
+
+class FakeRequest:
+    def __init__(self):
+        self.disconnected = False
+    
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+
+class FakePipeline:
+    def __init__(self, model_version: str):
+        self.model_version = model_version
+
+
+class Result:
+    def model_copy(self):
+        return self
+
+
+@pytest.fixture
+def coalescing(monkeypatch):
+    monkeypatch.setattr(settings, "COALESCE_REQUESTS", True)
+    monkeypatch.setattr(settings, "DISCONNECT_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(endpoints, "inflight_requests", endpoints.SingleFlight())
+
+
+def blocking_run(release: threading.Event, calls: list):
+    def run(content, deadline):
+        calls.append(content)
+        release.wait(5)
+        deadline.check("recognition")
+        return Result()
+    return run
+
+
+def test_new_request_does_not_join_abandoned_run(coalescing):
+    async def scenario():
+        release = threading.Event()
+        calls = []
+        run = blocking_run(release, calls)
+        lane = endpoints.scheduler.default_lane
+        pipeline = FakePipeline("v1")
+        
+        gone = FakeRequest()
+        first = asyncio.ensure_future(endpoints.run_coalesced(
+            gone, pipeline, b"image", lane, Deadline(10), run, b"image"
+        ))
+        while not calls:
+            await asyncio.sleep(0.01)
+        gone.disconnected = True
+        key = (run, "v1", endpoints.hashlib.sha256(b"image").digest())
+        while not endpoints.inflight_requests.state(key).abandoned:
+            await asyncio.sleep(0.01)
+        
+        # The abandoned run is still in flight when an identical upload arrives
+        second = asyncio.ensure_future(endpoints.run_coalesced(
+            FakeRequest(), pipeline, b"image", lane, Deadline(10), run, b"image"
+        ))
+        while len(calls) < 2:
+            await asyncio.sleep(0.01)
+        release.set()
+        
+        with pytest.raises(RequestAborted) as aborted:
+            await first
+        assert aborted.value.reason == "disconnected"
+        assert isinstance(await second, Result)
+        assert endpoints.inflight_requests.stats()["coalesced"] == 0
+    
+    asyncio.run(scenario())
+
+
+def test_variant_pipelines_share_by_version(coalescing):
+    async def scenario():
+        release = threading.Event()
+        calls = []
+        run = blocking_run(release, calls)
+        lane = endpoints.scheduler.default_lane
+        
+        # Variant pipelines are separate objects per request with the same label
+        requests = [
+            endpoints.run_coalesced(FakeRequest(), FakePipeline(version), b"image", lane, Deadline(10), run, b"image")
+            for version in ("id_card+vgg_seq2seq", "id_card+vgg_seq2seq", "id_card+vgg_transformer")
+        ]
+        tasks = [asyncio.ensure_future(request) for request in requests]
+        while len(calls) < 2:
+            await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(*tasks)
+        
+        assert len(calls) == 2
+        assert endpoints.inflight_requests.stats()["coalesced"] == 1
+    
+    asyncio.run(scenario())
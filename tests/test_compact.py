@@ -0,0 +1,38 @@
+"""
+Tests for the compact MessagePack response layout
+"""
+import pytest
+from app.models.schemas import OCRResponse
+from app.utils.compact import from_compact, msgpack_available, pack_response, to_compact, unpack_response
+
+
+def make_response() -> OCRResponse:
+    return OCRResponse.model_validate({
+        "success": True,
+        "image_path": "card.jpg",
+        "total_regions": 2,
+        "detected_texts": [
+            {"class_name": "name", "extracted_text": "NGUYỄN VĂN AN", "bbox": {"x1": 1, "y1": 2, "x2": 30, "y2": 12},
+             "confidence": 0.9, "class_id": 12},
+            {"class_name": "id", "extracted_text": None, "bbox": {"x1": 5, "y1": 20, "x2": 40, "y2": 28},
+             "confidence": 0.8, "class_id": 7}
+        ],
+        "timing": {"detection_time": 0.1, "ocr_time": 0.2, "total_time": 0.3,
+                   "stages": {"localize": 0.04, "fields": 0.06}},
+        "result_id": "r1",
+        "model_version": "v1",
+        "partial": True,
+        "image_id": "i1"
+    })
+
+
+def test_round_trip_keeps_every_field_but_image_path():
+    response = make_response()
+    restored = from_compact(to_compact(response))
+    assert restored.model_dump(exclude={"image_path"}) == response.model_dump(exclude={"image_path"})
+
+
+@pytest.mark.skipif(not msgpack_available(), reason="msgpack not installed")
+def test_msgpack_round_trip():
+    response = make_response()
+    assert unpack_response(pack_response(response)).timing.stages == response.timing.stages
@@ -0,0 +1,54 @@
+"""
+Tests for the CPU execution profile
+"""
+import asyncio
+import cv2
+import pytest
+from app.core import cpu_profile
+from app.core.config import settings
+
+
+@pytest.fixture
+def profile_settings(monkeypatch):
+    """Enable the profile without changing this process's affinity or thread environment"""
+    monkeypatch.setattr(settings, "CPU_PROFILE_ENABLED", True)
+    monkeypatch.setattr(settings, "CPU_AFFINITY", "")
+    monkeypatch.setattr(settings, "CPU_CORES_PER_WORKER", 0)
+    monkeypatch.setattr(settings, "EXECUTOR_WORKERS", 3)
+    monkeypatch.setenv("OMP_NUM_THREADS", "1")
+    monkeypatch.setenv("MKL_NUM_THREADS", "1")
+    monkeypatch.setattr(cpu_profile, "effective_profile", {"enabled": False})
+    opencv_threads = cv2.getNumThreads()
+    yield
+    cv2.setNumThreads(opencv_threads)
+
+
+def test_apply_outside_event_loop(profile_settings):
+    # As in run_inference_worker.py, which has no event loop
+    profile = cpu_profile.apply_cpu_profile()
+    assert profile["enabled"]
+    assert profile["executor_workers"] == 3
+    assert profile["opencv_threads"] == cv2.getNumThreads()
+
+
+def test_configure_executor_sizes_loop_executor(profile_settings):
+    cpu_profile.apply_cpu_profile()
+    
+    async def scenario():
+        cpu_profile.configure_executor()
+        loop = asyncio.get_running_loop()
+        executor = loop._default_executor
+        assert executor._max_workers == 3
+        executor.shutdown(wait=False)
+    
+    asyncio.run(scenario())
+
+
+def test_configure_executor_is_noop_when_disabled(monkeypatch):
+    monkeypatch.setattr(cpu_profile, "effective_profile", {"enabled": False})
+    
+    async def scenario():
+        cpu_profile.configure_executor()
+        assert asyncio.get_running_loop()._default_executor is None
+    
+    asyncio.run(scenario())
@@ -0,0 +1,69 @@
+"""
+Tests for request deadlines and partial results
+"""
+import numpy as np
+import pytest
+from app.core.config import settings
+from app.utils.deadline import Deadline, RequestAborted
+
+
+def test_check_and_stop_recognition():
+    Deadline(10).check("detection")
+    with pytest.raises(RequestAborted) as aborted:
+        Deadline(0.0).check("detection")
+    assert aborted.value.reason == "deadline"
+    
+    partial = Deadline(0.0, allow_partial=True)
+    assert partial.stop_recognition("recognition")
+    assert partial.partial
+    with pytest.raises(RequestAborted):
+        Deadline(0.0, allow_partial=False).stop_recognition("recognition")
+    assert not Deadline(10).stop_recognition("recognition")
+
+
+def test_shared_deadline_keeps_caller_expiries():
+    leader = Deadline(1.0)
+    joiner = Deadline(30.0)
+    shared = leader.share()
+    shared.join(joiner)
+    
+    # The run lasts for the later caller; the leader keeps its own budget
+    assert shared.expires_at == joiner.expires_at
+    assert leader.remaining() <= 1.0
+    assert shared.waiters == 2
+
+
+def test_shared_deadline_abandoned_when_every_caller_left():
+    shared = Deadline(10).share()
+    shared.join(Deadline(10))
+    shared.abandon()
+    shared.check("recognition")
+    shared.abandon()
+    with pytest.raises(RequestAborted) as aborted:
+        shared.check("recognition")
+    assert aborted.value.reason == "disconnected"
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    from app.services.mock_pipeline import MockOCRPipeline
+    monkeypatch.setattr(settings, "QUALITY_GATE_ENABLED", False)
+    monkeypatch.setattr(settings, "MOCK_DETECTION_TIME", 0.0)
+    monkeypatch.setattr(settings, "MOCK_OCR_BATCH_OVERHEAD", 0.0)
+    monkeypatch.setattr(settings, "MOCK_OCR_TIME_PER_REGION", 0.0)
+    return MockOCRPipeline()
+
+
+def test_deadline_after_detection_returns_regions_without_text(pipeline):
+    image = np.full((540, 856, 3), 128, np.uint8)
+    result = pipeline.process_batch([image], ["card.jpg"], Deadline(0.0, allow_partial=True))[0]
+    assert result.partial
+    assert result.detected_texts
+    assert all(text.extracted_text is None for text in result.detected_texts)
+    
+    with pytest.raises(RequestAborted):
+        pipeline.process_batch([image], ["card.jpg"], Deadline(0.0, allow_partial=False))
+    
+    result = pipeline.process_batch([image], ["card.jpg"], Deadline(10))[0]
+    assert not result.partial
+    assert all(text.extracted_text for text in result.detected_texts)
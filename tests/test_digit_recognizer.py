@@ -0,0 +1,39 @@
+"""
+Tests that the digit recognizer sees inputs like the ones it was trained on
+"""
+import importlib.util
+import random
+from pathlib import Path
+import numpy as np
+from app.services.digit_recognizer import DigitRecognizer
+from app.utils.crops import prepare_crop_batches
+
+TRAIN_SCRIPT = Path(__file__).resolve().parent.parent / "test" / "train_digit_recognizer.py"
+
+
+def load_training_script():
+    spec = importlib.util.spec_from_file_location("train_digit_recognizer", TRAIN_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_serving_input_matches_training_range():
+    train = load_training_script()
+    rng = np.random.default_rng(0)
+    # 40x160 resizes to 32x128 on both paths; gray RGB so the channel mean equals the gray value
+    gray = rng.integers(0, 256, (40, 160)).astype(np.uint8)
+    gray[:, :8] = 0
+    gray[:, -8:] = 255
+    image = np.repeat(gray[:, :, None], 3, axis=2)
+    box = np.array([[0, 0, 160, 40]])
+    
+    batches = prepare_crop_batches([image], [box], train.IMAGE_HEIGHT, train.MIN_WIDTH, train.MAX_WIDTH, 8)
+    served = DigitRecognizer.model_input(batches[0][1])[0, 0]
+    trained = train.render_sample({"crop": gray, "box": (0, 0, 160, 40)}, random.Random(0), augment=False)
+    
+    assert served.dtype == np.float32
+    assert served.shape == trained.shape
+    assert 0.0 <= served.min() and served.max() <= 1.0
+    assert served.max() > 0.9 and trained.max() > 0.9
+    assert np.allclose(served, trained, atol=1e-5)
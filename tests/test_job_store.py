@@ -0,0 +1,43 @@
+"""
+Tests for the persistent job queue
+"""
+import sqlite3
+from app.services.job_store import JobStore
+
+
+def test_interrupted_jobs_fail_after_max_attempts(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job = store.create("card.jpg", "jobs/card.jpg")
+    
+    # The worker dies while running the job, once per restart
+    for attempt in range(1, 3):
+        claimed = store.claim_next()
+        assert claimed["id"] == job["id"] and claimed["attempts"] == attempt
+        assert store.requeue_running(max_attempts=3) == 1
+        assert store.get(job["id"])["status"] == "queued"
+    
+    store.claim_next()
+    assert store.requeue_running(max_attempts=3) == 0
+    failed = store.get(job["id"])
+    assert failed["status"] == "failed"
+    assert failed["attempts"] == 3
+    assert "Interrupted 3 times" in failed["error"]
+    assert store.claim_next() is None
+
+
+def test_adds_attempts_to_existing_database(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, filename TEXT NOT NULL, "
+        "image_path TEXT NOT NULL, callback_url TEXT, result TEXT, error TEXT, created_at REAL NOT NULL, "
+        "started_at REAL, finished_at REAL)"
+    )
+    connection.execute("INSERT INTO jobs (id, status, filename, image_path, created_at) VALUES ('old', 'running', 'a.jpg', 'a.jpg', 0)")
+    connection.commit()
+    connection.close()
+    
+    store = JobStore(path)
+    assert store.get("old")["attempts"] == 0
+    assert store.requeue_running(max_attempts=3) == 1
+    assert store.claim_next()["attempts"] == 1
@@ -0,0 +1,41 @@
+"""
+Tests for the hot-reload model manager
+"""
+import time
+import threading
+from app.services.model_manager import ModelManager
+
+
+class SlowPipeline:
+    """Pipeline stand-in whose construction blocks until released"""
+    
+    loading = threading.Event()
+    release = threading.Event()
+    
+    def __init__(self, yolo_model_path=None, ocr_weights_path=None, model_version=None):
+        SlowPipeline.loading.set()
+        SlowPipeline.release.wait(5)
+        self.model_version = model_version or "v1"
+        self.yolo_model_path = yolo_model_path
+        self.ocr_weights_path = ocr_weights_path
+
+
+def test_status_does_not_wait_for_initial_load():
+    manager = ModelManager(SlowPipeline)
+    leases = []
+    threads = [threading.Thread(target=lambda: leases.append(manager.lease())) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    assert SlowPipeline.loading.wait(5)
+    
+    start = time.monotonic()
+    status = manager.status()
+    assert time.monotonic() - start < 1.0
+    assert status["serving"] is None
+    
+    SlowPipeline.release.set()
+    for thread in threads:
+        thread.join(5)
+    # Both requests share the one loaded slot
+    assert leases[0] is leases[1]
+    assert manager.status()["serving"]["active_requests"] == 2
@@ -0,0 +1,92 @@
+"""
+Tests for the priority lanes in front of the pipeline
+"""
+import asyncio
+import pytest
+from app.services.priority_scheduler import PriorityScheduler
+
+
+def make_scheduler(**kwargs) -> PriorityScheduler:
+    options = dict(
+        slots=1, weights={"interactive": 8, "bulk": 1}, max_slots={}, urgent_lane="interactive",
+        target_wait=60.0, default_lane="interactive", api_key_lanes={}
+    )
+    options.update(kwargs)
+    return PriorityScheduler(**options)
+
+
+def test_resolve_lane():
+    scheduler = make_scheduler(api_key_lanes={"batch-key": "bulk"})
+    assert scheduler.resolve_lane(None, None) == "interactive"
+    assert scheduler.resolve_lane("bulk", None) == "bulk"
+    assert scheduler.resolve_lane("interactive", "batch-key") == "bulk"
+    with pytest.raises(ValueError):
+        scheduler.resolve_lane("express", None)
+
+
+@pytest.mark.parametrize("kwargs", [{"default_lane": "express"}, {"api_key_lanes": {"key": "express"}}])
+def test_unknown_configured_lane_fails_at_startup(kwargs):
+    with pytest.raises(ValueError):
+        make_scheduler(**kwargs)
+
+
+def test_weighted_dispatch_and_lane_limit():
+    async def run():
+        scheduler = make_scheduler(slots=2, max_slots={"bulk": 1})
+        order = []
+        release = asyncio.Event()
+        
+        async def request(lane, name):
+            async with scheduler.slot(lane):
+                order.append(name)
+                await release.wait()
+        
+        # The second bulk request waits although a slot is free: bulk is limited to one
+        tasks = [asyncio.create_task(request("bulk", f"bulk{i}")) for i in range(2)]
+        await asyncio.sleep(0)
+        assert order == ["bulk0"]
+        assert scheduler.lanes["bulk"].status()["queued"] == 1
+        
+        tasks.append(asyncio.create_task(request("interactive", "interactive0")))
+        await asyncio.sleep(0)
+        assert order == ["bulk0", "interactive0"]
+        
+        release.set()
+        await asyncio.gather(*tasks)
+        assert order[-1] == "bulk1"
+        assert scheduler.active == 0
+    
+    asyncio.run(run())
+
+
+def test_cancel_racing_dispatch():
+    async def run():
+        scheduler = make_scheduler()
+        holder_started = asyncio.Event()
+        release = asyncio.Event()
+        
+        async def holder():
+            async with scheduler.slot("interactive"):
+                holder_started.set()
+                await release.wait()
+        
+        async def waiter():
+            async with scheduler.slot("interactive"):
+                pass
+        
+        holding = asyncio.create_task(holder())
+        await holder_started.wait()
+        waiting = asyncio.create_task(waiter())
+        await asyncio.sleep(0)
+        
+        # The holder wakes first, so its _dispatch pops the cancelled future
+        # before the waiter handles its cancellation
+        release.set()
+        waiting.cancel()
+        await holding
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert scheduler.active == 0
+        assert not scheduler.lanes["interactive"].waiters
+    
+    asyncio.run(run())
@@ -0,0 +1,73 @@
+"""
+Tests for coalescing identical concurrent work
+"""
+import asyncio
+import pytest
+from app.utils.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_run():
+    async def scenario():
+        flight = SingleFlight()
+        calls = []
+        release = asyncio.Event()
+        
+        async def work(value):
+            calls.append(value)
+            await release.wait()
+            return value * 2
+        
+        first = asyncio.ensure_future(flight.run("a", work, 1, state="leader"))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flight.run("a", work, 1))
+        other = asyncio.ensure_future(flight.run("b", work, 5))
+        await asyncio.sleep(0)
+        assert flight.state("a") == "leader"
+        assert flight.stats() == {"in_flight": 2, "runs": 2, "coalesced": 1}
+        
+        release.set()
+        results = await asyncio.gather(first, second, other)
+        assert results == [(2, False), (2, True), (10, False)]
+        assert calls == [1, 5]
+        assert flight.state("a") is None
+        assert flight.stats()["in_flight"] == 0
+        
+        # A finished key runs again
+        assert await flight.run("a", work, 3) == (6, False)
+    
+    asyncio.run(scenario())
+
+
+def test_errors_reach_every_caller():
+    async def scenario():
+        flight = SingleFlight()
+        
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+        
+        results = await asyncio.gather(flight.run("k", fail), flight.run("k", fail), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert flight.stats() == {"in_flight": 0, "runs": 1, "coalesced": 1}
+    
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_does_not_cancel_shared_run():
+    async def scenario():
+        flight = SingleFlight()
+        
+        async def work():
+            await asyncio.sleep(0.05)
+            return "done"
+        
+        first = asyncio.ensure_future(flight.run("k", work))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flight.run("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert await second == ("done", True)
+    
+    asyncio.run(scenario())
@@ -0,0 +1,32 @@
+"""
+Tests for traffic capture
+"""
+import json
+import cv2
+import numpy as np
+from app.services.traffic_capture import TrafficCapture
+
+
+def test_records_are_written_by_the_writer_thread(tmp_path):
+    capture = TrafficCapture(str(tmp_path), save_payload=True)
+    content = cv2.imencode(".jpg", np.zeros((40, 60, 3), np.uint8))[1].tobytes()
+    capture.submit(content, "card.jpg", 1.0, 200, {"read_time": 0.01})
+    capture.flush()
+    
+    records = [json.loads(line) for line in open(capture.log_path, encoding="utf-8")]
+    assert len(records) == 1
+    assert (records[0]["width"], records[0]["height"]) == (60, 40)
+    with open(records[0]["payload_path"], "rb") as f:
+        assert f.read() == content
+
+
+def test_full_queue_drops_records(tmp_path):
+    capture = TrafficCapture(str(tmp_path), queue_size=1, start_writer=False)
+    capture.submit(b"a", "a.jpg", 1.0, 200, {})
+    capture.submit(b"b", "b.jpg", 1.0, 200, {})
+    assert capture.dropped == 1
+    
+    capture.start()
+    capture.flush()
+    records = [json.loads(line) for line in open(capture.log_path, encoding="utf-8")]
+    assert [record["filename"] for record in records] == ["a.jpg"]
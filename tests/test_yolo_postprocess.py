@@ -0,0 +1,88 @@
+"""
+Tests for the vectorized text box pruning in YOLOService
+"""
+import numpy as np
+from app.core.config import settings
+from app.services.yolo_service import YOLOService
+
+
+CLASS_NAMES = {0: "cccd", 1: "name", 2: "id", 3: "dob", 4: "current_place1", 5: "portrait"}
+
+
+def make_service(monkeypatch, policies, min_conf=0.4):
+    """YOLOService with class tables set up but no model loaded"""
+    monkeypatch.setattr(settings, "DETECTION_CLASS_POLICIES", policies)
+    monkeypatch.setattr(settings, "OCR_MIN_DETECTION_CONF", min_conf)
+    service = YOLOService.__new__(YOLOService)
+    service.class_names = CLASS_NAMES
+    service.text_labels = ["name", "id", "dob", "current_place1"]
+    service.text_class_ids = []
+    service._setup_text_labels()
+    service._setup_postprocess()
+    return service
+
+
+def reference_mask(classes, confidences, text_ids, policies, min_conf):
+    """Per-box loop the vectorized mask replaced"""
+    keep = []
+    for index, (class_id, conf) in enumerate(zip(classes, confidences)):
+        policy = policies.get(CLASS_NAMES[class_id], {})
+        if class_id in text_ids and conf >= policy.get("min_conf", min_conf):
+            keep.append(index)
+    
+    mask = np.zeros(len(classes), dtype=bool)
+    by_class = {}
+    for index in sorted(keep, key=lambda i: (classes[i], -confidences[i], i)):
+        by_class.setdefault(classes[index], []).append(index)
+    for class_id, indices in by_class.items():
+        limit = policies.get(CLASS_NAMES[class_id], {}).get("max_count", len(indices))
+        mask[indices[:limit]] = True
+    return mask
+
+
+def test_keeps_most_confident_box_per_class(monkeypatch):
+    service = make_service(monkeypatch, {"name": {"max_count": 1}, "id": {"max_count": 2}})
+    classes = np.array([1, 1, 2, 2, 2, 0, 3, 3])
+    confidences = np.array([0.5, 0.9, 0.6, 0.8, 0.7, 0.95, 0.45, 0.3], dtype=np.float32)
+    
+    mask = service._text_mask(classes, confidences)
+    
+    # name keeps 0.9, id keeps 0.8 and 0.7, dob has no limit but drops 0.3, the card is not text
+    assert mask.tolist() == [False, True, False, True, True, False, True, False]
+
+
+def test_min_conf_override_and_empty_input(monkeypatch):
+    service = make_service(monkeypatch, {"dob": {"min_conf": 0.8}}, min_conf=0.4)
+    classes = np.array([3, 3, 1])
+    confidences = np.array([0.7, 0.85, 0.5], dtype=np.float32)
+    assert service._text_mask(classes, confidences).tolist() == [False, True, True]
+    
+    empty = service._text_mask(np.array([], dtype=np.int64), np.array([], dtype=np.float32))
+    assert empty.shape == (0,)
+    assert not service._text_mask(np.array([0, 5]), np.array([0.9, 0.9], dtype=np.float32)).any()
+
+
+def test_matches_per_box_loop(monkeypatch):
+    policies = {"name": {"max_count": 1}, "id": {"max_count": 2, "min_conf": 0.6}, "dob": {"min_conf": 0.5}}
+    service = make_service(monkeypatch, policies, min_conf=0.3)
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        count = int(rng.integers(0, 30))
+        classes = rng.integers(0, len(CLASS_NAMES), count)
+        # Coarse confidences so ties are common
+        confidences = (rng.integers(0, 10, count) / 10).astype(np.float32)
+        
+        expected = reference_mask(classes, confidences, service.text_class_ids, policies, 0.3)
+        assert service._text_mask(classes, confidences).sum() == expected.sum()
+        # Ties may keep either box, so compare the kept confidences per class
+        for class_id in range(len(CLASS_NAMES)):
+            selected = classes == class_id
+            got = sorted(confidences[selected & service._text_mask(classes, confidences)])
+            assert got == sorted(confidences[selected & expected])
+
+
+def test_filter_classes_keep_card_class(monkeypatch):
+    monkeypatch.setattr(settings, "DETECTION_FILTER_CLASSES", True)
+    service = make_service(monkeypatch, {})
+    assert service.predict_args["classes"] == [0, 1, 2, 3, 4]
+    assert service.card_class_ids == [0]